@@ -0,0 +1,337 @@
+"""
+🔄 AJUSTE INCREMENTAL CON OBSERVACIONES NUEVAS
+================================================================
+En lugar de reentrenar desde cero, cada ciclo:
+
+1. Lee del dataset de construir_dataset.py solo las ventanas posteriores a
+   la última marca de cada estación (los meses anteriores ni se abren).
+2. Separa el final de cada estación como holdout y ajusta los pesos del
+   modelo vigente unos cientos de pasos, mezclando las ventanas nuevas con
+   un buffer de repetición de ventanas antiguas (evita el olvido).
+3. Valida contra el holdout nuevo y contra ventanas antiguas no vistas: se
+   publica solo si mejora en las nuevas sin empeorar en las antiguas más de
+   `--tolerancia`.
+4. Publica un bundle .aqib en MODELS_DIR (la API lo carga con
+   MODEL_WATCH_INTERVAL_SECONDS o con /admin/models/load si se indica --api)
+   y avanza las marcas.
+
+El estado (marcas por estación y última versión publicada) se guarda en
+`<dataset>/ajuste_incremental.json`. En la primera ejecución, sin --desde,
+solo se fijan las marcas en el final del dataset.
+
+Uso:
+    python construir_dataset.py --entrada "datos/crudos/*.csv" --salida datos/dataset
+    python ajuste_incremental.py --dataset datos/dataset
+    python ajuste_incremental.py --dataset datos/dataset --cada 3600 --api http://localhost:8000
+"""
+
+import os
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Reduce warnings de TensorFlow
+
+import argparse
+import json
+import sys
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+from entrenamiento.datos import LOOKBACK, FORECAST_HORIZONS, FEATURES
+from entrenamiento.evaluacion import cargar_modelo_servido, version_de
+from entrenamiento.pipeline import leer_shard_ventanas
+
+NOMBRE_ESTADO = 'ajuste_incremental.json'
+
+
+# ============================================================================
+# ESTADO Y LECTURA DEL DATASET
+# ============================================================================
+
+def cargar_estado(ruta: Path) -> Dict:
+    if ruta.exists():
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'marcas': {}, 'version': None, 'bundle': None, 'historial': []}
+
+
+def guardar_estado(ruta: Path, estado: Dict):
+    tmp = ruta.with_name(ruta.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, ruta)
+
+
+def cargar_indice(dataset: Path) -> Dict:
+    ruta = dataset / 'indice.json'
+    if not ruta.exists():
+        raise SystemExit(f"❌ {dataset} no es un dataset de construir_dataset.py (falta indice.json)")
+    with open(ruta, 'r', encoding='utf-8') as f:
+        indice = json.load(f)
+    if (indice['lookback'], indice['horizontes'], indice['features']) != (LOOKBACK, FORECAST_HORIZONS, FEATURES):
+        raise SystemExit("❌ El dataset se construyó con otros parámetros de ventana")
+    return indice
+
+
+def _leer(dataset: Path, shard: Dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ruta = dataset / shard['ruta']
+    X, y = leer_shard_ventanas(str(ruta))
+    with np.load(ruta) as datos:
+        fechas = datos['fechas']
+    return X, y, fechas
+
+
+def _mes(marca: int) -> str:
+    return str(pd.Timestamp(marca).to_period('M'))
+
+
+def marcas_finales(dataset: Path, indice: Dict) -> Dict[str, int]:
+    """Fecha de la última ventana de cada estación (solo se abre su último shard)"""
+    marcas = {}
+    for estacion, unidades in indice['estaciones'].items():
+        shards = [s for _, u in sorted(unidades.items()) for s in u['shards']]
+        if shards:
+            marcas[estacion] = int(_leer(dataset, shards[-1])[2][-1])
+    return marcas
+
+
+def ventanas_nuevas(dataset: Path, indice: Dict, marcas: Dict[str, int]) -> Dict[str, Tuple]:
+    """
+    {estación: (X, y, fechas)} con las ventanas posteriores a su marca
+
+    Solo se abren los shards del mes de la marca en adelante.
+    """
+    nuevas = {}
+    for estacion, unidades in indice['estaciones'].items():
+        marca = marcas.get(estacion)
+        partes = []
+        for mes, unidad in sorted(unidades.items()):
+            if marca is not None and mes < _mes(marca):
+                continue
+            for shard in unidad['shards']:
+                X, y, fechas = _leer(dataset, shard)
+                sel = fechas > marca if marca is not None else slice(None)
+                partes.append((X[sel], y[sel], fechas[sel]))
+        partes = [p for p in partes if len(p[2])]
+        if partes:
+            X, y, fechas = (np.concatenate(c) for c in zip(*partes))
+            orden = np.argsort(fechas, kind='stable')
+            nuevas[estacion] = (X[orden], y[orden], fechas[orden])
+    return nuevas
+
+
+def muestra_antigua(dataset: Path, indice: Dict, marcas: Dict[str, int], n: int,
+                    rng: np.random.Generator, max_shards: int = 8) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hasta `n` ventanas anteriores a las marcas, de unos pocos shards al azar
+
+    Los shards se eligen con probabilidad proporcional a sus ventanas, así
+    que la muestra se reparte entre estaciones y meses como el histórico.
+    """
+    candidatos = [
+        (estacion, shard)
+        for estacion, unidades in indice['estaciones'].items() if estacion in marcas
+        for mes, unidad in unidades.items() if mes <= _mes(marcas[estacion])
+        for shard in unidad['shards']
+    ]
+    vacio = (np.empty((0, LOOKBACK, len(FEATURES)), np.float32), np.empty((0, len(FORECAST_HORIZONS)), np.float32))
+    if not candidatos or n <= 0:
+        return vacio
+    pesos = np.array([s['ventanas'] for _, s in candidatos], dtype=np.float64)
+    elegidos = rng.choice(len(candidatos), size=min(max_shards, len(candidatos)), replace=False, p=pesos / pesos.sum())
+    por_shard = -(-n // len(elegidos))
+    partes = []
+    for i in elegidos:
+        estacion, shard = candidatos[i]
+        X, y, fechas = _leer(dataset, shard)
+        antiguas = np.flatnonzero(fechas <= marcas[estacion])
+        filas = rng.choice(antiguas, size=min(por_shard, len(antiguas)), replace=False)
+        partes.append((X[filas], y[filas]))
+    if not partes:
+        return vacio
+    return np.concatenate([p[0] for p in partes])[:n], np.concatenate([p[1] for p in partes])[:n]
+
+
+# ============================================================================
+# CICLO
+# ============================================================================
+
+def mae(model, Xn: np.ndarray, y: np.ndarray, scaler_y) -> float:
+    if len(Xn) == 0:
+        return float('nan')
+    return float(np.abs(scaler_y.inverse_transform(model.predict(Xn, batch_size=1024, verbose=0)) - y).mean())
+
+
+def publicar_en_api(api: str, version: str):
+    """Pedir a la API que cargue la versión (requiere ADMIN_TOKEN en el entorno)"""
+    peticion = urllib.request.Request(
+        f"{api.rstrip('/')}/admin/models/load",
+        data=json.dumps({'version': version}).encode('utf-8'),
+        headers={'Content-Type': 'application/json', 'X-Admin-Token': os.getenv('ADMIN_TOKEN', '')},
+        method='POST'
+    )
+    with urllib.request.urlopen(peticion, timeout=120) as respuesta:
+        print(f"   🔁 API: {respuesta.status} {respuesta.read().decode('utf-8')[:200]}")
+
+
+def ciclo(args, dataset: Path, ruta_estado: Path) -> Optional[str]:
+    """
+    Un ciclo de ajuste incremental
+
+    Returns:
+        La versión publicada, o None si no había datos suficientes o el
+        modelo ajustado no superó la validación
+    """
+    import tensorflow as tf
+    from tensorflow import keras
+    from utils.model_bundle import escribir_bundle
+
+    t0 = time.perf_counter()
+    estado = cargar_estado(ruta_estado)
+    indice = cargar_indice(dataset)
+    rng = np.random.default_rng(args.semilla + len(estado['historial']))
+
+    if not estado['marcas'] and not args.desde:
+        # Primera ejecución: todo lo que ya hay se considera visto
+        estado['marcas'] = marcas_finales(dataset, indice)
+        guardar_estado(ruta_estado, estado)
+        print(f"📌 Marcas inicializadas al final del dataset en {len(estado['marcas'])} estaciones")
+        return None
+    if args.desde:
+        desde = int(pd.Timestamp(args.desde).value)
+        estado['marcas'] = {e: min(estado['marcas'].get(e, desde), desde) for e in indice['estaciones']}
+        args.desde = None
+
+    # 1. Ventanas nuevas, con el final de cada estación como holdout
+    nuevas = ventanas_nuevas(dataset, indice, estado['marcas'])
+    total = sum(len(v[2]) for v in nuevas.values())
+    if total < args.min_nuevas:
+        print(f"💤 {total} ventanas nuevas (< {args.min_nuevas}): nada que hacer")
+        return None
+    ajuste, holdout = [], []
+    for X, y, _ in nuevas.values():
+        corte = int(len(X) * (1 - args.holdout))
+        ajuste.append((X[:corte], y[:corte]))
+        holdout.append((X[corte:], y[corte:]))
+    X_nuevo, y_nuevo = (np.concatenate(c) for c in zip(*ajuste))
+    X_hold, y_hold = (np.concatenate(c) for c in zip(*holdout))
+
+    # Buffer de repetición y ventanas antiguas de validación (disjuntos)
+    n_replay = int(len(X_nuevo) * args.replay)
+    X_ant, y_ant = muestra_antigua(dataset, indice, estado['marcas'], n_replay + args.validacion_antigua, rng)
+    X_replay, y_replay = X_ant[:n_replay], y_ant[:n_replay]
+    X_val_ant, y_val_ant = X_ant[n_replay:], y_ant[n_replay:]
+    t_datos = time.perf_counter() - t0
+    print(f"📊 {total:,} ventanas nuevas de {len(nuevas)} estaciones: {len(X_nuevo):,} ajuste + "
+          f"{len(X_hold):,} holdout | repetición {len(X_replay):,} | validación antigua {len(X_val_ant):,} "
+          f"({t_datos:.1f}s)")
+
+    # 2. Modelo vigente (la última versión publicada por este script, si la hay)
+    bundle, model, scaler_y = cargar_modelo_servido(estado['bundle'] or args.modelo)
+    version_base = version_de(bundle)
+    norm = lambda X: bundle.scaler_x.transform(X).astype(np.float32)
+    Xn_hold, Xn_val_ant = norm(X_hold), norm(X_val_ant)
+    mae_base = (mae(model, Xn_hold, y_hold, scaler_y), mae(model, Xn_val_ant, y_val_ant, scaler_y))
+
+    # 3. Ajuste fino: pocos pasos con learning rate bajo sobre nuevas + repetición
+    X_fit = norm(np.concatenate([X_nuevo, X_replay]))
+    y_fit = scaler_y.transform(np.concatenate([y_nuevo, y_replay])).astype(np.float32)
+    # Exactamente args.pasos lotes: el dataset se repite y se baraja en cada pasada
+    lotes = (tf.data.Dataset.from_tensor_slices((X_fit, y_fit))
+             .shuffle(len(X_fit), seed=int(rng.integers(2**31)))
+             .repeat()
+             .batch(args.lote))
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=args.lr), loss='mse')
+    t1 = time.perf_counter()
+    model.fit(lotes, epochs=1, steps_per_epoch=args.pasos, verbose=0)
+    t_ajuste = time.perf_counter() - t1
+    mae_nuevo = (mae(model, Xn_hold, y_hold, scaler_y), mae(model, Xn_val_ant, y_val_ant, scaler_y))
+
+    print(f"🧪 MAE holdout nuevo: {mae_base[0]:.2f} -> {mae_nuevo[0]:.2f} | "
+          f"antiguas: {mae_base[1]:.2f} -> {mae_nuevo[1]:.2f} (ajuste {t_ajuste:.1f}s, {args.pasos} pasos)")
+
+    # 4. Validación y publicación
+    mejora = mae_nuevo[0] < mae_base[0]
+    olvida = np.isfinite(mae_base[1]) and mae_nuevo[1] > mae_base[1] * (1 + args.tolerancia)
+    if not mejora or olvida:
+        motivo = "no mejora en el holdout nuevo" if not mejora else "empeora en las ventanas antiguas"
+        print(f"⛔ No se publica ({motivo}); las marcas no avanzan")
+        return None
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    version = f"{timestamp}_inc"
+    prefijo = str(bundle.metadata.get('nombre_experimento') or 'LSTM_Attention_AQI').split('_inc')[0]
+    metadata = {
+        **{k: v for k, v in bundle.metadata.items() if k not in ('metricas', 'segundos_entrenamiento')},
+        "timestamp": version,
+        "nombre_experimento": f"{prefijo}_inc",
+        "ajustado_de": version_base,
+        "ventanas_nuevas": int(total),
+        "pasos_ajuste": args.pasos,
+        "segundos_entrenamiento": round(t_ajuste, 1),
+        "metricas": {"mae_holdout": mae_nuevo[0], "mae_holdout_base": mae_base[0],
+                     "mae_antiguas": mae_nuevo[1], "mae_antiguas_base": mae_base[1]},
+    }
+    Path(args.salida).mkdir(parents=True, exist_ok=True)
+    ruta = Path(args.salida) / f"{prefijo}_inc_{timestamp}.aqib"
+    escribir_bundle(ruta, model.get_weights(), bundle.arquitectura, bundle.scaler_x, scaler_y,
+                    metadata, {"ajustado_de": version_base})
+
+    estado['marcas'].update({e: int(v[2][-1]) for e, v in nuevas.items()})
+    estado['version'], estado['bundle'] = version, str(ruta)
+    estado['historial'].append({'version': version, 'ajustado_de': version_base, 'ventanas': int(total),
+                                'mae_holdout': mae_nuevo[0], 'fecha': datetime.now().isoformat(timespec='seconds')})
+    guardar_estado(ruta_estado, estado)
+    print(f"🚀 Publicada {version}: {ruta.name} ({time.perf_counter() - t0:.1f}s en total)")
+
+    if args.api:
+        try:
+            publicar_en_api(args.api, version)
+        except OSError as e:
+            print(f"   ⚠️ La API no cargó la versión ({e}); la cargará el vigilante de MODELS_DIR si está activo")
+    return version
+
+
+def main():
+    from config.config import MODELS_DIR
+
+    parser = argparse.ArgumentParser(description="Ajuste incremental del modelo con las ventanas nuevas")
+    parser.add_argument('--dataset', required=True, help="Directorio de construir_dataset.py")
+    parser.add_argument('--modelo', help="Bundle .aqib de partida (por defecto el configurado en la API)")
+    parser.add_argument('--desde', help="Fecha ISO: tratar como nuevas las ventanas posteriores")
+    parser.add_argument('--pasos', type=int, default=200, help="Pasos de gradiente por ciclo")
+    parser.add_argument('--lote', type=int, default=64)
+    parser.add_argument('--lr', type=float, default=1e-4)
+    parser.add_argument('--replay', type=float, default=1.0, help="Ventanas antiguas por cada nueva en el ajuste")
+    parser.add_argument('--holdout', type=float, default=0.2, help="Fracción final de cada estación para validar")
+    parser.add_argument('--validacion-antigua', type=int, default=2000, help="Ventanas antiguas para medir el olvido")
+    parser.add_argument('--tolerancia', type=float, default=0.02, help="Empeoramiento admitido en las antiguas")
+    parser.add_argument('--min-nuevas', type=int, default=256)
+    parser.add_argument('--salida', default=MODELS_DIR, help="Dónde publicar los bundles (MODELS_DIR)")
+    parser.add_argument('--api', help="URL de la API para cargar la versión publicada")
+    parser.add_argument('--cada', type=float, default=0, help="Segundos entre ciclos (0 = un solo ciclo)")
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    dataset = Path(args.dataset)
+    ruta_estado = dataset / NOMBRE_ESTADO
+
+    print("=" * 80)
+    print("🔄 AJUSTE INCREMENTAL")
+    print("=" * 80)
+    while True:
+        ciclo(args, dataset, ruta_estado)
+        if args.cada <= 0:
+            break
+        print(f"⏳ Siguiente ciclo en {args.cada:.0f}s\n")
+        time.sleep(args.cada)
+
+
+if __name__ == '__main__':
+    main()
@@ -30,9 +30,45 @@ METADATA_PATH = os.getenv(
     str(BASE_DIR / "modelos_guardados" / "metadata_20251004_111121.pkl")
 )
 
+# Scaler de las salidas; por defecto el nombre que usa el entrenamiento (scaler_y_<timestamp>.pkl)
+SCALER_Y_PATH = os.getenv(
+    "SCALER_Y_PATH",
+    str(Path(SCALER_PATH).with_name(Path(SCALER_PATH).name.replace("scaler_", "scaler_y_", 1)))
+)
+
+# Bundle único (.aqib, ver utils/model_bundle.py). Si se indica, sustituye a
+# MODEL_PATH / SCALER_PATH / SCALER_Y_PATH / METADATA_PATH
+MODEL_BUNDLE_PATH = os.getenv("MODEL_BUNDLE_PATH", "")
+
+# Ensemble de generaciones (utils/ensemble.py): bundles .aqib separados por
+# comas evaluados en un único grafo. Vacío = un solo modelo. Pesos opcionales
+# en el mismo orden (por defecto iguales; se normalizan)
+ENSEMBLE_MODELS = os.getenv("ENSEMBLE_MODELS", "")
+ENSEMBLE_WEIGHTS = os.getenv("ENSEMBLE_WEIGHTS", "")
+
+# Registro de versiones (cambio en caliente de bundles de MODELS_DIR)
+MODELS_DIR = os.getenv("MODELS_DIR", str(BASE_DIR / "modelos_guardados"))
+MODEL_HISTORY_SIZE = int(os.getenv("MODEL_HISTORY_SIZE", "1"))  # Versiones anteriores cargadas para rollback
+MODEL_WATCH_INTERVAL_SECONDS = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "0"))  # 0 = sin vigilancia
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # Vacío = endpoints /admin desactivados
+
 # Configuración de la API
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "8000"))
+# Plegar los escalados MinMax en los pesos del modelo al cargarlo
+# (entrada en unidades reales, salida en AQI; sin sklearn por petición)
+FOLD_SCALERS = os.getenv("FOLD_SCALERS", "True").lower() == "true"
+
+# Incertidumbre por MC dropout: réplicas por predicción (0 = desactivado) y
+# cobertura del intervalo devuelto. Coste medido con benchmarks/bench_mc_dropout.py
+MC_SAMPLES = int(os.getenv("MC_SAMPLES", "32"))
+MC_INTERVAL = float(os.getenv("MC_INTERVAL", "0.9"))
+
+# Arranque: "eager" carga el modelo antes de aceptar conexiones; "lazy" difiere
+# las importaciones pesadas y carga el modelo en segundo plano (/health/ready)
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager").lower()
+# Procesos worker de run_prod.py (comparten código y pesos vía fork)
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
 DEBUG_MODE = os.getenv("DEBUG_MODE", "True").lower() == "true"
 
 # Configuración de CORS
@@ -79,13 +115,50 @@ AQI_CATEGORIES = {
     "Muy Malo": {"range": (250.5, 350.4), "color": "#7E0023", "mensaje": "Alerta de salud de emergencia"},
     "Peligroso": {"range": (350.5, float('inf')), "color": "#4C0026", "mensaje": "Advertencia de salud de condiciones de emergencia"}
 }
+# Límite superior (incluido) de cada categoría salvo la última, para utils.aqi.categoria
+AQI_CATEGORY_LIMITS = tuple(info["range"][1] for info in list(AQI_CATEGORIES.values())[:-1])
 
 # Cache settings
 CACHE_PREDICTIONS = os.getenv("CACHE_PREDICTIONS", "False").lower() == "true"
 CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))  # 5 minutos
 
+# Tamaño de celda (grados) para agrupar ubicaciones cercanas en la cache HTTP
+CACHE_GRID_DEGREES = float(os.getenv("CACHE_GRID_DEGREES", "0.05"))  # ~5 km
+
+# Cada cuánto llegan datos nuevos de las fuentes (OpenAQ/TEMPO publican por hora)
+UPSTREAM_REFRESH_SECONDS = int(os.getenv("UPSTREAM_REFRESH_SECONDS", "3600"))
+
 # Logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" o "json"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Registros en espera del hilo escritor
+# Máximo de registros INFO/DEBUG por segundo y punto de emisión (0 = sin límite)
+LOG_RATE_LIMIT_PER_SECOND = float(os.getenv("LOG_RATE_LIMIT_PER_SECOND", "5"))
+
+# Métricas Prometheus (/metrics). Si se desactiva, la instrumentación no mide nada
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+
+# Cabecera Server-Timing con la duración de cada etapa en las respuestas de predicción
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "True").lower() == "true"
+
+# Perfilado bajo demanda (?debug_profile=1 o cabecera X-Debug-Profile: 1)
+# Desactivado por defecto: solo para diagnóstico en entornos controlados
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False").lower() == "true"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")  # Si se define, exigir X-Debug-Token
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
 
 # Límites de rate limiting (requests por minuto)
 RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "60"))
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+# Ráfaga máxima por cliente (tamaño del token bucket)
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "10"))
+# API keys reconocidas (separadas por comas): solo estas tienen bucket propio;
+# cualquier otra X-API-Key se limita por IP como si no se enviara
+RATE_LIMIT_API_KEYS = frozenset(k.strip() for k in os.getenv("RATE_LIMIT_API_KEYS", "").split(",") if k.strip())
+# Proxies de confianza (IPs separadas por comas) cuyo X-Forwarded-For se respeta
+TRUSTED_PROXIES = frozenset(ip.strip() for ip in os.getenv("TRUSTED_PROXIES", "").split(",") if ip.strip())
+
+# Control de admisión: predicciones simultáneas en el modelo y cola de espera
+MAX_CONCURRENT_PREDICTIONS = int(os.getenv("MAX_CONCURRENT_PREDICTIONS", "4"))
+MAX_QUEUED_PREDICTIONS = int(os.getenv("MAX_QUEUED_PREDICTIONS", "16"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", "2.0"))
@@ -9,31 +9,52 @@ import os
 # Cargar variables de entorno desde .env
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, Query
+# Primero el registro de arranque: mide el resto de importaciones
+from utils.startup import ARRANQUE
+
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
+from contextlib import nullcontext
 from datetime import datetime
+import asyncio
+import hmac
 import logging
-
-from utils.predictor import AQIPredictor
+import math
+import threading
+import time
+
+from utils.http_cache import PredictionCache, etag_coincide
+from utils.metrics import REGISTRY, capturar_tiempos, formatear_server_timing
+from utils.profiling import SamplingProfiler
+from utils.logging_config import configurar_logging
+from utils.admission import ConcurrencyLimiter, RateLimitMiddleware, SaturacionError
+from utils.model_registry import CargaEnCursoError, RegistroModelos, VersionNoEncontradaError
+from config.config import (
+    SERVER_TIMING_ENABLED,
+    PROFILING_ENABLED,
+    PROFILING_TOKEN,
+    STARTUP_MODE,
+    ADMIN_TOKEN,
+    MODEL_WATCH_INTERVAL_SECONDS
+)
 from models.schemas import (
     PredictionRequest, 
     PredictionResponse, 
     HealthStatus,
-    ModelInfo
+    ModelInfo,
+    CargarModeloRequest
 )
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),  # Console
-        logging.FileHandler('api_debug.log', mode='a', encoding='utf-8')  # File (append mode)
-    ]
-)
+# TensorFlow, pandas y sklearn entran con utils.predictor, que solo se importa
+# al cargar el modelo (ver _cargar_predictor)
+if TYPE_CHECKING:
+    from utils.predictor import AQIPredictor
+
+# Configurar logging (cola + hilo escritor: el event loop nunca escribe a disco)
+configurar_logging('api_debug.log')
 
 # Silenciar logs de watchfiles (auto-reload)
 logging.getLogger("watchfiles.main").setLevel(logging.WARNING)
@@ -52,6 +73,10 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Rate limiting por cliente en las rutas de predicción
+# (se registra antes que CORS para que los 429 también lleven cabeceras CORS)
+app.add_middleware(RateLimitMiddleware, prefixes=("/predict",))
+
 # Configurar CORS para permitir requests desde Next.js
 app.add_middleware(
     CORSMiddleware,
@@ -66,18 +91,108 @@ app.add_middleware(
 )
 
 # Inicializar predictor (se carga el modelo al iniciar la API)
-predictor: Optional[AQIPredictor] = None
+predictor: Optional["AQIPredictor"] = None
+
+# Bundle del modelo mapeado en memoria por run_prod.py antes de crear los workers
+bundle_precargado = None
+
+
+def _publicar_predictor(nuevo: "AQIPredictor"):
+    """Las peticiones nuevas usan `nuevo`; las que están en curso conservan el suyo"""
+    global predictor
+    predictor = nuevo
+
+
+# Versiones del modelo: cambio en caliente y rollback (/admin/models)
+registro_modelos = RegistroModelos(al_publicar=_publicar_predictor)
+_tarea_vigilancia = None
+_tareas_admin = set()  # Referencias a las cargas lanzadas en segundo plano
+
+# Cache HTTP de predicciones (ETag / Cache-Control)
+prediction_cache = PredictionCache()
+
+# Límite global de predicciones simultáneas (con cola acotada)
+limitador_predicciones = ConcurrencyLimiter()
+
+
+def _limite_pool_openaq() -> float:
+    """Tamaño del pool de conexiones HTTP hacia OpenAQ (0 si aún no hay sesión)"""
+    if predictor is None or predictor.openaq_fetcher.session is None:
+        return 0
+    return predictor.openaq_fetcher.session.connector.limit
+
+
+REGISTRY.gauge(
+    "aqi_prediction_cache_entries",
+    "Entradas vigentes en la cache de predicciones",
+    lambda: len(prediction_cache)
+)
+REGISTRY.gauge(
+    "aqi_predictions_in_flight",
+    "Predicciones en ejecución",
+    lambda: limitador_predicciones.en_curso
+)
+REGISTRY.gauge(
+    "aqi_predictions_queued",
+    "Predicciones esperando hueco en el modelo",
+    lambda: limitador_predicciones.en_cola
+)
+REGISTRY.gauge(
+    "aqi_upstream_pool_limit",
+    "Conexiones máximas del pool HTTP hacia OpenAQ",
+    _limite_pool_openaq
+)
+
+
+def _cargar_predictor():
+    """
+    Importar las dependencias pesadas, cargar el modelo y calentarlo
+    
+    El predictor solo se publica (y la API pasa a "ready") cuando el modelo ya
+    ha ejecutado un lote ficticio, así la primera petición real no paga el
+    trazado del grafo.
+    """
+    ARRANQUE.estado = "cargando"
+    ARRANQUE.importar()
+    with ARRANQUE.fase("import:predictor"):
+        from utils.predictor import AQIPredictor
+    
+    nuevo = AQIPredictor(bundle=bundle_precargado)
+    with ARRANQUE.fase("calentamiento"):
+        nuevo.calentar()
+    registro_modelos.publicar(nuevo)
+    ARRANQUE.marcar_listo()
+
+
+def _cargar_predictor_en_segundo_plano():
+    try:
+        _cargar_predictor()
+        logger.info("✅ Modelo cargado exitosamente (segundo plano)")
+    except Exception as e:
+        ARRANQUE.marcar_error(e)
+        logger.error(f"❌ Error al cargar el modelo: {e}")
 
 
 @app.on_event("startup")
 async def startup_event():
     """Cargar modelo al iniciar la aplicación"""
-    global predictor
+    global _tarea_vigilancia
+    logger.info(f"🚀 Iniciando API de predicción AQI (STARTUP_MODE={STARTUP_MODE})...")
+    if MODEL_WATCH_INTERVAL_SECONDS > 0:
+        _tarea_vigilancia = asyncio.create_task(registro_modelos.vigilar(MODEL_WATCH_INTERVAL_SECONDS))
+    if STARTUP_MODE == "lazy":
+        # El servidor acepta conexiones ya: /health/live responde y
+        # /health/ready devuelve 503 hasta que el modelo esté calentado
+        threading.Thread(
+            target=_cargar_predictor_en_segundo_plano, name="carga-modelo", daemon=True
+        ).start()
+        return
+    
     try:
-        logger.info("🚀 Iniciando API de predicción AQI...")
-        predictor = AQIPredictor()
+        _cargar_predictor()
         logger.info("✅ Modelo cargado exitosamente")
     except Exception as e:
+        ARRANQUE.marcar_error(e)
         logger.error(f"❌ Error al cargar el modelo: {e}")
         raise
 
@@ -112,6 +227,29 @@ async def health_check():
     )
 
 
+@app.get("/health/live", tags=["Health"])
+async def liveness():
+    """Liveness: el proceso responde (no implica que el modelo esté cargado)"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/health/ready", tags=["Health"])
+async def readiness():
+    """Readiness: modelo cargado y calentado; incluye el desglose del arranque"""
+    resumen = ARRANQUE.resumen()
+    if not ARRANQUE.listo:
+        return JSONResponse(status_code=503, content=resumen)
+    return resumen
+
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Métricas de latencia por etapa y gauges en formato Prometheus"""
+    if not REGISTRY.enabled:
+        raise HTTPException(status_code=404, detail="Métricas desactivadas (METRICS_ENABLED=False)")
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/model/info", response_model=ModelInfo, tags=["Model"])
 async def get_model_info():
     """Obtener información sobre el modelo cargado"""
@@ -121,28 +259,107 @@ async def get_model_info():
     return predictor.get_model_info()
 
 
-@app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
-async def predict_aqi(request: PredictionRequest):
+def _verificar_admin(http_request: Request):
+    """Los endpoints /admin requieren ADMIN_TOKEN en la cabecera X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Administración desactivada (ADMIN_TOKEN vacío)")
+    if not hmac.compare_digest(http_request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Token de administración inválido")
+
+
+def _estado_registro() -> dict:
+    return {
+        "version_activa": registro_modelos.version_activa,
+        "historial": registro_modelos.historial,
+        "carga": registro_modelos.carga,
+        "disponibles": registro_modelos.listar(),
+    }
+
+
+@app.get("/admin/models", tags=["Admin"])
+async def listar_modelos(http_request: Request):
+    """Versiones disponibles en el directorio de modelos, la activa y el historial"""
+    _verificar_admin(http_request)
+    return _estado_registro()
+
+
+@app.post("/admin/models/load", tags=["Admin"])
+async def cargar_modelo(
+    body: CargarModeloRequest,
+    http_request: Request,
+    esperar: bool = Query(False, description="Responder cuando el modelo ya esté publicado")
+):
     """
-    Realizar predicción de AQI para una ubicación específica
+    Cargar y calentar una versión en segundo plano y publicarla sin cortar el servicio
     
-    Args:
-        request: Objeto con latitud, longitud y parámetros opcionales
-        
-    Returns:
-        Predicciones de AQI para diferentes horizontes temporales (3h, 6h, 12h, 24h)
+    Sin `esperar` responde 202 inmediatamente; el progreso se consulta en GET /admin/models.
+    Con varios workers (run_prod.py) solo afecta al worker que atiende la petición:
+    en ese caso conviene MODEL_WATCH_INTERVAL_SECONDS.
     """
-    if predictor is None:
-        raise HTTPException(status_code=503, detail="Modelo no disponible")
+    _verificar_admin(http_request)
+    try:
+        registro_modelos.resolver(body.version)
+    except VersionNoEncontradaError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if registro_modelos.cargando:
+        raise HTTPException(status_code=409, detail="Ya hay una carga de modelo en curso")
+    
+    tarea = asyncio.create_task(registro_modelos.cargar(body.version))
+    if not esperar:
+        _tareas_admin.add(tarea)
+        tarea.add_done_callback(_tareas_admin.discard)
+        await asyncio.sleep(0)  # Dejar que la carga arranque y marque su estado
+        return JSONResponse(status_code=202, content=_estado_registro())
     
+    try:
+        await tarea
+    except CargaEnCursoError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al cargar la versión: {e}")
+    return _estado_registro()
+
+
+@app.post("/admin/models/rollback", tags=["Admin"])
+async def rollback_modelo(http_request: Request):
+    """Volver inmediatamente a la versión anterior (sigue cargada en memoria)"""
+    _verificar_admin(http_request)
+    try:
+        registro_modelos.rollback()
+    except (VersionNoEncontradaError, CargaEnCursoError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _estado_registro()
+
+
+async def _ejecutar_prediccion(
+    request: PredictionRequest,
+    actual: "AQIPredictor",
+    observacion=None
+) -> PredictionResponse:
+    """Ejecutar el modelo si hay capacidad; si no, rechazar rápido con 503"""
+    try:
+        async with limitador_predicciones.admitir():
+            return await _predecir(request, actual, observacion)
+    except SaturacionError as e:
+        logger.warning(f"🚦 Predicción rechazada por saturación: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
+
+
+async def _predecir(request: PredictionRequest, actual: "AQIPredictor", observacion=None) -> PredictionResponse:
+    """Ejecutar el modelo para una solicitud y traducir errores a HTTP"""
     try:
         logger.info(f"📍 Predicción solicitada para: ({request.latitud}, {request.longitud})")
         
         # Realizar predicción
-        resultado = await predictor.predict(
+        resultado = await actual.predict(
             latitud=request.latitud,
             longitud=request.longitud,
-            location_name=request.nombre_ubicacion
+            location_name=request.nombre_ubicacion,
+            observacion=observacion
         )
         
         logger.info(f"✅ Predicción completada para {request.nombre_ubicacion or 'ubicación'}")
@@ -156,8 +373,126 @@ async def predict_aqi(request: PredictionRequest):
         raise HTTPException(status_code=500, detail=f"Error al realizar predicción: {str(e)}")
 
 
+async def _responder_prediccion(
+    request: PredictionRequest,
+    http_request: Request,
+    condicional: bool = True
+) -> Response:
+    """
+    Responder una predicción con semántica de cache HTTP
+    
+    El ETag se deriva de la marca de datos (instante de la última medición
+    de OpenAQ para la celda), la versión del modelo y la celda de la
+    ubicación, así que un If-None-Match válido se responde con 304 sin
+    ejecutar el modelo. Si la marca de la celda ya no está vigente se
+    consultan las mediciones (sin el modelo) y se reutilizan para predecir.
+    """
+    # Una sola lectura del predictor activo: ETag, ejecución y cabecera de
+    # versión corresponden al mismo modelo aunque haya un cambio en medio
+    actual = predictor
+    if actual is None:
+        raise HTTPException(status_code=503, detail="Modelo no disponible")
+    
+    if _perfilado_solicitado(http_request):
+        return await _responder_perfil(request, http_request, actual)
+    
+    celda = prediction_cache.celda(request.latitud, request.longitud)
+    observacion = None
+    marca_datos = prediction_cache.marca_celda(celda)
+    if marca_datos is None:
+        observacion = await actual.observar(request.latitud, request.longitud)
+        marca_datos = prediction_cache.registrar_marca(celda, observacion[1])
+    etag = prediction_cache.build_etag(marca_datos, actual.model_version, celda)
+    entrada = prediction_cache.get(etag)
+    
+    if condicional and etag_coincide(http_request.headers.get("if-none-match"), etag):
+        headers = prediction_cache.headers(etag, marca_datos, entrada, celda)
+        headers["X-Model-Version"] = actual.model_version
+        return Response(status_code=304, headers=headers)
+    
+    tiempos = {}
+    if entrada is None:
+        if observacion is None:
+            # La respuesta debe corresponder a la marca de su ETag: se predice
+            # con las mediciones con las que se calcula la marca
+            observacion = await actual.observar(request.latitud, request.longitud)
+            marca_datos = prediction_cache.registrar_marca(celda, observacion[1])
+            etag = prediction_cache.build_etag(marca_datos, actual.model_version, celda)
+        with capturar_tiempos() if SERVER_TIMING_ENABLED else nullcontext({}) as tiempos:
+            resultado = await _ejecutar_prediccion(request, actual, observacion)
+        entrada = prediction_cache.put(etag, marca_datos, resultado, celda)
+    else:
+        logger.info(f"♻️ Predicción servida desde cache para celda {celda}")
+        resultado = entrada.respuesta.model_copy(update={
+            "ubicacion": {"latitud": request.latitud, "longitud": request.longitud},
+            "nombre_ubicacion": request.nombre_ubicacion
+        })
+    
+    headers = prediction_cache.headers(etag, marca_datos, entrada, celda)
+    headers["X-Model-Version"] = resultado.version_modelo or actual.model_version
+    if SERVER_TIMING_ENABLED:
+        headers["Server-Timing"] = formatear_server_timing(tiempos) if tiempos else 'cache;desc="hit"'
+    
+    return JSONResponse(
+        content=resultado.model_dump(mode="json", by_alias=True),
+        headers=headers
+    )
+
+
+def _perfilado_solicitado(http_request: Request) -> bool:
+    """La petición pide un perfil con ?debug_profile=1 o X-Debug-Profile: 1"""
+    valor = http_request.query_params.get("debug_profile") or http_request.headers.get("x-debug-profile")
+    return bool(valor) and valor.lower() in ("1", "true", "yes")
+
+
+async def _responder_perfil(request: PredictionRequest, http_request: Request, actual: "AQIPredictor") -> Response:
+    """
+    Ejecutar una predicción bajo el perfilador de muestreo
+    
+    Devuelve las pilas colapsadas (texto plano, apto para flamegraph.pl o
+    speedscope) en lugar del JSON, con el desglose por etapa en Server-Timing.
+    Nunca se sirve desde cache: el objetivo es medir la ejecución real.
+    """
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Perfilado desactivado (PROFILING_ENABLED=False)")
+    if PROFILING_TOKEN and not hmac.compare_digest(http_request.headers.get("x-debug-token", ""), PROFILING_TOKEN):
+        raise HTTPException(status_code=403, detail="Token de perfilado inválido")
+    
+    logger.info(f"🩺 Perfilando predicción para ({request.latitud}, {request.longitud})")
+    with capturar_tiempos() as tiempos, SamplingProfiler() as perfil:
+        await _ejecutar_prediccion(request, actual)
+    
+    return PlainTextResponse(
+        perfil.collapsed(),
+        headers={
+            "Server-Timing": formatear_server_timing(tiempos),
+            "X-Profile-Format": "collapsed",
+            "X-Profile-Samples": str(sum(perfil.muestras.values())),
+            "X-Model-Version": actual.model_version,
+            "Cache-Control": "no-store"
+        }
+    )
+
+
+@app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
+async def predict_aqi(request: PredictionRequest, http_request: Request):
+    """
+    Realizar predicción de AQI para una ubicación específica
+    
+    Args:
+        request: Objeto con latitud, longitud y parámetros opcionales
+        
+    Returns:
+        Predicciones de AQI para diferentes horizontes temporales (3h, 6h, 12h, 24h)
+    """
+    # POST no es una petición condicional cacheable: se sirve desde cache
+    # y se devuelven las cabeceras, pero nunca se responde 304
+    return await _responder_prediccion(request, http_request, condicional=False)
+
+
 @app.get("/predict/coordinates", response_model=PredictionResponse, tags=["Prediction"])
 async def predict_by_coordinates(
+    http_request: Request,
     lat: float = Query(..., ge=-90, le=90, description="Latitud (-90 a 90)"),
     lon: float = Query(..., ge=-180, le=180, description="Longitud (-180 a 180)"),
     name: Optional[str] = Query(None, description="Nombre de la ubicación (opcional)")
@@ -173,11 +508,11 @@ async def predict_by_coordinates(
         longitud=lon,
         nombre_ubicacion=name
     )
-    return await predict_aqi(request)
+    return await _responder_prediccion(request, http_request)
 
 
 @app.get("/predict/city/{city_name}", response_model=PredictionResponse, tags=["Prediction"])
-async def predict_by_city(city_name: str):
+async def predict_by_city(city_name: str, http_request: Request):
     """
     Realizar predicción para ciudades predefinidas de Estados Unidos
     
@@ -221,7 +556,7 @@ async def predict_by_city(city_name: str):
         longitud=city["lon"],
         nombre_ubicacion=city["name"]
     )
-    return await predict_aqi(request)
+    return await _responder_prediccion(request, http_request)
 
 
 @app.get("/cities/coverage", tags=["Cities"])
@@ -301,6 +636,10 @@ async def global_exception_handler(request, exc):
     )
 
 
+# Tiempo de importación de la aplicación (sin las dependencias diferidas)
+ARRANQUE.fases["import:app"] = time.perf_counter() - ARRANQUE.inicio
+
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -73,7 +73,15 @@ class HorizontePrediccion(BaseModel):
         None, 
         ge=0, 
         le=1, 
-        description="Nivel de confianza de la predicción (0-1)"
+        description="Fracción de réplicas MC dropout en la misma categoría de AQI (0-1)"
+    )
+    intervalo_inferior: Optional[float] = Field(
+        None,
+        description="Límite inferior del intervalo de AQI (MC_INTERVAL, por defecto 90%)"
+    )
+    intervalo_superior: Optional[float] = Field(
+        None,
+        description="Límite superior del intervalo de AQI"
     )
     contaminantes: Optional[ContaminantesData] = Field(
         None,
@@ -81,6 +89,20 @@ class HorizontePrediccion(BaseModel):
     )
 
 
+class MiembroEnsemble(BaseModel):
+    """Predicción y aportación de un modelo del ensemble"""
+    version: str = Field(..., description="Versión del modelo miembro")
+    peso: float = Field(..., ge=0, le=1, description="Peso normalizado en la media")
+    predicciones: Dict[str, float] = Field(
+        ...,
+        description="AQI predicho por este miembro para cada horizonte"
+    )
+    contribucion: Dict[str, float] = Field(
+        ...,
+        description="Peso * predicción por horizonte (la suma de los miembros es el AQI predicho)"
+    )
+
+
 class PredictionResponse(BaseModel):
     """Modelo para respuesta de predicción"""
     ubicacion: Dict[str, float] = Field(
@@ -119,6 +141,14 @@ class PredictionResponse(BaseModel):
         default=[],
         description="Advertencias o notas sobre la predicción"
     )
+    version_modelo: Optional[str] = Field(
+        None,
+        description="Versión del modelo que generó la predicción"
+    )
+    miembros_ensemble: Optional[List[MiembroEnsemble]] = Field(
+        None,
+        description="Detalle por miembro cuando se sirve un ensemble (ENSEMBLE_MODELS)"
+    )
     
     class Config:
         json_schema_extra = {
@@ -133,12 +163,15 @@ class PredictionResponse(BaseModel):
                         "calidad": "Bueno",
                         "mensaje": "Calidad del aire aceptable",
                         "color": "#00E400",
-                        "confianza": 0.85
+                        "confianza": 0.85,
+                        "intervalo_inferior": 38.1,
+                        "intervalo_superior": 52.7
                     }
                 ],
                 "aqi_actual_estimado": 42.5,
                 "datos_entrada_disponibles": True,
-                "advertencias": []
+                "advertencias": [],
+                "version_modelo": "20251004_111121"
             }
         }
 
@@ -172,6 +205,15 @@ class ModelInfo(BaseModel):
     )
 
 
+class CargarModeloRequest(BaseModel):
+    """Solicitud de carga de una versión del modelo (/admin/models/load)"""
+    version: str = Field(
+        ...,
+        description="Versión (timestamp de entrenamiento) o nombre del bundle .aqib",
+        example="20251004_111121"
+    )
+
+
 class ErrorResponse(BaseModel):
     """Modelo para respuestas de error"""
     error: str = Field(..., description="Tipo de error")
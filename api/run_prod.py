@@ -1,16 +1,155 @@
-"""Script de inicio simple sin auto-reload"""
+"""
+Script de inicio en modo producción (sin auto-reload)
+
+Con --workers N > 1 el proceso padre precarga una sola vez los módulos
+(TensorFlow, pandas, sklearn...) y mapea en memoria el bundle del modelo
+(utils/model_bundle.py), abre el socket y crea N workers con fork(). Los
+workers comparten el código de esos módulos (copy-on-write). Los pesos no se
+comparten: cada worker construye el modelo y los copia del bundle a sus
+variables de TensorFlow, así que su memoria privada no baja con la precarga.
+El padre supervisa los workers y reinicia los que mueran.
+
+Uso:
+    python run_prod.py                 # 1 worker (API_WORKERS)
+    python run_prod.py --workers 4
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
 import uvicorn
 
-if __name__ == "__main__":
+# Asegurarnos de que estamos en el directorio correcto
+api_dir = Path(__file__).parent
+sys.path.insert(0, str(api_dir))
+
+from config.config import API_HOST, API_PORT, API_WORKERS, MODEL_PATH, MODEL_BUNDLE_PATH, ENSEMBLE_MODELS
+
+
+def _crear_socket(host: str, port: int) -> socket.socket:
+    """Socket de escucha compartido por todos los workers"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _ejecutar_worker(app, sock: socket.socket):
+    """Cuerpo de cada worker: un servidor uvicorn sobre el socket heredado"""
+    # Restaurar señales por defecto; uvicorn instala las suyas
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level="info", access_log=False)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _lanzar_worker(app, sock: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _ejecutar_worker(app, sock)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def servir_multiproceso(host: str, port: int, workers: int):
+    """Precargar en el padre, hacer fork de los workers y supervisarlos"""
+    from utils.model_bundle import cargar_bundle, preparar_bundle
+
+    t0 = time.perf_counter()
+    # 1. Bundle del modelo mapeado en memoria (si no se configuró uno, se
+    #    convierten los artefactos sueltos en un subproceso). Cada worker lee
+    #    de él para construir su modelo; con ENSEMBLE_MODELS cada worker mapea
+    #    los bundles de los miembros
+    if ENSEMBLE_MODELS:
+        bundle = None
+    elif MODEL_BUNDLE_PATH:
+        bundle = cargar_bundle(MODEL_BUNDLE_PATH)
+    else:
+        bundle = preparar_bundle(MODEL_PATH)
+
+    # 2. Importar la aplicación y sus dependencias pesadas (main las difiere):
+    #    TensorFlow, pandas, sklearn... quedan en memoria compartida. El modelo
+    #    NO se construye aquí: TensorFlow no admite fork() después de haber
+    #    ejecutado operaciones.
+    import main
+    import utils.predictor  # noqa: F401
+    main.bundle_precargado = bundle
+    print(f"📦 Precarga completada en {time.perf_counter() - t0:.1f}s")
+
+    # 3. Congelar los objetos actuales para que el GC no toque sus páginas
+    #    (cada escritura de refcount/GC rompe el copy-on-write)
+    gc.collect()
+    gc.freeze()
+
+    sock = _crear_socket(host, port)
+    hijos = {_lanzar_worker(main.app, sock): i for i in range(workers)}
+    print(f"👷 {workers} workers iniciados: {sorted(hijos)}")
+
+    parar = False
+
+    def _terminar(signum, frame):
+        nonlocal parar
+        parar = True
+        for pid in list(hijos):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, _terminar)
+    signal.signal(signal.SIGTERM, _terminar)
+
+    while hijos:
+        try:
+            pid, estado = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        indice = hijos.pop(pid, None)
+        if indice is not None and not parar:
+            print(f"⚠️ Worker {pid} terminó (estado {estado}); reiniciando...")
+            hijos[_lanzar_worker(main.app, sock)] = indice
+
+    sock.close()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="API de predicción AQI en modo producción")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Procesos worker (fork)")
+    args = parser.parse_args()
+
     print("🚀 Iniciando API en modo producción (sin auto-reload)...")
-    print("📍 La API estará disponible en: http://localhost:8000")
-    print("📖 Documentación: http://localhost:8000/docs")
+    print(f"📍 La API estará disponible en: http://localhost:{args.port}")
+    print(f"📖 Documentación: http://localhost:{args.port}/docs")
     print("\n⚠️  Presiona CTRL+C para detener el servidor\n")
-    
+
+    if args.workers > 1 and hasattr(os, "fork"):
+        servir_multiproceso(args.host, args.port, args.workers)
+        return
+
+    if args.workers > 1:
+        print("⚠️ fork() no disponible en este sistema (Windows): se usa un único proceso")
+
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=args.host,
+        port=args.port,
         reload=False,  # Sin reload para producción
         log_level="info"
     )
+
+
+if __name__ == "__main__":
+    main_cli()
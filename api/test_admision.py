@@ -0,0 +1,74 @@
+"""
+Script de prueba del rate limiting por cliente (utils/admission.py)
+Comprueba que rotar API keys desconocidas no da buckets nuevos, que una key
+reconocida tiene el suyo y que X-Forwarded-For solo se cree si viene de un
+proxy de confianza. No necesita la API en marcha.
+"""
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+# Agregar directorio api al path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.admission import RateLimiter, RateLimitMiddleware, identificar_cliente
+
+CLAVES = frozenset({"clave-registrada"})
+PROXIES = frozenset({"10.0.0.1"})
+RAFAGA = 5
+
+
+def scope(ip: str, api_key: str = None, reenviado: str = None) -> dict:
+    cabeceras = []
+    if api_key:
+        cabeceras.append((b"x-api-key", api_key.encode()))
+    if reenviado:
+        cabeceras.append((b"x-forwarded-for", reenviado.encode()))
+    return {"type": "http", "path": "/predict/coordinates", "client": (ip, 50000), "headers": cabeceras}
+
+
+async def estados(middleware, scopes) -> list:
+    """Código HTTP de cada petición al pasar por el middleware"""
+    codigos = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    middleware.app = app
+    for s in scopes:
+        async def send(mensaje):
+            if mensaje["type"] == "http.response.start":
+                codigos.append(mensaje["status"])
+        await middleware(s, None, send)
+    return codigos
+
+
+def test_admision():
+    print("🧪 PRUEBA DE RATE LIMITING POR CLIENTE")
+    print("=" * 60)
+
+    # Keys desconocidas: todas cuentan como la IP
+    ids = {identificar_cliente(scope("1.2.3.4", str(uuid.uuid4())), CLAVES, PROXIES) for _ in range(50)}
+    assert ids == {"ip:1.2.3.4"}, ids
+    assert identificar_cliente(scope("1.2.3.4", "clave-registrada"), CLAVES, PROXIES) == "key:clave-registrada"
+    print("✅ Solo las keys de RATE_LIMIT_API_KEYS tienen bucket propio")
+
+    # X-Forwarded-For: se ignora desde un cliente directo, se usa desde el proxy
+    assert identificar_cliente(scope("1.2.3.4", reenviado="9.9.9.9"), CLAVES, PROXIES) == "ip:1.2.3.4"
+    assert identificar_cliente(scope("10.0.0.1", reenviado="9.9.9.9, 5.6.7.8"), CLAVES, PROXIES) == "ip:5.6.7.8"
+    print("✅ X-Forwarded-For solo se cree desde un proxy de confianza")
+
+    # Rotar keys aleatorias en cada petición: se limita igual que sin key
+    middleware = RateLimitMiddleware(None, limiter=RateLimiter(requests_per_minute=1, burst=RAFAGA))
+    codigos = asyncio.run(estados(middleware, [scope("1.2.3.4", str(uuid.uuid4())) for _ in range(RAFAGA + 5)]))
+    print(f"\n📊 {len(codigos)} peticiones con keys aleatorias: {codigos}")
+    assert codigos.count(200) == RAFAGA and codigos.count(429) == 5, codigos
+    print("✅ Rotar keys desconocidas no evita el límite")
+
+    print("\n" + "=" * 60)
+    print("✅ Rate limiting verificado")
+
+
+if __name__ == "__main__":
+    test_admision()
@@ -0,0 +1,68 @@
+"""
+Script de prueba de la cache HTTP de predicciones (utils/http_cache.py)
+Reproduce la secuencia de _responder_prediccion con una estación cuya última
+medición es de hace dos horas (habitual en OpenAQ): la segunda petición no
+debe volver a consultar la fuente, debe salir de la cache y max-age debe ser
+positivo. No necesita la API en marcha.
+"""
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Agregar directorio api al path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.http_cache import PredictionCache
+
+VERSION = "20251004_111121"
+
+
+def peticion(cache: PredictionCache, celda, fecha_datos: datetime, consultas: list):
+    """Una petición al endpoint: (ETag, entrada de cache previa, cabeceras)"""
+    marca = cache.marca_celda(celda)
+    if marca is None:
+        consultas.append(time.time())
+        marca = cache.registrar_marca(celda, fecha_datos)
+    etag = cache.build_etag(marca, VERSION, celda)
+    previa = cache.get(etag)
+    entrada = previa or cache.put(etag, marca, {"aqi": 42}, celda)
+    return etag, previa, cache.headers(etag, marca, entrada, celda)
+
+
+def max_age(cabeceras: dict) -> int:
+    return int(cabeceras["Cache-Control"].split("max-age=")[1])
+
+
+def test_http_cache():
+    print("🧪 PRUEBA DE LA CACHE HTTP CON DATOS ATRASADOS")
+    print("=" * 60)
+
+    cache = PredictionCache(enabled=True, ttl_seconds=300, refresh_seconds=3600)
+    celda = cache.celda(19.43, -99.13)
+    hace_dos_horas = datetime.now(timezone.utc) - timedelta(hours=2)
+    consultas = []
+
+    etag_1, previa_1, cabeceras_1 = peticion(cache, celda, hace_dos_horas, consultas)
+    print(f"\n📊 1ª petición: {cabeceras_1['Cache-Control']} | Last-Modified {cabeceras_1['Last-Modified']}")
+    assert previa_1 is None
+    assert max_age(cabeceras_1) > 0, cabeceras_1
+
+    etag_2, previa_2, cabeceras_2 = peticion(cache, celda, hace_dos_horas, consultas)
+    print(f"📊 2ª petición: {cabeceras_2['Cache-Control']} | consultas a la fuente: {len(consultas)}")
+    assert etag_2 == etag_1
+    assert len(consultas) == 1, "la segunda petición no debe volver a consultar la fuente"
+    assert previa_2 is not None, "la segunda petición debe salir de la cache"
+    assert max_age(cabeceras_2) > 0, cabeceras_2
+    print("✅ Marca reutilizada, respuesta desde cache y max-age positivo")
+
+    # Pasado min(TTL, refresco) desde la consulta se vuelve a preguntar a la fuente
+    assert cache.marca_celda(celda, ahora=consultas[0] + 301) is None
+    print("✅ Se vuelve a consultar la fuente al cumplir el TTL")
+
+    print("\n" + "=" * 60)
+    print("✅ Cache HTTP verificada")
+
+
+if __name__ == "__main__":
+    test_http_cache()
@@ -0,0 +1,86 @@
+"""
+Script de prueba del plegado de escalados (utils/model_folding.py)
+Compara, con datos brutos aleatorios dentro del rango de entrenamiento, la
+ruta clásica (scaler.transform -> modelo -> scaler_y.inverse_transform)
+con el modelo plegado que recibe datos brutos y devuelve AQI.
+No necesita la API en marcha.
+"""
+import sys
+from pathlib import Path
+
+# Agregar directorio api al path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import joblib
+import numpy as np
+
+from config.config import MODEL_PATH, SCALER_PATH, SCALER_Y_PATH, LOOKBACK_HOURS
+from utils.model_bundle import EscaladorAfin
+from utils.model_folding import PlegadoNoSoportadoError, plegar_escaladores
+from utils.predictor import load_model, obtener_custom_objects
+
+TOLERANCIA_AQI = 1e-3  # Diferencia máxima admitida en unidades de AQI
+
+
+def cargar():
+    return load_model(MODEL_PATH, custom_objects=obtener_custom_objects(), compile=False, safe_mode=False)
+
+
+def datos_aleatorios(scaler, n: int, semilla: int = 0) -> np.ndarray:
+    """Ventanas brutas dentro del rango visto en entrenamiento (y un 20% fuera)"""
+    rng = np.random.default_rng(semilla)
+    rango = scaler.data_max_ - scaler.data_min_
+    bajo, alto = scaler.data_min_ - 0.2 * rango, scaler.data_max_ + 0.2 * rango
+    return rng.uniform(bajo, alto, size=(n, LOOKBACK_HOURS, len(bajo))).astype(np.float32)
+
+
+def ruta_clasica(model, scaler, scaler_y, X: np.ndarray) -> np.ndarray:
+    n, t, f = X.shape
+    X_norm = scaler.transform(X.reshape(-1, f)).reshape(n, t, f)
+    return scaler_y.inverse_transform(model.predict(X_norm, verbose=0))
+
+
+def test_plegado():
+    print("🧪 PRUEBA DE PLEGADO DE ESCALADOS")
+    print("=" * 60)
+
+    scaler = joblib.load(SCALER_PATH)
+    scaler_y = joblib.load(SCALER_Y_PATH)
+    X = datos_aleatorios(scaler, 256)
+
+    referencia = ruta_clasica(cargar(), scaler, scaler_y, X)
+
+    for nombre, sx, sy in [
+        ("sklearn MinMaxScaler", scaler, scaler_y),
+        ("EscaladorAfin (bundle)", EscaladorAfin.desde_sklearn(scaler), EscaladorAfin.desde_sklearn(scaler_y)),
+    ]:
+        plegado = plegar_escaladores(cargar(), sx, sy)
+        salida = plegado.predict(X, verbose=0)
+        diferencia = np.abs(salida - referencia).max()
+        relativa = (np.abs(salida - referencia) / np.maximum(np.abs(referencia), 1.0)).max()
+        print(f"\n📊 {nombre}")
+        print(f"   Diferencia máxima: {diferencia:.2e} AQI (relativa {relativa:.2e})")
+        assert diferencia < TOLERANCIA_AQI, f"Diferencia {diferencia} por encima de {TOLERANCIA_AQI}"
+        print("   ✅ Salidas equivalentes")
+
+    # Un scaler con clip no es afín: debe rechazarse sin tocar los pesos
+    model = cargar()
+    pesos = [w.copy() for w in model.get_weights()]
+    scaler_clip = joblib.load(SCALER_PATH)
+    scaler_clip.clip = True
+    try:
+        plegar_escaladores(model, scaler_clip, scaler_y)
+        raise AssertionError("Se esperaba PlegadoNoSoportadoError")
+    except PlegadoNoSoportadoError as e:
+        print(f"\n✅ Rechazo esperado: {e}")
+    assert all(np.array_equal(a, b) for a, b in zip(pesos, model.get_weights()))
+
+    print("\n" + "=" * 60)
+    print("✅ Plegado verificado")
+
+
+if __name__ == "__main__":
+    test_plegado()
@@ -0,0 +1,234 @@
+"""
+Control de admisión de la API
+- Rate limiting por cliente (token bucket por API key reconocida o IP)
+- Límite global de predicciones simultáneas con una cola acotada
+
+Cuando el sistema está saturado se rechaza rápido (429/503 con Retry-After)
+en lugar de dejar crecer la latencia de todas las peticiones.
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import FrozenSet, Optional, Tuple
+
+from config.config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_REQUESTS,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_API_KEYS,
+    TRUSTED_PROXIES,
+    MAX_CONCURRENT_PREDICTIONS,
+    MAX_QUEUED_PREDICTIONS,
+    QUEUE_TIMEOUT_SECONDS
+)
+from utils.metrics import REGISTRY
+
+ADMISSION_REJECTED = REGISTRY.counter(
+    "aqi_admission_rejected_total",
+    "Peticiones rechazadas por el control de admisión",
+    ("reason",)
+)
+
+
+class TokenBucket:
+    """Token bucket clásico: `capacidad` tokens que se reponen a `tasa` por segundo"""
+
+    __slots__ = ("capacidad", "tasa", "tokens", "actualizado")
+
+    def __init__(self, capacidad: float, tasa: float):
+        self.capacidad = capacidad
+        self.tasa = tasa
+        self.tokens = capacidad
+        self.actualizado = time.monotonic()
+
+    def consumir(self) -> Tuple[bool, float]:
+        """
+        Intentar consumir un token
+
+        Returns:
+            (admitido, segundos hasta que haya un token disponible)
+        """
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.actualizado) * self.tasa)
+        self.actualizado = ahora
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.tasa
+
+
+class RateLimiter:
+    """Token buckets por cliente, con un número máximo de clientes en memoria"""
+
+    def __init__(
+        self,
+        requests_per_minute: int = RATE_LIMIT_REQUESTS,
+        burst: int = RATE_LIMIT_BURST,
+        max_clients: int = 10000
+    ):
+        self.capacidad = max(burst, 1)
+        self.tasa = requests_per_minute / 60.0
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def consumir(self, cliente: str) -> Tuple[bool, float]:
+        bucket = self._buckets.get(cliente)
+        if bucket is None:
+            bucket = TokenBucket(self.capacidad, self.tasa)
+            self._buckets[cliente] = bucket
+            if len(self._buckets) > self.max_clients:
+                # El cliente más antiguo sin actividad vuelve a empezar con el bucket lleno
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(cliente)
+        return bucket.consumir()
+
+
+class SaturacionError(Exception):
+    """No hay capacidad para ejecutar otra predicción"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Servidor saturado, reintentar más tarde")
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Límite de predicciones simultáneas con cola acotada
+
+    Hasta `max_concurrent` predicciones se ejecutan a la vez; hasta
+    `max_queued` más esperan como máximo `queue_timeout` segundos. Más allá
+    se rechaza inmediatamente.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_PREDICTIONS,
+        max_queued: int = MAX_QUEUED_PREDICTIONS,
+        queue_timeout: float = QUEUE_TIMEOUT_SECONDS
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.en_curso = 0
+        self.en_cola = 0
+        self._semaforo: Optional[asyncio.Semaphore] = None
+
+    @asynccontextmanager
+    async def admitir(self):
+        """Reservar un hueco para una predicción o lanzar SaturacionError"""
+        if self._semaforo is None:
+            # Crear el semáforo dentro del event loop que lo va a usar
+            self._semaforo = asyncio.Semaphore(self.max_concurrent)
+
+        if self._semaforo.locked():
+            if self.en_cola >= self.max_queued:
+                ADMISSION_REJECTED.inc("queue_full")
+                raise SaturacionError(self.queue_timeout)
+            self.en_cola += 1
+            try:
+                await asyncio.wait_for(self._semaforo.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                ADMISSION_REJECTED.inc("queue_timeout")
+                raise SaturacionError(self.queue_timeout)
+            finally:
+                self.en_cola -= 1
+        else:
+            await self._semaforo.acquire()
+
+        self.en_curso += 1
+        try:
+            yield
+        finally:
+            self.en_curso -= 1
+            self._semaforo.release()
+
+
+def _cabecera(scope, nombre: bytes) -> Optional[str]:
+    for clave, valor in scope.get("headers", []):
+        if clave == nombre and valor:
+            return valor.decode("latin-1")
+    return None
+
+
+def ip_cliente(scope, proxies: FrozenSet[str] = TRUSTED_PROXIES) -> str:
+    """
+    IP del cliente: la del socket, o si viene de un proxy de confianza, la
+    última de X-Forwarded-For que no sea un proxy de confianza (las de más
+    a la izquierda las escribe el cliente y no se pueden creer)
+    """
+    cliente = scope.get("client")
+    ip = cliente[0] if cliente else "desconocido"
+    reenviado = _cabecera(scope, b"x-forwarded-for")
+    if ip in proxies and reenviado:
+        for salto in reversed([s.strip() for s in reenviado.split(",") if s.strip()]):
+            ip = salto
+            if salto not in proxies:
+                break
+    return ip
+
+
+def identificar_cliente(
+    scope,
+    claves: FrozenSet[str] = RATE_LIMIT_API_KEYS,
+    proxies: FrozenSet[str] = TRUSTED_PROXIES
+) -> str:
+    """
+    Clave de rate limiting: la API key si está en RATE_LIMIT_API_KEYS, si no
+    la IP del cliente. Una key desconocida no cuenta: si diera un bucket
+    propio, bastaría con cambiarla en cada petición para saltarse el límite.
+    """
+    clave = _cabecera(scope, b"x-api-key")
+    if clave is not None and clave in claves:
+        return "key:" + clave
+    return "ip:" + ip_cliente(scope, proxies)
+
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI que aplica el rate limiting por cliente
+
+    Solo afecta a las rutas con alguno de los prefijos indicados; el resto
+    (health, docs, métricas) nunca se limita.
+    """
+
+    def __init__(self, app, prefixes: Tuple[str, ...] = ("/predict",), limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.prefixes = prefixes
+        self.limiter = limiter or RateLimiter()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not RATE_LIMIT_ENABLED
+            or scope["type"] != "http"
+            or not scope["path"].startswith(self.prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        admitido, espera = self.limiter.consumir(identificar_cliente(scope))
+        if admitido:
+            await self.app(scope, receive, send)
+            return
+
+        ADMISSION_REJECTED.inc("rate_limit")
+        await responder_rechazo(send, 429, "Demasiadas peticiones", espera)
+
+
+async def responder_rechazo(send, status: int, mensaje: str, retry_after: float):
+    """Enviar una respuesta de rechazo mínima con Retry-After"""
+    cuerpo = json.dumps({"detail": mensaje}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(cuerpo)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": cuerpo})
@@ -0,0 +1,103 @@
+"""
+AQI de la EPA vectorizado: subíndices, AQI total, categoría e inversa
+
+Los breakpoints están en config/aqi_epa.json, la única copia de la tabla:
+la usan la API, los scripts de entrenamiento y el frontend Next.js
+(proyecto_hackathon/src/lib/aqi.js). Cada contaminante se precalcula como
+arrays (concentración baja/alta, AQI bajo/alto, pendiente) y el tramo de
+cada valor se busca con np.searchsorted, así que un array de concentraciones
+se convierte de una vez, sin bucles de Python.
+
+Como indica la EPA, la concentración se trunca a los decimales de la tabla
+antes de buscar el tramo (12.05 µg/m³ de PM2.5 es 12.0, no un hueco entre
+tramos). Por encima del último tramo se devuelve el AQI máximo de la tabla.
+
+Benchmark: python benchmarks/bench_aqi.py
+"""
+
+import json
+from pathlib import Path
+from typing import List, Mapping, Optional
+
+import numpy as np
+
+RUTA_TABLAS = Path(__file__).resolve().parent.parent / "config" / "aqi_epa.json"
+
+
+class TablaAQI:
+    """Breakpoints de un contaminante como arrays (un tramo por posición)"""
+
+    def __init__(self, contaminante: str, unidad: str, decimales: int, tramos: List[List[float]]):
+        self.contaminante = contaminante
+        self.unidad = unidad
+        self.factor = 10.0 ** decimales
+        self.c_bajo, self.c_alto, self.i_bajo, self.i_alto = np.asarray(tramos, dtype=np.float64).T
+        self.pendiente = (self.i_alto - self.i_bajo) / (self.c_alto - self.c_bajo)
+        self._ultimo = len(self.c_alto) - 1
+
+    def subindice(self, concentracion) -> np.ndarray:
+        """AQI de cada concentración (NaN se conserva)"""
+        c = np.clip(np.asarray(concentracion, dtype=np.float64), 0.0, self.c_alto[-1])
+        # Truncado EPA; el épsilon evita que 35.5 * 10 = 354.99999... caiga en el tramo anterior
+        c = np.floor(c * self.factor + 1e-9) / self.factor
+        k = np.minimum(np.searchsorted(self.c_alto, c, side="left"), self._ultimo)
+        return self.i_bajo[k] + self.pendiente[k] * (c - self.c_bajo[k])
+
+    def concentracion(self, aqi) -> np.ndarray:
+        """Inversa: concentración que da cada AQI (el hueco 50-51 se asigna al inicio del tramo superior)"""
+        i = np.clip(np.asarray(aqi, dtype=np.float64), 0.0, self.i_alto[-1])
+        k = np.minimum(np.searchsorted(self.i_alto, i, side="left"), self._ultimo)
+        return self.c_bajo[k] + (np.maximum(i, self.i_bajo[k]) - self.i_bajo[k]) / self.pendiente[k]
+
+
+def _cargar(ruta: Path):
+    with open(ruta, "r", encoding="utf-8") as f:
+        datos = json.load(f)
+    tablas = {
+        nombre: TablaAQI(nombre, t["unidad"], t["decimales"], t["tramos"])
+        for nombre, t in datos["contaminantes"].items()
+    }
+    return tablas, datos["categorias"]
+
+
+TABLAS, CATEGORIAS = _cargar(RUTA_TABLAS)
+# Límite superior (incluido) de cada categoría salvo la última
+LIMITES_CATEGORIAS = np.array([c["hasta"] for c in CATEGORIAS[:-1]], dtype=np.float64)
+
+
+def subindice(contaminante: str, concentracion) -> np.ndarray:
+    """AQI de un contaminante ('PM2.5', 'PM10', 'O3', 'NO2') para un valor o un array"""
+    return TABLAS[contaminante].subindice(concentracion)
+
+
+def aqi_total(concentraciones: Mapping[str, object]) -> np.ndarray:
+    """
+    AQI total: el máximo de los subíndices de los contaminantes presentes
+
+    Args:
+        concentraciones: {contaminante: valor o array}; se ignoran las claves
+            sin tabla y los NaN (NaN solo si faltan todos)
+    """
+    subindices = [subindice(c, v) for c, v in concentraciones.items() if c in TABLAS and v is not None]
+    if not subindices:
+        raise ValueError("No hay ningún contaminante con tabla AQI")
+    with np.errstate(invalid="ignore"):
+        return np.fmax.reduce(np.broadcast_arrays(*subindices)) if len(subindices) > 1 else subindices[0]
+
+
+def concentracion_desde_aqi(contaminante: str, aqi) -> np.ndarray:
+    """Inversa del subíndice: concentración de `contaminante` para cada AQI"""
+    return TABLAS[contaminante].concentracion(aqi)
+
+
+def categoria(aqi, limites: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Índice de categoría de cada AQI (0 = la primera); el límite superior de
+    cada categoría pertenece a ella. `limites` permite otras escalas
+    (por defecto las categorías EPA de aqi_epa.json)
+    """
+    return np.searchsorted(LIMITES_CATEGORIAS if limites is None else limites, aqi, side="left")
+
+
+def nombre_categoria(aqi) -> List[str]:
+    return [CATEGORIAS[k]["nombre"] for k in np.atleast_1d(categoria(aqi))]
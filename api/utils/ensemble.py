@@ -0,0 +1,235 @@
+"""
+Ensemble de generaciones del modelo evaluado en un único grafo
+Cada miembro es un bundle (.aqib) con el escalado plegado en sus pesos, de
+modo que todos reciben las features en bruto y devuelven AQI. Los miembros
+se conectan a una entrada común dentro de un modelo funcional que apila sus
+salidas y calcula la media ponderada: una sola llamada compilada por
+petición en lugar de una llamada predict() por miembro.
+
+Si todos los miembros empiezan por la misma capa recurrente (LSTM o
+Bidirectional(LSTM) con las mismas unidades), esas capas se evalúan como
+una sola LSTMApiladas: los pesos se apilan en un eje de miembros y cada
+paso temporal es un matmul por lotes, así que las 48 iteraciones del bucle
+se pagan una vez en lugar de una por miembro. Cada miembro conserva su
+cabeza (atención y densas) sobre su propia secuencia de estados.
+"""
+
+import logging
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config.config import ENSEMBLE_MODELS, ENSEMBLE_WEIGHTS
+from utils.model_bundle import ModeloBundle, cargar_bundle, construir_modelo, version_modelo
+from utils.model_folding import plegar_escaladores
+
+logger = logging.getLogger(__name__)
+
+
+def version_bundle(bundle: ModeloBundle) -> str:
+    return version_modelo(bundle.metadata, bundle.ruta)
+
+
+def normalizar_pesos(pesos: Optional[Sequence[float]], n: int) -> np.ndarray:
+    """Pesos no negativos que suman 1 (iguales si no se indican)"""
+    if not pesos:
+        return np.full(n, 1.0 / n)
+    pesos = np.asarray(pesos, dtype=np.float64)
+    if len(pesos) != n:
+        raise ValueError(f"Se indicaron {len(pesos)} pesos para {n} modelos")
+    if (pesos < 0).any() or pesos.sum() <= 0:
+        raise ValueError("Los pesos del ensemble deben ser no negativos y no todos cero")
+    return pesos / pesos.sum()
+
+
+# Opciones de la LSTM que deben coincidir para apilar los miembros
+_CLAVES_LSTM = (
+    "units", "activation", "recurrent_activation", "use_bias", "return_sequences",
+    "return_state", "go_backwards", "stateful", "dropout", "recurrent_dropout",
+)
+
+
+def _capa_recurrente(modelo):
+    """Primera capa del modelo si es una LSTM o una Bidirectional(LSTM) concatenada"""
+    import keras
+
+    capa = modelo.layers[1] if len(modelo.layers) > 1 else None
+    if isinstance(capa, keras.layers.Bidirectional):
+        if capa.merge_mode != "concat" or not isinstance(capa.forward_layer, keras.layers.LSTM):
+            return None
+        return capa
+    return capa if isinstance(capa, keras.layers.LSTM) else None
+
+
+def _lstms(capa) -> list:
+    """LSTM internas de la capa: [forward, backward] o [lstm]"""
+    return [capa.forward_layer, capa.backward_layer] if hasattr(capa, "forward_layer") else [capa]
+
+
+def _ramas_apiladas(miembros: Sequence, entrada) -> Optional[list]:
+    """
+    Salida de cada miembro con sus capas recurrentes evaluadas juntas
+
+    Returns:
+        Un tensor (B, H) por miembro, o None si los miembros no empiezan por
+        la misma capa recurrente (se evalúan entonces por separado)
+    """
+    import keras
+    from utils.lstm_apilada import LSTMApiladas
+
+    capas = [_capa_recurrente(m) for m in miembros]
+    if any(c is None for c in capas) or len({type(c) for c in capas}) != 1:
+        return None
+    configs = [tuple(_lstms(c)[0].get_config()[k] for k in _CLAVES_LSTM) for c in capas]
+    config = dict(zip(_CLAVES_LSTM, configs[0]))
+    # LSTMApiladas solo cubre secuencias completas, sin estado ni dropout interno
+    if (len(set(configs)) != 1 or not config["return_sequences"] or config["return_state"]
+            or config["go_backwards"] or config["stateful"] or config["dropout"] or config["recurrent_dropout"]):
+        return None
+
+    apiladas = LSTMApiladas(
+        len(miembros),
+        config["units"],
+        bidireccional=len(_lstms(capas[0])) == 2,
+        activation=config["activation"],
+        recurrent_activation=config["recurrent_activation"],
+        name="lstm_apiladas",
+    )
+    secuencias = apiladas(entrada)  # (M, B, T, salidas)
+
+    pesos = []
+    for direccion in zip(*[_lstms(c) for c in capas]):
+        por_miembro = [l.get_weights() for l in direccion]
+        for k in range(3):
+            if k == 2 and not config["use_bias"]:
+                pesos.append(np.zeros((len(miembros), 4 * config["units"]), dtype=np.float32))
+            else:
+                pesos.append(np.stack([w[k] for w in por_miembro]))
+    apiladas.set_weights(pesos)
+
+    # Cabeza de cada miembro: su submodelo desde la salida de la capa recurrente
+    return [
+        keras.Model(capa.output, miembro.outputs[0], name=f"{miembro.name}_cabeza")(secuencias[i])
+        for i, (miembro, capa) in enumerate(zip(miembros, capas))
+    ]
+
+
+class EnsembleModelos:
+    """
+    Varios modelos fusionados en un solo forward
+
+    Args:
+        bundles: Un bundle por miembro (misma entrada y mismos horizontes)
+        pesos: Peso de cada miembro en la media (se normalizan)
+        custom_objects: Custom objects para reconstruir los modelos
+
+    Atributos:
+        model: Modelo funcional entrada -> media ponderada (B, horizontes),
+            apto para calentar() y para EstimadorMC
+        versiones, pesos: Identificador y peso de cada miembro
+        lstm_apilada: Si las LSTM de los miembros se evalúan en una sola capa
+    """
+
+    def __init__(
+        self,
+        bundles: Sequence[ModeloBundle],
+        pesos: Optional[Sequence[float]] = None,
+        custom_objects: Optional[Dict] = None
+    ):
+        import tensorflow as tf
+        import keras
+
+        if not bundles:
+            raise ValueError("El ensemble necesita al menos un modelo")
+        self.bundles = list(bundles)
+        self.versiones = [version_bundle(b) for b in self.bundles]
+        self.pesos = normalizar_pesos(pesos, len(self.bundles))
+
+        miembros = []
+        for i, bundle in enumerate(self.bundles):
+            modelo = construir_modelo(bundle, custom_objects)
+            # Sin escalado común no se pueden promediar las salidas: el plegado
+            # es obligatorio (PlegadoNoSoportadoError si la arquitectura no lo admite)
+            plegar_escaladores(
+                modelo,
+                bundle.scaler_x,
+                bundle.scaler_y,
+                columna_y=None if bundle.scaler_y is not None else 0
+            )
+            # Los submodelos de un modelo funcional necesitan nombres únicos
+            modelo.name = f"miembro_{i}"
+            miembros.append(modelo)
+
+        formas = {tuple(m.inputs[0].shape[1:]) for m in miembros}
+        salidas = {int(m.outputs[0].shape[-1]) for m in miembros}
+        if len(formas) != 1 or len(salidas) != 1:
+            raise ValueError(f"Los miembros no son compatibles: entradas {formas}, salidas {salidas}")
+
+        entrada = keras.Input(shape=formas.pop(), name="ventana")
+        ramas = _ramas_apiladas(miembros, entrada) if len(miembros) > 1 else None
+        self.lstm_apilada = ramas is not None
+        if ramas is None:
+            ramas = [m(entrada) for m in miembros]
+        apiladas = keras.ops.stack(ramas, axis=1)  # (B, M, H)
+        pesos_t = keras.ops.convert_to_tensor(self.pesos.reshape(1, -1, 1), dtype="float32")
+        media = keras.ops.sum(apiladas * pesos_t, axis=1)  # (B, H)
+
+        self.miembros = miembros
+        self.model = keras.Model(entrada, media, name="ensemble")
+        self._fusionado = keras.Model(entrada, [media, apiladas], name="ensemble_miembros")
+
+        forma = self.model.inputs[0].shape
+
+        @tf.function(input_signature=[tf.TensorSpec([None, forma[1], forma[2]], tf.float32)], reduce_retracing=True)
+        def _evaluar(X):
+            return self._fusionado(X, training=False)
+
+        self._evaluar = _evaluar
+        logger.info(
+            f"🧩 Ensemble de {len(miembros)} modelos"
+            + (" (LSTM apiladas)" if self.lstm_apilada else "") + ": "
+            + ", ".join(f"{v} ({p:.2f})" for v, p in zip(self.versiones, self.pesos))
+        )
+
+    @property
+    def version(self) -> str:
+        return "+".join(self.versiones)
+
+    def predecir(self, X: np.ndarray):
+        """
+        Media ponderada y salida de cada miembro en una sola llamada
+
+        Returns:
+            (media (B, H), miembros (B, M, H)), ambos en AQI
+        """
+        media, miembros = self._evaluar(np.asarray(X, dtype=np.float32))
+        return media.numpy(), miembros.numpy()
+
+    def contribuciones(self, miembros_aqi: np.ndarray) -> np.ndarray:
+        """
+        Aportación de cada miembro a la media: peso * predicción
+
+        Args:
+            miembros_aqi: (M, H) salidas de los miembros para una ventana
+
+        Returns:
+            (M, H); la suma por columnas es la predicción del ensemble
+        """
+        return self.pesos[:, None] * miembros_aqi
+
+
+def _lista(valor: str) -> List[str]:
+    return [v.strip() for v in valor.split(",") if v.strip()]
+
+
+def cargar_ensemble(
+    rutas: Optional[Sequence[str]] = None,
+    pesos: Optional[Sequence[float]] = None,
+    custom_objects: Optional[Dict] = None
+) -> EnsembleModelos:
+    """Ensemble a partir de rutas de bundles (por defecto ENSEMBLE_MODELS / ENSEMBLE_WEIGHTS)"""
+    if rutas is None:
+        rutas = _lista(ENSEMBLE_MODELS)
+    if pesos is None:
+        pesos = [float(p) for p in _lista(ENSEMBLE_WEIGHTS)]
+    return EnsembleModelos([cargar_bundle(r) for r in rutas], pesos, custom_objects)
@@ -0,0 +1,196 @@
+"""
+Cache HTTP de predicciones (ETag, Last-Modified, Cache-Control)
+Las predicciones solo cambian cuando llegan datos nuevos de las fuentes,
+así que se identifican por (marca de datos, versión del modelo, celda).
+La marca de datos es el instante de la última medición obtenida para la
+celda; se recuerda hasta que toca la siguiente publicación (marca +
+UPSTREAM_REFRESH_SECONDS) y a partir de ahí se vuelve a consultar la fuente.
+Si la última medición ya es antigua (estaciones que publican con retraso),
+la siguiente consulta se cuenta desde la última vez que se consultó:
+como mínimo min(TTL, UPSTREAM_REFRESH_SECONDS) después.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Optional, Tuple
+
+from config.config import (
+    CACHE_PREDICTIONS,
+    CACHE_TTL_SECONDS,
+    CACHE_GRID_DEGREES,
+    UPSTREAM_REFRESH_SECONDS
+)
+
+
+class EntradaCache:
+    """Respuesta cacheada junto con sus metadatos de validación"""
+
+    __slots__ = ("etag", "marca_datos", "expira", "respuesta")
+
+    def __init__(self, etag: str, marca_datos: datetime, expira: float, respuesta):
+        self.etag = etag
+        self.marca_datos = marca_datos
+        self.expira = expira
+        self.respuesta = respuesta
+
+
+class PredictionCache:
+    """Cache en memoria de predicciones indexada por ETag"""
+
+    def __init__(
+        self,
+        enabled: bool = CACHE_PREDICTIONS,
+        ttl_seconds: int = CACHE_TTL_SECONDS,
+        grid_degrees: float = CACHE_GRID_DEGREES,
+        refresh_seconds: int = UPSTREAM_REFRESH_SECONDS,
+        max_entries: int = 1024
+    ):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.grid_degrees = grid_degrees
+        self.refresh_seconds = refresh_seconds
+        self.max_entries = max_entries
+        self._entradas: "OrderedDict[str, EntradaCache]" = OrderedDict()
+        # celda -> (marca de datos, instante en que se consultó la fuente)
+        self._marcas: "OrderedDict[Tuple[float, float], Tuple[datetime, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def celda(self, latitud: float, longitud: float) -> Tuple[float, float]:
+        """Ajustar coordenadas a la celda de la rejilla de cache"""
+        paso = self.grid_degrees
+        return (
+            round(round(latitud / paso) * paso, 6),
+            round(round(longitud / paso) * paso, 6)
+        )
+
+    def marca_celda(self, celda: Tuple[float, float], ahora: Optional[float] = None) -> Optional[datetime]:
+        """
+        Marca de datos conocida de la celda, o None si hay que consultar la
+        fuente (nunca consultada o ya debería haber datos más nuevos)
+        """
+        ahora = time.time() if ahora is None else ahora
+        with self._lock:
+            registro = self._marcas.get(celda)
+        if registro is None or self._siguiente_consulta(*registro) <= ahora:
+            return None
+        return registro[0]
+
+    def _siguiente_consulta(self, marca: datetime, consultado: float) -> float:
+        """
+        Cuándo volver a consultar la fuente: en la siguiente publicación tras
+        la marca, pero nunca antes de min(TTL, refresco) desde la consulta
+        """
+        return max(
+            marca.timestamp() + self.refresh_seconds,
+            consultado + min(self.ttl_seconds, self.refresh_seconds)
+        )
+
+    def registrar_marca(
+        self,
+        celda: Tuple[float, float],
+        fecha_datos: Optional[datetime],
+        ahora: Optional[float] = None
+    ) -> datetime:
+        """
+        Guardar la marca de datos de una celda a partir de la última medición
+
+        Sin mediciones reales (datos estimados) se usa el inicio del periodo
+        de publicación actual, que es lo más reciente que podría haber.
+        """
+        ahora = time.time() if ahora is None else ahora
+        if fecha_datos is None:
+            marca = datetime.fromtimestamp(ahora - (ahora % self.refresh_seconds), tz=timezone.utc)
+        else:
+            # Last-Modified tiene resolución de segundos y no puede estar en el futuro
+            marca = min(fecha_datos.astimezone(timezone.utc), datetime.fromtimestamp(ahora, tz=timezone.utc))
+            marca = marca.replace(microsecond=0)
+        with self._lock:
+            self._marcas[celda] = (marca, ahora)
+            self._marcas.move_to_end(celda)
+            while len(self._marcas) > self.max_entries:
+                self._marcas.popitem(last=False)
+        return marca
+
+    def build_etag(self, marca_datos: datetime, model_version: str, celda: Tuple[float, float]) -> str:
+        """
+        Derivar el ETag de una predicción
+
+        Es débil (W/) porque dentro de una misma celda solo cambian
+        las etiquetas de ubicación, no el contenido de la predicción
+        """
+        clave = f"{marca_datos.isoformat()}|{model_version}|{celda[0]:.6f},{celda[1]:.6f}"
+        return 'W/"' + hashlib.sha1(clave.encode("utf-8")).hexdigest()[:20] + '"'
+
+    def _expiracion(self, marca_datos: datetime, creado: float,
+                    celda: Optional[Tuple[float, float]] = None) -> float:
+        """La entrada vence al cumplir el TTL o cuando toca volver a consultar la fuente"""
+        consultado = creado
+        if celda is not None:
+            with self._lock:
+                registro = self._marcas.get(celda)
+            if registro is not None and registro[0] == marca_datos:
+                consultado = registro[1]
+        return min(creado + self.ttl_seconds, self._siguiente_consulta(marca_datos, consultado))
+
+    def get(self, etag: str) -> Optional[EntradaCache]:
+        """Obtener una entrada vigente (None si no existe o expiró)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entrada = self._entradas.get(etag)
+            if entrada is None:
+                return None
+            if entrada.expira <= time.time():
+                del self._entradas[etag]
+                return None
+            self._entradas.move_to_end(etag)
+            return entrada
+
+    def put(self, etag: str, marca_datos: datetime, respuesta,
+            celda: Optional[Tuple[float, float]] = None) -> EntradaCache:
+        """Guardar una respuesta (si la cache está desactivada solo la envuelve)"""
+        ahora = time.time()
+        entrada = EntradaCache(etag, marca_datos, self._expiracion(marca_datos, ahora, celda), respuesta)
+        if not self.enabled:
+            return entrada
+        with self._lock:
+            self._entradas[etag] = entrada
+            self._entradas.move_to_end(etag)
+            while len(self._entradas) > self.max_entries:
+                self._entradas.popitem(last=False)
+        return entrada
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def headers(self, etag: str, marca_datos: datetime, entrada: Optional[EntradaCache] = None,
+                celda: Optional[Tuple[float, float]] = None) -> Dict[str, str]:
+        """Cabeceras de validación y frescura para una predicción"""
+        ahora = time.time()
+        expira = entrada.expira if entrada is not None else self._expiracion(marca_datos, ahora, celda)
+        max_age = max(int(expira - ahora), 0)
+        return {
+            "ETag": etag,
+            "Last-Modified": format_datetime(marca_datos, usegmt=True),
+            "Cache-Control": f"public, max-age={max_age}",
+        }
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110, sección 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    objetivo = etag[2:] if etag.startswith("W/") else etag
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == objetivo:
+            return True
+    return False
@@ -0,0 +1,176 @@
+"""
+Configuración de logging no bloqueante para la API
+Los handlers de consola y fichero se ejecutan en un hilo escritor; el event
+loop solo encola registros. Los logs rutinarios (INFO y menos) del camino
+caliente se limitan por punto de emisión para no saturar la cola.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from config.config import LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_RATE_LIMIT_PER_SECOND
+
+# Atributos estándar de LogRecord: todo lo demás viene de extra={...}
+_ATRIBUTOS_ESTANDAR = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional["QueueHandlerNoBloqueante"] = None
+
+
+class QueueHandlerNoBloqueante(logging.handlers.QueueHandler):
+    """QueueHandler que descarta (y cuenta) registros si la cola está llena"""
+
+    def __init__(self, cola: queue.Queue):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Fijar el mensaje ahora (los args pueden mutar antes de escribirse),
+        # pero dejar el formateo completo y las trazas al hilo escritor
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class FiltroLimiteTasa(logging.Filter):
+    """
+    Limitar los registros rutinarios a N por segundo y punto de emisión
+
+    WARNING o superior siempre pasa. Al reabrir la ventana, el primer
+    registro que pasa indica cuántos se suprimieron.
+    """
+
+    def __init__(self, por_segundo: float = LOG_RATE_LIMIT_PER_SECOND):
+        super().__init__()
+        self.por_segundo = por_segundo
+        self._ventanas: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.por_segundo <= 0 or record.levelno >= logging.WARNING:
+            return True
+        clave = (record.name, record.lineno)
+        ahora = time.monotonic()
+        with self._lock:
+            # [inicio de la ventana, emitidos, suprimidos]
+            ventana = self._ventanas.get(clave)
+            if ventana is None or ahora - ventana[0] >= 1.0:
+                suprimidos = ventana[2] if ventana else 0
+                self._ventanas[clave] = [ahora, 1, 0]
+                if suprimidos:
+                    record.suprimidos = suprimidos
+                return True
+            if ventana[1] < self.por_segundo:
+                ventana[1] += 1
+                return True
+            ventana[2] += 1
+            return False
+
+
+class FormateadorJSON(logging.Formatter):
+    """Una línea JSON por evento, incluyendo los campos de extra={...}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        evento = {
+            "ts": self.formatTime(record),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_ESTANDAR:
+                evento[clave] = valor
+        if record.exc_info:
+            evento["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+class FormateadorTexto(logging.Formatter):
+    """Formato de texto clásico, añadiendo los campos estructurados al final"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        texto = super().format(record)
+        campos = {k: v for k, v in vars(record).items() if k not in _ATRIBUTOS_ESTANDAR}
+        if campos:
+            texto += " | " + " ".join(f"{k}={v}" for k, v in campos.items())
+        return texto
+
+
+def configurar_logging(archivo: Optional[str] = "api_debug.log") -> QueueHandlerNoBloqueante:
+    """
+    Configurar el logger raíz con un QueueHandler y un hilo escritor
+
+    Returns:
+        El QueueHandler instalado (expone el contador de descartados)
+    """
+    global _listener, _handler
+
+    if LOG_FORMAT == "json":
+        formateador: logging.Formatter = FormateadorJSON()
+    else:
+        formateador = FormateadorTexto('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    destinos = [logging.StreamHandler()]  # Console
+    if archivo:
+        destinos.append(logging.FileHandler(archivo, mode='a', encoding='utf-8'))  # File (append mode)
+    for destino in destinos:
+        destino.setFormatter(formateador)
+
+    cola: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = QueueHandlerNoBloqueante(cola)
+    handler.addFilter(FiltroLimiteTasa())
+
+    raiz = logging.getLogger()
+    for anterior in list(raiz.handlers):
+        raiz.removeHandler(anterior)
+    raiz.addHandler(handler)
+    raiz.setLevel(LOG_LEVEL)
+
+    if _listener is not None:
+        _listener.stop()
+    _listener = logging.handlers.QueueListener(cola, *destinos, respect_handler_level=True)
+    _listener.start()
+    _handler = handler
+    atexit.register(detener_logging)
+
+    return handler
+
+
+def _reiniciar_tras_fork():
+    """
+    Los procesos hijos (workers de run_prod.py) no heredan el hilo escritor:
+    se crea una cola nueva (la heredada pudo quedar con el lock tomado) y un
+    listener propio sobre los mismos destinos.
+    """
+    global _listener
+    if _listener is None or _handler is None:
+        return
+    cola: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _handler.queue = cola
+    _listener = logging.handlers.QueueListener(cola, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reiniciar_tras_fork)
+
+
+def detener_logging():
+    """Vaciar la cola y detener el hilo escritor"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
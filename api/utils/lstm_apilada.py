@@ -0,0 +1,99 @@
+"""
+Varias LSTM independientes evaluadas como una sola capa
+Los pesos de M LSTM con las mismas unidades se apilan en un eje de
+miembros y cada paso del bucle temporal es un único matmul por lotes
+(M, B, u) x (M, u, 4u): el mismo cómputo que M capas por separado, pero
+las iteraciones del bucle (y su coste fijo por op) se pagan una vez.
+"""
+
+import tensorflow as tf
+from tensorflow.keras import activations, layers
+
+
+class LSTMApiladas(layers.Layer):
+    """
+    M LSTM (o Bidirectional(LSTM) concatenadas) en paralelo sobre la misma entrada
+
+    Args:
+        miembros: Número de LSTM apiladas (M)
+        unidades: Unidades de cada LSTM
+        bidireccional: Si cada miembro es Bidirectional(LSTM, merge_mode="concat")
+        activation, recurrent_activation: Como en keras.layers.LSTM
+
+    Entrada (B, T, F) con T conocido; salida (M, B, T, u) o (M, B, T, 2u).
+    Pesos por dirección con el orden de puertas de Keras (i, f, c, o):
+    kernel (M, F, 4u), kernel recurrente (M, u, 4u) y bias (M, 4u).
+    """
+
+    def __init__(self, miembros, unidades, bidireccional=False, activation="tanh",
+                 recurrent_activation="sigmoid", **kwargs):
+        super(LSTMApiladas, self).__init__(**kwargs)
+        self.miembros = miembros
+        self.unidades = unidades
+        self.bidireccional = bidireccional
+        self.activation = activations.get(activation)
+        self.recurrent_activation = activations.get(recurrent_activation)
+
+    def build(self, input_shape):
+        """
+        Construir los pesos de cada dirección
+
+        Args:
+            input_shape: (batch_size, timesteps, features)
+        """
+        m, u, f = self.miembros, self.unidades, input_shape[-1]
+        self.direcciones = []
+        for nombre in (["forward", "backward"] if self.bidireccional else ["forward"]):
+            self.direcciones.append((
+                self.add_weight(name=f"{nombre}_kernel", shape=(m, f, 4 * u), initializer="zeros"),
+                self.add_weight(name=f"{nombre}_recurrent_kernel", shape=(m, u, 4 * u), initializer="zeros"),
+                self.add_weight(name=f"{nombre}_bias", shape=(m, 4 * u), initializer="zeros"),
+            ))
+        super(LSTMApiladas, self).build(input_shape)
+
+    def _recorrer(self, inputs, kernel, recurrente, bias, hacia_atras):
+        """Estados ocultos (M, B, T, u) de una dirección, alineados con la entrada"""
+        pasos = inputs.shape[1]
+        # Proyección de la entrada de todos los pasos de una vez: (M, B, T, 4u)
+        xz = tf.einsum("btf,mfg->mbtg", inputs, kernel) + bias[:, None, None, :]
+        h = tf.zeros([self.miembros, tf.shape(inputs)[0], self.unidades], dtype=inputs.dtype)
+        c = h
+        salidas = [None] * pasos
+        # Bucle desenrollado: T es fijo (LOOKBACK_HOURS) y evita el while_loop
+        for t in (reversed(range(pasos)) if hacia_atras else range(pasos)):
+            z = xz[:, :, t] + tf.matmul(h, recurrente)
+            i, f, g, o = tf.split(z, 4, axis=-1)
+            c = self.recurrent_activation(f) * c + self.recurrent_activation(i) * self.activation(g)
+            h = self.recurrent_activation(o) * self.activation(c)
+            salidas[t] = h
+        return tf.stack(salidas, axis=2)
+
+    def call(self, inputs):
+        """
+        Args:
+            inputs: Tensor (batch_size, timesteps, features)
+
+        Returns:
+            Secuencias de estados de cada miembro (M, batch_size, timesteps, salidas)
+        """
+        secuencias = [
+            self._recorrer(inputs, *pesos, hacia_atras=k == 1)
+            for k, pesos in enumerate(self.direcciones)
+        ]
+        return tf.concat(secuencias, axis=-1) if len(secuencias) > 1 else secuencias[0]
+
+    def compute_output_shape(self, input_shape):
+        salidas = self.unidades * (2 if self.bidireccional else 1)
+        return (self.miembros, input_shape[0], input_shape[1], salidas)
+
+    def get_config(self):
+        """Configuración para serialización"""
+        config = super(LSTMApiladas, self).get_config()
+        config.update({
+            "miembros": self.miembros,
+            "unidades": self.unidades,
+            "bidireccional": self.bidireccional,
+            "activation": activations.serialize(self.activation),
+            "recurrent_activation": activations.serialize(self.recurrent_activation),
+        })
+        return config
@@ -0,0 +1,113 @@
+"""
+Estimación de incertidumbre con Monte-Carlo dropout en una sola pasada
+En lugar de K llamadas al modelo con dropout activo, la ventana de entrada
+se replica K veces a lo largo del batch y se ejecuta una única llamada con
+training=True: cada réplica recibe una máscara de dropout distinta. El
+coste es el de un batch de K, no el de K llamadas.
+"""
+
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+
+from config.config import MC_SAMPLES, MC_INTERVAL, AQI_CATEGORY_LIMITS
+from utils.aqi import categoria
+
+logger = logging.getLogger(__name__)
+
+
+def _capas(model):
+    """Capas del modelo, entrando en los submodelos (p. ej. miembros de un ensemble)"""
+    for capa in model.layers:
+        if hasattr(capa, "layers"):
+            yield from _capas(capa)
+        else:
+            yield capa
+
+
+def _tiene_dropout(model) -> bool:
+    for capa in _capas(model):
+        interna = getattr(capa, "forward_layer", capa)
+        if capa.__class__.__name__ in ("Dropout", "SpatialDropout1D", "GaussianDropout"):
+            return True
+        if getattr(interna, "dropout", 0) or getattr(interna, "recurrent_dropout", 0):
+            return True
+    return False
+
+
+class EstimadorMC:
+    """
+    K réplicas estocásticas del modelo en un único forward
+
+    Args:
+        model: Modelo Keras con al menos una capa de dropout
+        muestras: Réplicas K por ventana
+        intervalo: Cobertura del intervalo central (0.9 -> percentiles 5 y 95)
+    """
+
+    def __init__(self, model, muestras: int = MC_SAMPLES, intervalo: float = MC_INTERVAL):
+        import tensorflow as tf
+
+        nombres = {capa.__class__.__name__ for capa in _capas(model)}
+        if "BatchNormalization" in nombres:
+            # training=True cambiaría también las estadísticas de normalización
+            raise ValueError("MC dropout no soportado con BatchNormalization")
+        if not _tiene_dropout(model):
+            raise ValueError("El modelo no tiene capas de dropout")
+
+        self.model = model
+        self.muestras = muestras
+        self.intervalo = intervalo
+        forma = model.inputs[0].shape
+
+        @tf.function(input_signature=[tf.TensorSpec([None, forma[1], forma[2]], tf.float32)], reduce_retracing=True)
+        def _replicas(X):
+            # (B, T, F) -> (K*B, T, F): réplica k de la ventana b en la fila k*B + b
+            lote = tf.tile(X, [self.muestras, 1, 1])
+            return model(lote, training=True)
+
+        self._replicas = _replicas
+
+    def muestrear(self, X: np.ndarray) -> np.ndarray:
+        """
+        Salidas de las K réplicas
+
+        Returns:
+            Array (K, B, salidas), en la escala de salida del modelo
+        """
+        X = np.asarray(X, dtype=np.float32)
+        salida = self._replicas(X).numpy()
+        return salida.reshape(self.muestras, X.shape[0], -1)
+
+    def resumir(self, muestras_aqi: np.ndarray, aqi_puntual: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Confianza e intervalo por horizonte a partir de las muestras en AQI
+
+        Args:
+            muestras_aqi: (K, horizontes) para una ventana
+            aqi_puntual: (horizontes,) predicción determinista
+
+        La confianza es la fracción de réplicas que caen en la misma categoría
+        de AQI que la predicción puntual.
+        """
+        alfa = (1 - self.intervalo) / 2
+        inferior, superior = np.quantile(muestras_aqi, [alfa, 1 - alfa], axis=0)
+        coincide = categoria(muestras_aqi, AQI_CATEGORY_LIMITS) == categoria(aqi_puntual, AQI_CATEGORY_LIMITS)[None, :]
+        return {
+            "confianza": coincide.mean(axis=0),
+            "desviacion": muestras_aqi.std(axis=0),
+            "inferior": inferior,
+            "superior": superior,
+        }
+
+
+def crear_estimador(model, muestras: int = MC_SAMPLES) -> Optional[EstimadorMC]:
+    """EstimadorMC, o None si está desactivado o el modelo no lo admite"""
+    if muestras <= 0:
+        return None
+    try:
+        return EstimadorMC(model, muestras)
+    except ValueError as e:
+        logger.warning(f"⚠️ Incertidumbre MC desactivada: {e}")
+        return None
@@ -0,0 +1,259 @@
+"""
+Métricas de latencia en formato Prometheus
+Histogramas por etapa de predicción y por llamada a servicios externos,
+más gauges calculados en el momento del scrape
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from config.config import METRICS_ENABLED
+
+# Buckets en segundos: desde 1 ms (etapas numpy) hasta 10 s (timeouts de OpenAQ)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _formatear_etiquetas(nombres: Tuple[str, ...], valores: Tuple[str, ...], extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor))
+
+
+class Histogram:
+    """Histograma acumulativo con etiquetas (equivalente al de prometheus_client)"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        """Registrar una observación (en segundos)"""
+        indice = bisect_left(self.buckets, value)
+        with self._lock:
+            serie = self._series.get(labels)
+            if serie is None:
+                # [conteos por bucket (+Inf al final), suma, total]
+                serie = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[labels] = serie
+            serie[0][indice] += 1
+            serie[1] += value
+            serie[2] += 1
+
+    def render(self) -> List[str]:
+        lineas = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        for labels, conteos, suma, total in sorted(series):
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += conteo
+                etiquetas = _formatear_etiquetas(self.labelnames, labels, f'le="{_formatear_numero(limite)}"')
+                lineas.append(f"{self.name}_bucket{etiquetas} {acumulado}")
+            etiquetas = _formatear_etiquetas(self.labelnames, labels)
+            lineas.append(f"{self.name}_sum{etiquetas} {_formatear_numero(suma)}")
+            lineas.append(f"{self.name}_count{etiquetas} {total}")
+        return lineas
+
+
+class Counter:
+    """Contador monótono con etiquetas"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._valores[labels] = self._valores.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lineas = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for labels, valor in valores:
+            lineas.append(f"{self.name}{_formatear_etiquetas(self.labelnames, labels)} {_formatear_numero(valor)}")
+        return lineas
+
+
+class Gauge:
+    """Gauge cuyo valor se calcula al hacer scrape (callback)"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Union[float, Dict[Tuple[str, ...], float]]],
+        labelnames: Tuple[str, ...] = ()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        lineas = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        try:
+            valor = self.callback()
+        except Exception:
+            # Un gauge roto no debe tumbar el scrape completo
+            return lineas
+        if isinstance(valor, dict):
+            for labels, v in sorted(valor.items()):
+                lineas.append(f"{self.name}{_formatear_etiquetas(self.labelnames, labels)} {_formatear_numero(v)}")
+        else:
+            lineas.append(f"{self.name} {_formatear_numero(valor)}")
+        return lineas
+
+
+class MetricsRegistry:
+    """Registro de métricas expuesto en /metrics"""
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._metricas: Dict[str, Union[Histogram, Counter, Gauge]] = {}
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        if name not in self._metricas:
+            self._metricas[name] = Histogram(name, documentation, labelnames, buckets)
+        return self._metricas[name]
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        if name not in self._metricas:
+            self._metricas[name] = Counter(name, documentation, labelnames)
+        return self._metricas[name]
+
+    def gauge(self, name: str, documentation: str, callback, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        """Registrar (o reemplazar) un gauge calculado por callback"""
+        self._metricas[name] = Gauge(name, documentation, callback, labelnames)
+        return self._metricas[name]
+
+    def render(self) -> str:
+        """Exposición en formato de texto Prometheus 0.0.4"""
+        lineas = []
+        for metrica in self._metricas.values():
+            lineas.extend(metrica.render())
+        return "\n".join(lineas) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "aqi_predict_stage_seconds",
+    "Latencia de cada etapa de AQIPredictor.predict",
+    ("stage",)
+)
+
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "aqi_upstream_request_seconds",
+    "Latencia de las llamadas a servicios externos",
+    ("upstream", "endpoint", "status")
+)
+
+_upstream_en_curso: Dict[Tuple[str, ...], int] = {}
+
+REGISTRY.gauge(
+    "aqi_upstream_requests_in_flight",
+    "Peticiones a servicios externos en curso",
+    lambda: {k: v for k, v in _upstream_en_curso.items()},
+    ("upstream",)
+)
+
+
+# Duraciones por etapa de la petición en curso (para Server-Timing)
+_tiempos_peticion: ContextVar[Optional[Dict[str, float]]] = ContextVar("tiempos_peticion", default=None)
+
+
+@contextmanager
+def capturar_tiempos() -> Iterator[Dict[str, float]]:
+    """
+    Recoger las duraciones (segundos) de las etapas ejecutadas dentro del bloque
+
+    Usa una ContextVar, así que cada petición (tarea asyncio) ve solo sus etapas.
+    """
+    tiempos: Dict[str, float] = {}
+    token = _tiempos_peticion.set(tiempos)
+    try:
+        yield tiempos
+    finally:
+        _tiempos_peticion.reset(token)
+
+
+def formatear_server_timing(tiempos: Dict[str, float]) -> str:
+    """Cabecera Server-Timing (duraciones en milisegundos)"""
+    return ", ".join(f"{etapa};dur={duracion * 1000:.2f}" for etapa, duracion in tiempos.items())
+
+
+@contextmanager
+def medir_etapa(etapa: str) -> Iterator[None]:
+    """Medir la duración de una etapa de predicción"""
+    tiempos = _tiempos_peticion.get()
+    if not REGISTRY.enabled and tiempos is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        if REGISTRY.enabled:
+            STAGE_LATENCY.observe(duracion, etapa)
+        if tiempos is not None:
+            tiempos[etapa] = tiempos.get(etapa, 0.0) + duracion
+
+
+class LlamadaExterna:
+    """Resultado mutable de una llamada medida (permite fijar el status)"""
+
+    __slots__ = ("status",)
+
+    def __init__(self):
+        self.status = "error"
+
+
+@contextmanager
+def medir_llamada(upstream: str, endpoint: str) -> Iterator[LlamadaExterna]:
+    """
+    Medir una llamada a un servicio externo
+
+    Uso:
+        with medir_llamada("openaq", "locations") as llamada:
+            async with session.get(...) as response:
+                llamada.status = str(response.status)
+    """
+    llamada = LlamadaExterna()
+    if not REGISTRY.enabled:
+        yield llamada
+        return
+    clave = (upstream,)
+    _upstream_en_curso[clave] = _upstream_en_curso.get(clave, 0) + 1
+    inicio = time.perf_counter()
+    try:
+        yield llamada
+    except Exception as e:
+        llamada.status = type(e).__name__
+        raise
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - inicio, upstream, endpoint, llamada.status)
+        _upstream_en_curso[clave] -= 1
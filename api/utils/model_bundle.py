@@ -0,0 +1,385 @@
+"""
+Bundle de modelo: un único fichero versionado y mapeable en memoria
+Sustituye a los artefactos sueltos (.keras, scaler_*.pkl, scaler_y_*.pkl,
+metadata_*.pkl). Los pesos se guardan en crudo, alineados, de modo que el
+cargador los mapea con np.memmap sin copiarlos (los workers de run_prod.py
+comparten así las mismas páginas), y los scalers se reducen a sus
+parámetros afines, sin pickle.
+
+Formato (little endian):
+    0   8 bytes  magia b"AQIBUNDL"
+    8   uint32   versión del formato
+    12  uint32   reservado (0)
+    16  uint64   longitud de la cabecera JSON
+    24  ...      cabecera JSON (utf-8)
+    ... relleno hasta múltiplo de 64
+    datos: arrays float32 contiguos, cada uno alineado a 64 bytes
+
+La cabecera incluye la arquitectura (model.to_json()), el índice de arrays
+(forma, desplazamiento relativo al inicio de datos y CRC32), los parámetros
+de los scalers, los metadatos del entrenamiento y el origen de la conversión.
+
+Uso:
+    python -m utils.model_bundle                       # convertir los artefactos de config
+    python -m utils.model_bundle --salida modelo.aqib
+    python -m utils.model_bundle --verificar modelo.aqib
+"""
+
+import argparse
+import json
+import logging
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIA = b"AQIBUNDL"
+VERSION_FORMATO = 1
+ALINEACION = 64
+_PREAMBULO = struct.Struct("<8sIIQ")
+
+
+class BundleInvalidoError(ValueError):
+    """El fichero no es un bundle válido o está corrupto"""
+
+
+class EscaladorAfin:
+    """
+    Escalado afín por feature: X_norm = X * scale_ + min_
+
+    Mismos atributos y semántica que sklearn.preprocessing.MinMaxScaler
+    (transform / inverse_transform), sin depender de sklearn ni de pickle.
+    """
+
+    def __init__(self, min_: np.ndarray, scale_: np.ndarray, clip: bool = False,
+                 feature_range: Tuple[float, float] = (0.0, 1.0)):
+        self.min_ = np.asarray(min_, dtype=np.float64)
+        self.scale_ = np.asarray(scale_, dtype=np.float64)
+        self.clip = clip
+        self.feature_range = tuple(feature_range)
+
+    @property
+    def n_features_in_(self) -> int:
+        return len(self.scale_)
+
+    @classmethod
+    def desde_sklearn(cls, scaler) -> "EscaladorAfin":
+        return cls(scaler.min_, scaler.scale_, bool(getattr(scaler, "clip", False)),
+                   tuple(getattr(scaler, "feature_range", (0.0, 1.0))))
+
+    @classmethod
+    def desde_dict(cls, datos: Dict) -> "EscaladorAfin":
+        return cls(datos["min_"], datos["scale_"], datos.get("clip", False),
+                   tuple(datos.get("feature_range", (0.0, 1.0))))
+
+    def a_dict(self) -> Dict:
+        return {
+            "min_": self.min_.tolist(),
+            "scale_": self.scale_.tolist(),
+            "clip": self.clip,
+            "feature_range": list(self.feature_range),
+        }
+
+    def transform(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64) * self.scale_ + self.min_
+        if self.clip:
+            np.clip(X, self.feature_range[0], self.feature_range[1], out=X)
+        return X
+
+    def inverse_transform(self, X) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float64) - self.min_) / self.scale_
+
+
+class ModeloBundle:
+    """Contenido de un bundle; `arrays` son vistas de solo lectura sobre el fichero"""
+
+    def __init__(
+        self,
+        arquitectura: str,
+        arrays: List[np.ndarray],
+        scaler_x: EscaladorAfin,
+        scaler_y: Optional[EscaladorAfin],
+        metadata: Dict,
+        origen: Dict,
+        ruta: Optional[Path] = None
+    ):
+        self.arquitectura = arquitectura
+        self.arrays = arrays
+        self.scaler_x = scaler_x
+        self.scaler_y = scaler_y
+        self.metadata = metadata
+        self.origen = origen
+        self.ruta = ruta
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.arrays)
+
+
+def version_modelo(metadata: Dict, ruta=None) -> str:
+    """
+    Identificador de una versión del modelo (registro, ETag, X-Model-Version)
+
+    Es el nombre del archivo, precedido del timestamp de entrenamiento si el
+    nombre no lo incluye. El timestamp solo no basta: dos bundles con los
+    mismos metadatos lo comparten y chocarían en el registro y en el ETag.
+    """
+    timestamp = metadata.get("timestamp")
+    nombre = Path(ruta).stem if ruta else None
+    if not timestamp:
+        return nombre or "desconocida"
+    if not nombre:
+        return str(timestamp)
+    return nombre if str(timestamp) in nombre else f"{timestamp}@{nombre}"
+
+
+def _a_json(valor):
+    """Serializar tipos de numpy y fechas que aparecen en los metadatos"""
+    if hasattr(valor, "item"):
+        return valor.item()
+    if hasattr(valor, "tolist"):
+        return valor.tolist()
+    return str(valor)
+
+
+def _alinear(n: int) -> int:
+    return n + (-n) % ALINEACION
+
+
+def _firma_origen(model_path: str) -> Dict:
+    info = os.stat(model_path)
+    return {"model_path": str(Path(model_path).resolve()), "size": info.st_size, "mtime": info.st_mtime}
+
+
+def escribir_bundle(
+    ruta: Path,
+    arrays: List[np.ndarray],
+    arquitectura: str,
+    scaler_x: EscaladorAfin,
+    scaler_y: Optional[EscaladorAfin] = None,
+    metadata: Optional[Dict] = None,
+    origen: Optional[Dict] = None
+):
+    """Escribir un bundle de forma atómica (fichero temporal + rename)"""
+    ruta = Path(ruta)
+    indice = []
+    desplazamiento = 0
+    contiguos = []
+    for array in arrays:
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        desplazamiento = _alinear(desplazamiento)
+        indice.append({
+            "shape": list(array.shape),
+            "dtype": "float32",
+            "offset": desplazamiento,
+            "nbytes": array.nbytes,
+            "crc32": zlib.crc32(array),
+        })
+        contiguos.append(array)
+        desplazamiento += array.nbytes
+
+    cabecera = json.dumps({
+        "arquitectura": arquitectura,
+        "arrays": indice,
+        "scaler_x": scaler_x.a_dict(),
+        "scaler_y": scaler_y.a_dict() if scaler_y is not None else None,
+        "metadata": metadata or {},
+        "origen": origen or {},
+    }, default=_a_json).encode("utf-8")
+
+    inicio_datos = _alinear(_PREAMBULO.size + len(cabecera))
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_PREAMBULO.pack(MAGIA, VERSION_FORMATO, 0, len(cabecera)))
+        f.write(cabecera)
+        f.write(b"\0" * (inicio_datos - f.tell()))
+        for entrada, array in zip(indice, contiguos):
+            f.write(b"\0" * (inicio_datos + entrada["offset"] - f.tell()))
+            f.write(array.tobytes())
+    # Renombrado atómico: un lector nunca ve un bundle a medio escribir
+    os.replace(tmp, ruta)
+
+
+def leer_cabecera(ruta: Path) -> Tuple[Dict, int]:
+    """
+    Leer y validar el preámbulo y la cabecera sin tocar los datos
+
+    Returns:
+        (cabecera, desplazamiento del inicio de datos)
+    """
+    with open(ruta, "rb") as f:
+        preambulo = f.read(_PREAMBULO.size)
+        if len(preambulo) < _PREAMBULO.size:
+            raise BundleInvalidoError(f"{ruta}: fichero truncado")
+        magia, version, _, longitud = _PREAMBULO.unpack(preambulo)
+        if magia != MAGIA:
+            raise BundleInvalidoError(f"{ruta}: no es un bundle de modelo AQI")
+        if version > VERSION_FORMATO:
+            raise BundleInvalidoError(
+                f"{ruta}: versión de formato {version} no soportada (máx. {VERSION_FORMATO})"
+            )
+        try:
+            cabecera = json.loads(f.read(longitud).decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise BundleInvalidoError(f"{ruta}: cabecera corrupta ({e})")
+    return cabecera, _alinear(_PREAMBULO.size + longitud)
+
+
+def cargar_bundle(ruta, verificar: bool = True) -> ModeloBundle:
+    """
+    Mapear un bundle en solo lectura (sin copiar los pesos)
+
+    Args:
+        ruta: Fichero .aqib
+        verificar: Comprobar el CRC32 de cada array (recorre las páginas una
+            vez, pero sigue sin copiarlas)
+    """
+    ruta = Path(ruta)
+    cabecera, inicio_datos = leer_cabecera(ruta)
+    mapa = np.memmap(ruta, dtype=np.uint8, mode="r")
+
+    arrays = []
+    for i, entrada in enumerate(cabecera["arrays"]):
+        inicio = inicio_datos + entrada["offset"]
+        fin = inicio + entrada["nbytes"]
+        if fin > len(mapa):
+            raise BundleInvalidoError(f"{ruta}: array {i} fuera del fichero (truncado)")
+        vista = mapa[inicio:fin]
+        if verificar and zlib.crc32(vista) != entrada["crc32"]:
+            raise BundleInvalidoError(f"{ruta}: checksum incorrecto en el array {i}")
+        arrays.append(vista.view(np.dtype(entrada["dtype"])).reshape(entrada["shape"]))
+
+    scaler_y = cabecera.get("scaler_y")
+    return ModeloBundle(
+        arquitectura=cabecera["arquitectura"],
+        arrays=arrays,
+        scaler_x=EscaladorAfin.desde_dict(cabecera["scaler_x"]),
+        scaler_y=EscaladorAfin.desde_dict(scaler_y) if scaler_y else None,
+        metadata=cabecera.get("metadata", {}),
+        origen=cabecera.get("origen", {}),
+        ruta=ruta
+    )
+
+
+def construir_modelo(bundle: ModeloBundle, custom_objects: Dict):
+    """Reconstruir el modelo Keras (sin compile) desde la arquitectura y los pesos"""
+    try:
+        from keras.saving import deserialize_keras_object
+
+        # safe_mode=False como en load_model: los modelos antiguos usan capas Lambda
+        model = deserialize_keras_object(
+            json.loads(bundle.arquitectura), custom_objects=custom_objects, safe_mode=False
+        )
+    except ImportError:
+        from tensorflow.keras.models import model_from_json
+
+        model = model_from_json(bundle.arquitectura, custom_objects=custom_objects)
+    # Las variables de TensorFlow necesitan su propio buffer: aquí se copian
+    model.set_weights(bundle.arrays)
+    return model
+
+
+def convertir_artefactos(
+    model_path: str,
+    scaler_path: str,
+    scaler_y_path: Optional[str],
+    metadata_path: Optional[str],
+    salida: Path
+):
+    """Convertir los artefactos sueltos del entrenamiento en un bundle"""
+    import joblib
+    from utils.predictor import obtener_custom_objects, load_model
+
+    model = load_model(model_path, custom_objects=obtener_custom_objects(), compile=False, safe_mode=False)
+    scaler_x = EscaladorAfin.desde_sklearn(joblib.load(scaler_path))
+    scaler_y = None
+    if scaler_y_path and Path(scaler_y_path).exists():
+        scaler_y = EscaladorAfin.desde_sklearn(joblib.load(scaler_y_path))
+
+    metadata = {}
+    if metadata_path and Path(metadata_path).exists():
+        try:
+            metadata = joblib.load(metadata_path)
+        except Exception:
+            with open(metadata_path, "r") as f:
+                metadata = json.load(f)
+
+    escribir_bundle(
+        Path(salida),
+        model.get_weights(),
+        model.to_json(),
+        scaler_x,
+        scaler_y,
+        metadata,
+        _firma_origen(model_path)
+    )
+
+
+def ruta_por_defecto(model_path: str) -> Path:
+    """Ubicación del bundle generado al vuelo (en /dev/shm si existe, RAM respaldada)"""
+    base = Path("/dev/shm") if Path("/dev/shm").is_dir() else Path(tempfile.gettempdir())
+    return base / f"aqi_{Path(model_path).stem}.aqib"
+
+
+def preparar_bundle(model_path: str, ruta: Optional[Path] = None) -> ModeloBundle:
+    """
+    Asegurar que existe un bundle actualizado de los artefactos de config y mapearlo
+
+    Si falta o el modelo de origen cambió, se convierte en un subproceso para
+    que el proceso que llama (el padre de los workers) no ejecute TensorFlow.
+    """
+    ruta = Path(ruta) if ruta else ruta_por_defecto(model_path)
+    vigente = False
+    if ruta.exists():
+        try:
+            vigente = leer_cabecera(ruta)[0].get("origen") == _firma_origen(model_path)
+        except BundleInvalidoError:
+            vigente = False
+
+    if not vigente:
+        logger.info(f"📤 Convirtiendo {Path(model_path).name} a bundle en {ruta}")
+        api_dir = Path(__file__).resolve().parent.parent
+        subprocess.run(
+            [sys.executable, "-m", "utils.model_bundle", "--modelo", model_path, "--salida", str(ruta)],
+            cwd=str(api_dir),
+            check=True
+        )
+
+    bundle = cargar_bundle(ruta)
+    logger.info(f"✅ Bundle mapeado: {len(bundle.arrays)} arrays, {bundle.nbytes / 1024:.0f} KB")
+    return bundle
+
+
+def main():
+    from config.config import MODEL_PATH, SCALER_PATH, SCALER_Y_PATH, METADATA_PATH
+
+    parser = argparse.ArgumentParser(description="Convertir los artefactos del modelo a un bundle .aqib")
+    parser.add_argument("--modelo", default=MODEL_PATH, help="Modelo .keras/.h5")
+    parser.add_argument("--scaler", default=SCALER_PATH, help="Scaler de entrada (.pkl)")
+    parser.add_argument("--scaler-y", default=SCALER_Y_PATH, help="Scaler de salida (.pkl)")
+    parser.add_argument("--metadata", default=METADATA_PATH, help="Metadatos (.pkl o .json)")
+    parser.add_argument("--salida", help="Fichero de salida (por defecto, junto al modelo)")
+    parser.add_argument("--verificar", metavar="BUNDLE", help="Solo verificar un bundle existente")
+    args = parser.parse_args()
+
+    if args.verificar:
+        bundle = cargar_bundle(args.verificar)
+        print(f"✅ Bundle válido: {len(bundle.arrays)} arrays, {bundle.nbytes / 1024:.0f} KB")
+        print(f"   Metadatos: {bundle.metadata}")
+        return
+
+    salida = Path(args.salida) if args.salida else Path(args.modelo).with_suffix(".aqib")
+    convertir_artefactos(args.modelo, args.scaler, args.scaler_y, args.metadata, salida)
+    print(f"✅ Bundle escrito: {salida} ({salida.stat().st_size / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
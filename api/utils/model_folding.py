@@ -0,0 +1,159 @@
+"""
+Plegado de los escalados MinMax dentro de los pesos del modelo
+La normalización de entrada (x * s + m) y la desnormalización de salida
+((y - m_y) / s_y) son afines, así que pueden absorberse en la primera capa
+y en la Dense final. El modelo plegado recibe las features en bruto y
+devuelve el AQI directamente, sin llamadas a sklearn por petición.
+
+Primera capa soportada: Dense, LSTM, GRU, SimpleRNN, Bidirectional de las
+anteriores y Conv1D con padding 'valid' (con 'same'/'causal' el relleno de
+ceros no equivale a un valor bruto, así que no se puede plegar).
+Última capa soportada: Dense con activación lineal.
+"""
+
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PlegadoNoSoportadoError(ValueError):
+    """La arquitectura no permite plegar el escalado sin cambiar el resultado"""
+
+
+def parametros_afines(scaler) -> Tuple[np.ndarray, np.ndarray]:
+    """(scale_, min_) de un MinMaxScaler o de un EscaladorAfin"""
+    if getattr(scaler, "clip", False):
+        raise PlegadoNoSoportadoError("Un scaler con clip=True no es afín")
+    return np.asarray(scaler.scale_, dtype=np.float64), np.asarray(scaler.min_, dtype=np.float64)
+
+
+def _plegar_entrada_kernel(kernel: np.ndarray, bias: np.ndarray, s: np.ndarray, m: np.ndarray):
+    """
+    x_norm @ K + b == x @ (diag(s) K) + (b + m @ K)
+
+    kernel: (n_features, salidas); bias: (salidas,) o (2, salidas) en GRU
+    con reset_after=True (solo la primera fila afecta a la entrada).
+    """
+    kernel = kernel.astype(np.float64)
+    nuevo_kernel = kernel * s[:, None]
+    nuevo_bias = bias.astype(np.float64).copy()
+    if nuevo_bias.ndim == 2:
+        nuevo_bias[0] += m @ kernel
+    else:
+        nuevo_bias += m @ kernel
+    return nuevo_kernel, nuevo_bias
+
+
+def _plegar_capa_entrada(capa, s: np.ndarray, m: np.ndarray):
+    nombre = capa.__class__.__name__
+
+    if nombre == "Bidirectional":
+        _plegar_capa_entrada(capa.forward_layer, s, m)
+        _plegar_capa_entrada(capa.backward_layer, s, m)
+        return
+
+    if nombre == "Conv1D":
+        if capa.padding != "valid":
+            raise PlegadoNoSoportadoError(f"Conv1D con padding='{capa.padding}' no se puede plegar")
+        if not capa.use_bias:
+            raise PlegadoNoSoportadoError("Conv1D sin bias no puede absorber el desplazamiento")
+        kernel, bias = capa.get_weights()
+        kernel64 = kernel.astype(np.float64)
+        nuevo_bias = bias + np.einsum("i,kio->o", m, kernel64)
+        capa.set_weights([
+            (kernel64 * s[None, :, None]).astype(kernel.dtype),
+            nuevo_bias.astype(bias.dtype)
+        ])
+        return
+
+    if nombre not in ("Dense", "LSTM", "GRU", "SimpleRNN"):
+        raise PlegadoNoSoportadoError(f"Primera capa {nombre} no soportada")
+    if not capa.use_bias:
+        raise PlegadoNoSoportadoError(f"{nombre} sin bias no puede absorber el desplazamiento")
+
+    pesos = capa.get_weights()
+    kernel, bias = pesos[0], pesos[-1]
+    nuevo_kernel, nuevo_bias = _plegar_entrada_kernel(kernel, bias, s, m)
+    pesos[0] = nuevo_kernel.astype(kernel.dtype)
+    pesos[-1] = nuevo_bias.astype(bias.dtype)
+    capa.set_weights(pesos)
+
+
+def _plegar_capa_salida(capa, s_y: np.ndarray, m_y: np.ndarray):
+    """(h @ K + b - m_y) / s_y == h @ (K / s_y) + (b - m_y) / s_y"""
+    nombre = capa.__class__.__name__
+    if nombre != "Dense":
+        raise PlegadoNoSoportadoError(f"Última capa {nombre} no soportada (se espera Dense)")
+    activacion = getattr(capa.activation, "__name__", str(capa.activation))
+    if activacion != "linear":
+        raise PlegadoNoSoportadoError(f"La Dense final tiene activación '{activacion}' (no afín)")
+    if not capa.use_bias:
+        raise PlegadoNoSoportadoError("La Dense final no tiene bias")
+
+    kernel, bias = capa.get_weights()
+    capa.set_weights([
+        (kernel.astype(np.float64) / s_y[None, :]).astype(kernel.dtype),
+        ((bias.astype(np.float64) - m_y) / s_y).astype(bias.dtype)
+    ])
+
+
+def _capas_extremas(model):
+    capas = [c for c in model.layers if c.__class__.__name__ != "InputLayer"]
+    if not capas:
+        raise PlegadoNoSoportadoError("El modelo no tiene capas")
+    primera = capas[0]
+    if len(model.inputs) != 1 or len(model.outputs) != 1:
+        raise PlegadoNoSoportadoError("Solo se pliegan modelos con una entrada y una salida")
+    try:
+        # En modelos funcionales la primera capa debe leer directamente la entrada
+        if primera.input is not model.inputs[0]:
+            raise PlegadoNoSoportadoError(f"La capa {primera.name} no consume la entrada del modelo")
+    except AttributeError:
+        pass
+    return primera, capas[-1]
+
+
+def plegar_escaladores(model, scaler_x, scaler_y=None, columna_y: Optional[int] = None):
+    """
+    Plegar (en el sitio) los escalados de entrada y salida en los pesos
+
+    Args:
+        model: Modelo Keras ya cargado (se modifican sus pesos)
+        scaler_x: Scaler de las features de entrada
+        scaler_y: Scaler de las salidas. Si es None y se indica `columna_y`,
+            las salidas se desnormalizan con esa columna de `scaler_x`
+            (modelos antiguos sin scaler_y)
+        columna_y: Columna de scaler_x usada como escala de salida
+
+    Returns:
+        El mismo modelo, ahora con entrada y salida en unidades reales
+    """
+    primera, ultima = _capas_extremas(model)
+    n_salidas = int(model.outputs[0].shape[-1])
+
+    s, m = parametros_afines(scaler_x)
+    if scaler_y is not None:
+        s_y, m_y = parametros_afines(scaler_y)
+    elif columna_y is not None:
+        s_x, m_x = parametros_afines(scaler_x)
+        s_y, m_y = np.full(n_salidas, s_x[columna_y]), np.full(n_salidas, m_x[columna_y])
+    else:
+        raise PlegadoNoSoportadoError("Falta el escalado de salida")
+    if len(s_y) != n_salidas:
+        raise PlegadoNoSoportadoError(f"scaler_y tiene {len(s_y)} salidas y el modelo {n_salidas}")
+
+    # Si falla la capa de salida, restaurar la de entrada: nunca a medio plegar
+    pesos_originales = [c.get_weights() for c in (primera, ultima)]
+    try:
+        _plegar_capa_entrada(primera, s, m)
+        _plegar_capa_salida(ultima, s_y, m_y)
+    except Exception:
+        primera.set_weights(pesos_originales[0])
+        ultima.set_weights(pesos_originales[1])
+        raise
+
+    logger.info(f"🧮 Escalado plegado en {primera.name} (entrada) y {ultima.name} (salida)")
+    return model
@@ -0,0 +1,233 @@
+"""
+Registro de versiones del modelo con cambio en caliente
+Las versiones disponibles son los bundles .aqib de modelos_guardados/. Una
+versión nueva se carga y se calienta en un hilo aparte y después se publica
+con una sola asignación: las peticiones en curso terminan con el predictor
+que ya tenían y las nuevas usan el nuevo. Las versiones anteriores quedan en
+un historial corto para poder volver atrás.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+from config.config import MODELS_DIR, MODEL_HISTORY_SIZE
+from utils.metrics import REGISTRY
+from utils.model_bundle import BundleInvalidoError, cargar_bundle, leer_cabecera, version_modelo
+
+if TYPE_CHECKING:
+    from utils.predictor import AQIPredictor
+
+logger = logging.getLogger(__name__)
+
+MODEL_SWAPS = REGISTRY.counter(
+    "aqi_model_swaps_total",
+    "Cambios de versión del modelo",
+    ("operation", "result")
+)
+
+
+class VersionNoEncontradaError(LookupError):
+    """No hay ningún bundle con esa versión en el directorio de modelos"""
+
+
+class CargaEnCursoError(RuntimeError):
+    """Ya se está cargando otra versión"""
+
+
+class RegistroModelos:
+    """
+    Versión activa del modelo, historial para rollback y carga en segundo plano
+
+    Args:
+        directorio: Carpeta con los bundles .aqib
+        al_publicar: Callback con el predictor recién publicado (main.py lo
+            usa para actualizar su referencia global)
+        historial: Versiones anteriores que se conservan cargadas
+    """
+
+    def __init__(
+        self,
+        directorio=MODELS_DIR,
+        al_publicar: Optional[Callable[["AQIPredictor"], None]] = None,
+        historial: int = MODEL_HISTORY_SIZE
+    ):
+        self.directorio = Path(directorio)
+        self.al_publicar = al_publicar
+        self.activo: Optional["AQIPredictor"] = None
+        self._historial: deque = deque(maxlen=max(historial, 0))
+        self._lock = threading.Lock()
+        self.carga: Dict = {"estado": "inactivo", "version": None, "error": None}
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def listar(self) -> List[Dict]:
+        """Bundles disponibles en el directorio (solo se leen las cabeceras)"""
+        versiones = []
+        for ruta in sorted(self.directorio.glob("*.aqib")):
+            try:
+                cabecera, _ = leer_cabecera(ruta)
+            except (OSError, BundleInvalidoError) as e:
+                logger.warning(f"⚠️ Bundle ilegible {ruta.name}: {e}")
+                continue
+            version = version_modelo(cabecera.get("metadata", {}), ruta)
+            versiones.append({
+                "version": version,
+                "archivo": ruta.name,
+                "timestamp": cabecera.get("metadata", {}).get("timestamp"),
+                "tamano_bytes": ruta.stat().st_size,
+                "val_mae": cabecera.get("metadata", {}).get("val_mae"),
+                "activo": self.activo is not None and self.activo.model_version == version,
+            })
+        return versiones
+
+    def resolver(self, version: str) -> Path:
+        """
+        Ruta del bundle de una versión, nombre de fichero o timestamp de
+        entrenamiento (este último solo si lo tiene un único bundle)
+        """
+        entradas = self.listar()
+        for entrada in entradas:
+            if version in (entrada["version"], entrada["archivo"], Path(entrada["archivo"]).stem):
+                return self.directorio / entrada["archivo"]
+        por_timestamp = [e for e in entradas if e["timestamp"] is not None and str(e["timestamp"]) == version]
+        if len(por_timestamp) > 1:
+            raise VersionNoEncontradaError(
+                f"Timestamp '{version}' ambiguo: " + ", ".join(e["archivo"] for e in por_timestamp)
+            )
+        if por_timestamp:
+            return self.directorio / por_timestamp[0]["archivo"]
+        raise VersionNoEncontradaError(f"Versión '{version}' no encontrada en {self.directorio}")
+
+    @property
+    def cargando(self) -> bool:
+        return self._lock.locked()
+
+    @property
+    def version_activa(self) -> Optional[str]:
+        return self.activo.model_version if self.activo is not None else None
+
+    @property
+    def historial(self) -> List[str]:
+        """Versiones disponibles para rollback, de la más reciente a la más antigua"""
+        return [p.model_version for p in reversed(self._historial)]
+
+    # ------------------------------------------------------------------
+    # Publicación
+    # ------------------------------------------------------------------
+
+    def publicar(self, nuevo: "AQIPredictor", guardar_anterior: bool = True):
+        """Hacer activo un predictor ya cargado y calentado"""
+        anterior = self.activo
+        if anterior is not None:
+            # Reutilizar los clientes HTTP (y su pool de conexiones)
+            nuevo.data_fetcher = anterior.data_fetcher
+            nuevo.openaq_fetcher = anterior.openaq_fetcher
+            if guardar_anterior:
+                self._historial.append(anterior)
+        self.activo = nuevo
+        if self.al_publicar is not None:
+            self.al_publicar(nuevo)
+        logger.info(
+            f"🔁 Modelo activo: {nuevo.model_version}"
+            + (f" (antes {anterior.model_version})" if anterior is not None else ""),
+            extra={"evento": "modelo_publicado", "version": nuevo.model_version}
+        )
+
+    def _construir(self, ruta: Path) -> "AQIPredictor":
+        from utils.predictor import AQIPredictor
+
+        nuevo = AQIPredictor(bundle=cargar_bundle(ruta))
+        nuevo.calentar()
+        return nuevo
+
+    async def cargar(self, version: str) -> str:
+        """
+        Cargar una versión en un hilo, calentarla y publicarla
+
+        Returns:
+            La versión publicada
+        """
+        ruta = self.resolver(version)
+        if not self._lock.acquire(blocking=False):
+            raise CargaEnCursoError(f"Ya se está cargando la versión {self.carga['version']}")
+        try:
+            self.carga = {"estado": "cargando", "version": version, "error": None}
+            logger.info(f"📦 Cargando versión {version} desde {ruta.name} en segundo plano...")
+            nuevo = await asyncio.to_thread(self._construir, ruta)
+            self.publicar(nuevo)
+            self.carga = {"estado": "inactivo", "version": nuevo.model_version, "error": None}
+            MODEL_SWAPS.inc("load", "ok")
+            return nuevo.model_version
+        except Exception as e:
+            self.carga = {"estado": "error", "version": version, "error": str(e)}
+            MODEL_SWAPS.inc("load", "error")
+            logger.error(f"❌ Error al cargar la versión {version}: {e}")
+            raise
+        finally:
+            self._lock.release()
+
+    def rollback(self) -> str:
+        """
+        Volver a la versión anterior (ya cargada, el cambio es inmediato)
+
+        Se rechaza mientras hay una carga en curso: al terminar, la carga
+        publicaría su modelo encima y deshacería el rollback.
+        """
+        if not self._lock.acquire(blocking=False):
+            MODEL_SWAPS.inc("rollback", "error")
+            raise CargaEnCursoError(f"Hay una carga en curso ({self.carga['version']}); reintentar al terminar")
+        try:
+            if not self._historial:
+                raise VersionNoEncontradaError("No hay versiones anteriores para hacer rollback")
+            anterior = self._historial.pop()
+            self.publicar(anterior, guardar_anterior=False)
+            MODEL_SWAPS.inc("rollback", "ok")
+            return anterior.model_version
+        finally:
+            self._lock.release()
+
+    # ------------------------------------------------------------------
+    # Vigilancia del directorio
+    # ------------------------------------------------------------------
+
+    def _firmas(self) -> Dict[str, float]:
+        return {ruta.name: ruta.stat().st_mtime for ruta in self.directorio.glob("*.aqib")}
+
+    async def vigilar(self, intervalo: float):
+        """
+        Sondear el directorio y cargar automáticamente los bundles nuevos
+
+        Solo reacciona a ficheros que aparecen o cambian después de arrancar;
+        el conversor escribe con rename atómico, así que nunca se lee un
+        bundle a medio escribir.
+        """
+        vistos = self._firmas()
+        logger.info(f"👀 Vigilando {self.directorio} cada {intervalo:.0f}s")
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                actuales = self._firmas()
+            except OSError as e:
+                logger.warning(f"⚠️ No se pudo listar {self.directorio}: {e}")
+                continue
+            nuevos = [nombre for nombre, mtime in actuales.items() if vistos.get(nombre) != mtime]
+            # Un bundle nuevo solo cuenta como visto cuando se carga o se descarta
+            # por inválido; si hay otra carga en curso se reintenta en el siguiente sondeo
+            vistos = {nombre: mtime for nombre, mtime in vistos.items() if nombre in actuales}
+            for nombre in sorted(nuevos, key=actuales.get):
+                try:
+                    version = version_modelo(leer_cabecera(self.directorio / nombre)[0].get("metadata", {}), nombre)
+                    if version != self.version_activa:
+                        await self.cargar(nombre)
+                except (CargaEnCursoError, OSError) as e:
+                    logger.info(f"⏳ Bundle {nombre} pendiente, se reintentará: {e}")
+                    continue
+                except Exception as e:
+                    logger.warning(f"⚠️ Bundle {nombre} ignorado: {e}")
+                vistos[nombre] = actuales[nombre]
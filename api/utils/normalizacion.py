@@ -0,0 +1,120 @@
+"""
+Normalización vectorizada de mediciones de OpenAQ
+
+Un lote de registros crudos de OpenAQ v3 (parameter.name, parameter.units,
+value) se pasa a arrays en columnas: el nombre del parámetro y la unidad se
+factorizan (pd.factorize) y solo los valores distintos pasan por las tablas
+ALIAS y CONVERSIONES, así que el coste por registro es extraer los campos
+del dict. La conversión (ppb/ppm -> µg/m³, °F -> °C) es un único
+`valor * factor + desplazamiento` sobre todo el array y las medias por
+parámetro (y opcionalmente por grupo, p. ej. estación u hora) salen de un
+np.bincount.
+
+Benchmark: python benchmarks/bench_normalizacion.py
+"""
+
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Parámetros del modelo que llegan de OpenAQ (el AQI se calcula aparte)
+PARAMETROS = ["PM2.5", "PM10", "O3", "NO2", "temperatura", "humedad", "viento"]
+
+# Nombre de OpenAQ (en minúsculas) -> parámetro del modelo
+ALIAS = {
+    "pm25": "PM2.5",
+    "pm2.5": "PM2.5",
+    "pm10": "PM10",
+    "o3": "O3",
+    "no2": "NO2",
+    "temperature": "temperatura",
+    "humidity": "humedad",
+    "relativehumidity": "humedad",
+    "wind_speed": "viento",
+    "windspeed": "viento",
+    "ws": "viento",
+}
+
+# (parámetro, unidad canónica) -> (factor, desplazamiento): valor * factor + desplazamiento.
+# Gases a µg/m³ a 25 °C y 1 atm; lo que no aparece ya está en la unidad del modelo
+CONVERSIONES = {
+    ("O3", "ppb"): (2.0, 0.0),
+    ("O3", "ppm"): (2000.0, 0.0),
+    ("NO2", "ppb"): (1.88, 0.0),
+    ("NO2", "ppm"): (1880.0, 0.0),
+    ("temperatura", "f"): (5 / 9, -32 * 5 / 9),
+}
+
+_INDICE = {p: k for k, p in enumerate(PARAMETROS)}
+
+
+def _unidad_canonica(unidad: str) -> str:
+    """'ppb', 'ppm', 'f' (Fahrenheit) o la unidad en minúsculas"""
+    unidad = unidad.lower()
+    for canonica in ("ppb", "ppm"):
+        if canonica in unidad:
+            return canonica
+    return "f" if "f" in unidad else unidad
+
+
+def normalizar(registros: Sequence[Mapping]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Registros de OpenAQ -> (código de parámetro, valor en la unidad del modelo)
+
+    Un elemento por registro, en el mismo orden: los códigos indexan
+    PARAMETROS (-1 si el parámetro no tiene alias) y el valor es NaN si el
+    registro no lo trae o el parámetro no se usa.
+    """
+    parametros = [m.get("parameter") or {} for m in registros]
+    codigos_nombre, nombres = pd.factorize(np.array([p.get("name") or "" for p in parametros], dtype=object))
+    codigos_unidad, unidades = pd.factorize(np.array([p.get("units") or "" for p in parametros], dtype=object))
+    valores = np.array([m.get("value") for m in registros], dtype=np.float64)
+
+    # Tablas del tamaño de los valores distintos (unas decenas), no del lote
+    parametro_de = np.array([_INDICE.get(ALIAS.get(n.lower()), -1) for n in nombres], dtype=np.int64)
+    canonicas = [_unidad_canonica(u) for u in unidades]
+    factor = np.ones((len(PARAMETROS), len(unidades)))
+    desplazamiento = np.zeros((len(PARAMETROS), len(unidades)))
+    for (parametro, unidad), (f, d) in CONVERSIONES.items():
+        for k, canonica in enumerate(canonicas):
+            if canonica == unidad:
+                factor[_INDICE[parametro], k] = f
+                desplazamiento[_INDICE[parametro], k] = d
+
+    codigos = parametro_de[codigos_nombre] if len(nombres) else np.empty(0, dtype=np.int64)
+    convertidos = valores * factor[codigos, codigos_unidad] + desplazamiento[codigos, codigos_unidad]
+    return codigos, np.where(codigos >= 0, convertidos, np.nan)
+
+
+def promedios(codigos: np.ndarray, valores: np.ndarray, grupos: Optional[np.ndarray] = None,
+              n_grupos: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Media y número de mediciones por (grupo, parámetro) en una pasada
+
+    Args:
+        codigos, valores: Salida de normalizar() (se ignoran código -1 y NaN)
+        grupos: Grupo de cada registro (p. ej. código de estación u hora)
+
+    Returns:
+        (medias, n), ambos de forma (n_grupos, len(PARAMETROS)); NaN donde no
+        hay mediciones. Sin `grupos` hay un único grupo.
+    """
+    p = len(PARAMETROS)
+    if grupos is None:
+        grupos, n_grupos = np.zeros(len(codigos), dtype=np.int64), 1
+    elif n_grupos is None:
+        n_grupos = int(grupos.max()) + 1 if len(grupos) else 0
+    validos = (codigos >= 0) & np.isfinite(valores)
+    celda = np.asarray(grupos, dtype=np.int64)[validos] * p + codigos[validos]
+    valores = valores[validos]
+    n = np.bincount(celda, minlength=n_grupos * p).reshape(n_grupos, p)
+    suma = np.bincount(celda, weights=valores, minlength=n_grupos * p).reshape(n_grupos, p)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return suma / n, n
+
+
+def promedios_por_parametro(registros: Sequence[Mapping]) -> Dict[str, Tuple[float, int]]:
+    """{parámetro: (media, n)} de los parámetros con alguna medición"""
+    medias, n = promedios(*normalizar(registros))
+    return {p: (float(medias[0, k]), int(n[0, k])) for k, p in enumerate(PARAMETROS) if n[0, k]}
@@ -6,11 +6,15 @@ https://docs.openaq.org/
 import aiohttp
 import asyncio
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional, Tuple
 import logging
 import os
 
+from utils.metrics import medir_llamada
+from utils.aqi import subindice
+from utils.normalizacion import promedios_por_parametro
+
 logger = logging.getLogger(__name__)
 
 
@@ -67,33 +71,45 @@ class OpenAQFetcher:
         Returns:
             Diccionario con valores de contaminantes
         """
+        datos, _ = await self.get_latest_with_timestamp(latitud, longitud, radius_km)
+        return datos
+    
+    async def get_latest_with_timestamp(
+        self,
+        latitud: float,
+        longitud: float,
+        radius_km: float = 25.0
+    ) -> Tuple[Dict[str, float], Optional[datetime]]:
+        """
+        Mediciones más recientes y el instante (UTC) de la última de ellas
+        
+        El instante es None si no hay mediciones reales (valores por defecto)
+        """
         await self._create_session()
         
-        print(f"\n🌍 GET_LATEST_MEASUREMENTS llamado para ({latitud}, {longitud})")
-        logger.info(f"🌍 Obteniendo datos OpenAQ para ({latitud}, {longitud})")
+        logger.debug("🌍 Obteniendo datos OpenAQ para (%s, %s)", latitud, longitud)
         
         try:
             # Buscar estaciones cercanas
-            print(f"📞 Llamando a _find_nearby_stations...")
             stations = await self._find_nearby_stations(latitud, longitud, radius_km)
             
             if not stations:
                 logger.warning(f"⚠️ No se encontraron estaciones en {radius_km}km")
-                return self._get_default_values()
+                return self._get_default_values(), None
             
             # Obtener mediciones de las estaciones
             measurements = await self._get_station_measurements(stations)
             
             if not measurements:
                 logger.warning("⚠️ No hay mediciones disponibles")
-                return self._get_default_values()
+                return self._get_default_values(), None
             
             # Procesar y agregar mediciones
-            return self._process_measurements(measurements)
+            return self._process_measurements(measurements), self._latest_timestamp(measurements)
             
         except Exception as e:
             logger.error(f"❌ Error al obtener datos de OpenAQ: {e}")
-            return self._get_default_values()
+            return self._get_default_values(), None
     
     async def _find_nearby_stations(
         self,
@@ -118,43 +134,49 @@ class OpenAQFetcher:
                 "coordinates": f"{latitud},{longitud}"
             }
             
-            logger.info(f"🔍 Consultando OpenAQ: {url}")
-            logger.info(f"📍 Parámetros: radius={radius_meters}m, coords={latitud},{longitud}")
-            logger.info(f"🔑 API Key presente: {bool(self.api_key)} - Length: {len(self.api_key) if self.api_key else 0}")
+            logger.debug(
+                "🔍 Consultando OpenAQ: %s", url,
+                extra={
+                    "evento": "openaq_locations",
+                    "radio_m": radius_meters,
+                    "coords": f"{latitud},{longitud}",
+                    "api_key": bool(self.api_key)
+                }
+            )
             
-            async with self.session.get(url, params=params, timeout=10) as response:
-                logger.info(f"📡 OpenAQ respondió con status: {response.status}")
+            with medir_llamada("openaq", "locations") as llamada:
+                async with self.session.get(url, params=params, timeout=10) as response:
+                    llamada.status = str(response.status)
+                    logger.debug("📡 OpenAQ respondió con status: %s", response.status)
                 
-                if response.status == 200:
-                    data = await response.json()
-                    results = data.get("results", [])
-                    logger.info(f"✅ Encontradas {len(results)} estaciones cerca de ({latitud}, {longitud})")
-                    
-                    # Log de las primeras 3 estaciones
-                    for i, station in enumerate(results[:3]):
-                        name = station.get("name", "Unknown")
-                        coords = station.get("coordinates", {})
-                        lat = coords.get("latitude", 0)
-                        lon = coords.get("longitude", 0)
-                        logger.info(f"   {i+1}. {name} ({lat}, {lon})")
+                    if response.status == 200:
+                        data = await response.json()
+                        results = data.get("results", [])
+                        logger.info(
+                            "✅ Encontradas %d estaciones cerca de (%s, %s)", len(results), latitud, longitud,
+                            extra={
+                                "evento": "openaq_estaciones",
+                                "estaciones": [station.get("name", "Unknown") for station in results[:3]]
+                            }
+                        )
                     
-                    return results
+                        return results
                     
-                elif response.status == 401:
-                    logger.warning("⚠️ OpenAQ API Key inválida o no configurada")
-                    logger.info("💡 Regístrate en: https://explore.openaq.org/register")
-                    logger.info("💡 Obtén tu API key en: https://explore.openaq.org/account")
-                    return []
+                    elif response.status == 401:
+                        logger.warning("⚠️ OpenAQ API Key inválida o no configurada")
+                        logger.info("💡 Regístrate en: https://explore.openaq.org/register")
+                        logger.info("💡 Obtén tu API key en: https://explore.openaq.org/account")
+                        return []
                     
-                elif response.status == 422:
-                    error_text = await response.text()
-                    logger.error(f"⚠️ Error de validación (422): {error_text}")
-                    return []
+                    elif response.status == 422:
+                        error_text = await response.text()
+                        logger.error(f"⚠️ Error de validación (422): {error_text}")
+                        return []
                     
-                else:
-                    error_text = await response.text()
-                    logger.warning(f"⚠️ OpenAQ retornó status {response.status}: {error_text[:200]}")
-                    return []
+                    else:
+                        error_text = await response.text()
+                        logger.warning(f"⚠️ OpenAQ retornó status {response.status}: {error_text[:200]}")
+                        return []
                     
         except asyncio.TimeoutError:
             logger.warning("⚠️ Timeout conectando con OpenAQ")
@@ -180,18 +202,20 @@ class OpenAQFetcher:
                     "limit": 100  # Obtener todos los parámetros disponibles
                 }
                 
-                async with self.session.get(url, params=params, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        measurements = data.get("results", [])
+                with medir_llamada("openaq", "locations_latest") as llamada:
+                    async with self.session.get(url, params=params, timeout=10) as response:
+                        llamada.status = str(response.status)
+                        if response.status == 200:
+                            data = await response.json()
+                            measurements = data.get("results", [])
                         
-                        if measurements:
-                            station_name = station.get("name", f"Station {station_id}")
-                            logger.info(f"   📡 {station_name}: {len(measurements)} parámetros")
+                            if measurements:
+                                station_name = station.get("name", f"Station {station_id}")
+                                logger.debug("   📡 %s: %d parámetros", station_name, len(measurements))
                         
-                        all_measurements.extend(measurements)
-                    else:
-                        logger.debug(f"   ⚠️ Station {station_id} retornó status {response.status}")
+                            all_measurements.extend(measurements)
+                        else:
+                            logger.debug(f"   ⚠️ Station {station_id} retornó status {response.status}")
                         
             except asyncio.TimeoutError:
                 logger.debug(f"   ⏱️ Timeout obteniendo datos de estación {station_id}")
@@ -208,119 +232,38 @@ class OpenAQFetcher:
         
         Model features: PM2.5, PM10, O3, NO2, temperatura, humedad, viento, AQI
         OpenAQ v3 structure: cada measurement tiene parameter.name, value, unit
+        (la normalización está en utils/normalizacion.py)
         """
-        # Agrupar mediciones por parámetro
-        params_data = {}
-        
-        for measurement in measurements:
-            # Estructura OpenAQ v3
-            parameter_info = measurement.get("parameter", {})
-            parameter = parameter_info.get("name", "").lower()
-            value = measurement.get("value")
-            unit = parameter_info.get("units", "")
-            
-            if value is None:
-                continue
-            
-            # Mapear nombres de OpenAQ a features del modelo
-            param_mapping = {
-                "pm25": "PM2.5",
-                "pm2.5": "PM2.5",
-                "pm10": "PM10",
-                "o3": "O3",
-                "no2": "NO2",
-                "temperature": "temperatura",
-                "humidity": "humedad",
-                "wind_speed": "viento",
-                "windspeed": "viento",
-                "ws": "viento"
-            }
-            
-            mapped_param = param_mapping.get(parameter)
-            if mapped_param:
-                if mapped_param not in params_data:
-                    params_data[mapped_param] = []
-                
-                # Convertir unidades si es necesario
-                converted_value = self._convert_units(value, unit, mapped_param)
-                params_data[mapped_param].append(converted_value)
-        
-        # Calcular promedios
+        # Nombres y unidades por tablas de búsqueda, conversión y medias en arrays
         result = {}
-        for param, values in params_data.items():
-            if values:
-                result[param] = float(np.mean(values))
-                logger.info(f"   ✓ {param}: {result[param]:.2f} (de {len(values)} mediciones)")
+        for param, (media, n) in promedios_por_parametro(measurements).items():
+            result[param] = media
+            logger.debug("   ✓ %s: %.2f (de %d mediciones)", param, media, n)
         
         # Calcular AQI si tenemos PM2.5
         if "PM2.5" in result:
-            result["AQI"] = self._calculate_aqi_from_pm25(result["PM2.5"])
-            logger.info(f"   ✓ AQI: {result['AQI']:.1f} (calculado desde PM2.5)")
+            result["AQI"] = round(float(subindice("PM2.5", result["PM2.5"])), 1)
+            logger.debug("   ✓ AQI: %.1f (calculado desde PM2.5)", result["AQI"])
         
         # Rellenar valores faltantes con defaults
         return self._fill_missing_values(result)
     
-    def _convert_units(self, value: float, unit: str, parameter: str) -> float:
-        """Convertir unidades a las esperadas por el modelo"""
-        unit = unit.lower()
-        
-        # PM2.5 y PM10: µg/m³ (ya es la unidad correcta generalmente)
-        if parameter in ["PM2.5", "PM10"]:
-            return value
-        
-        # O3: convertir de ppb a µg/m³ si es necesario
-        elif parameter == "O3":
-            if "ppb" in unit:
-                # O3: 1 ppb ≈ 2.0 µg/m³ (a 25°C y 1 atm)
-                return value * 2.0
-            return value
-        
-        # NO2: convertir de ppb a µg/m³ si es necesario
-        elif parameter == "NO2":
-            if "ppb" in unit:
-                # NO2: 1 ppb ≈ 1.88 µg/m³ (a 25°C y 1 atm)
-                return value * 1.88
-            return value
-        
-        # Temperatura: convertir a Celsius si es necesario
-        elif parameter == "temperatura":
-            if "f" in unit or "fahrenheit" in unit:
-                return (value - 32) * 5/9
-            return value
-        
-        # Humedad y viento: asumir ya están en % y m/s
-        else:
-            return value
-    
-    def _calculate_aqi_from_pm25(self, pm25: float) -> float:
-        """
-        Calcular AQI basado en PM2.5 usando escala EPA
-        
-        Breakpoints EPA para PM2.5 (µg/m³):
-        0-12: AQI 0-50 (Bueno)
-        12.1-35.4: AQI 51-100 (Moderado)
-        35.5-55.4: AQI 101-150 (Insalubre para grupos sensibles)
-        55.5-150.4: AQI 151-200 (Insalubre)
-        150.5-250.4: AQI 201-300 (Muy insalubre)
-        250.5+: AQI 301-500 (Peligroso)
-        """
-        breakpoints = [
-            (0, 12.0, 0, 50),
-            (12.1, 35.4, 51, 100),
-            (35.5, 55.4, 101, 150),
-            (55.5, 150.4, 151, 200),
-            (150.5, 250.4, 201, 300),
-            (250.5, 500.4, 301, 500)
-        ]
-        
-        for c_low, c_high, aqi_low, aqi_high in breakpoints:
-            if c_low <= pm25 <= c_high:
-                # Fórmula lineal de interpolación
-                aqi = ((aqi_high - aqi_low) / (c_high - c_low)) * (pm25 - c_low) + aqi_low
-                return round(aqi, 1)
-        
-        # Si está fuera de rango, retornar máximo
-        return 500.0
+    @staticmethod
+    def _latest_timestamp(measurements: List[Dict]) -> Optional[datetime]:
+        """Instante UTC de la medición más reciente (datetime.utc en OpenAQ v3)"""
+        fechas = []
+        for measurement in measurements:
+            fecha = measurement.get("datetime")
+            if isinstance(fecha, dict):
+                fecha = fecha.get("utc")
+            if not fecha:
+                continue
+            try:
+                fecha = datetime.fromisoformat(str(fecha).replace("Z", "+00:00"))
+            except ValueError:
+                continue
+            fechas.append(fecha if fecha.tzinfo else fecha.replace(tzinfo=timezone.utc))
+        return max(fechas).astimezone(timezone.utc) if fechas else None
     
     def _fill_missing_values(self, data: Dict[str, float]) -> Dict[str, float]:
         """Rellenar valores faltantes con defaults realistas"""
@@ -344,7 +287,7 @@ class OpenAQFetcher:
         
         # Si tenemos PM2.5 pero no AQI, calcularlo
         if "PM2.5" in data and "AQI" not in data:
-            result["AQI"] = self._calculate_aqi_from_pm25(data["PM2.5"])
+            result["AQI"] = round(float(subindice("PM2.5", data["PM2.5"])), 1)
         
         return result
     
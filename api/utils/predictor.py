@@ -22,17 +22,29 @@ from config.config import (
     MODEL_PATH,
     SCALER_PATH,
     METADATA_PATH,
+    SCALER_Y_PATH,
+    MODEL_BUNDLE_PATH,
+    ENSEMBLE_MODELS,
+    FOLD_SCALERS,
     LOOKBACK_HOURS,
     FORECAST_HORIZONS,
     MODEL_FEATURES,
     AQI_CATEGORIES,
+    AQI_CATEGORY_LIMITS,
     OPENAQ_API_KEY
 )
 from utils.data_fetcher import TEMPODataFetcher
 from utils.openaq_fetcher import OpenAQFetcher
 from utils.attention_layer import AttentionLayer
+from utils.metrics import medir_etapa
+from utils.startup import ARRANQUE
+from utils.model_bundle import ModeloBundle, cargar_bundle, construir_modelo, version_modelo
+from utils.model_folding import PlegadoNoSoportadoError, plegar_escaladores
+from utils.mc_dropout import crear_estimador
+from utils.aqi import aqi_total, categoria, concentracion_desde_aqi, subindice
 from models.schemas import (
     PredictionResponse,
+    MiembroEnsemble,
     HorizontePrediccion,
     CalidadAire,
     ModelInfo,
@@ -41,22 +53,143 @@ from models.schemas import (
 
 logger = logging.getLogger(__name__)
 
+# Categorías de la API en el orden de AQI_CATEGORY_LIMITS
+_CATEGORIAS_API = list(AQI_CATEGORIES.items())
+
+
+def obtener_custom_objects() -> Dict:
+    """Custom objects necesarios para deserializar los modelos guardados"""
+    # Importar tensorflow para funciones de backend
+    import tensorflow as tf
+    import tensorflow.keras.backend as K
+    
+    # Función para la capa Lambda de atención
+    def attention_lambda(x):
+        """Función personalizada para la capa Lambda de atención"""
+        return tf.reduce_sum(x, axis=1)
+    
+    # Definir custom objects para capas personalizadas y funciones Lambda
+    return {
+        'AttentionLayer': AttentionLayer,
+        'Attention': AttentionLayer,
+        # Funciones de TensorFlow para capas Lambda
+        'reduce_sum': tf.reduce_sum,
+        'expand_dims': tf.expand_dims,
+        'tensordot': tf.tensordot,
+        'tanh': tf.nn.tanh,
+        'softmax': tf.nn.softmax,
+        # Backend functions
+        'sum': K.sum,
+        'mean': K.mean,
+        # Función lambda personalizada
+        '<lambda>': attention_lambda,
+        'attention_lambda': attention_lambda,
+    }
+
 
 class AQIPredictor:
     """Clase para realizar predicciones de AQI usando el modelo entrenado"""
     
-    def __init__(self):
-        """Inicializar el predictor cargando modelo y scaler"""
+    def __init__(self, bundle: Optional[ModeloBundle] = None):
+        """
+        Inicializar el predictor cargando modelo y scaler
+        
+        Args:
+            bundle: Bundle ya mapeado en memoria (workers de run_prod.py). Si no
+                se indica y ENSEMBLE_MODELS está configurado, se sirve el
+                ensemble; si no, MODEL_BUNDLE_PATH o los artefactos sueltos
+                (.keras + .pkl).
+        """
+        if bundle is None and MODEL_BUNDLE_PATH and not ENSEMBLE_MODELS:
+            bundle = cargar_bundle(MODEL_BUNDLE_PATH)
+        self.bundle = bundle
         self.model = None
         self.scaler = None
         self.scaler_y = None  # Scaler específico para predicciones
         self.metadata = None
+        self.escalado_plegado = False  # True: el modelo recibe datos brutos y devuelve AQI
+        self.ensemble = None  # EnsembleModelos si se sirven varias generaciones
         self.data_fetcher = TEMPODataFetcher()
         self.openaq_fetcher = OpenAQFetcher(api_key=OPENAQ_API_KEY)
         
-        self._load_model()
-        self._load_scaler()
-        self._load_metadata()
+        if self.bundle is None and ENSEMBLE_MODELS:
+            with ARRANQUE.fase("carga_modelo"):
+                self._load_ensemble()
+        elif self.bundle is not None:
+            with ARRANQUE.fase("carga_modelo"):
+                self._load_bundle()
+        else:
+            with ARRANQUE.fase("carga_modelo"):
+                self._load_model()
+            with ARRANQUE.fase("carga_scaler"):
+                self._load_scaler()
+            self._load_metadata()
+        
+        if FOLD_SCALERS and self.ensemble is None:
+            self._plegar_escalado()
+        
+        # Inferencia compilada: una llamada al grafo en lugar de predict(), cuyo
+        # coste fijo domina con modelos rápidos (TCN, estudiantes destilados)
+        self._inferir = self._compilar_inferencia()
+        
+        # Incertidumbre: K réplicas con dropout activo en una sola llamada
+        self.estimador_mc = crear_estimador(self.model)
+        
+        # Identificador de los artefactos servidos (forma parte del ETag)
+        if self.ensemble is not None:
+            self.model_version = self.ensemble.version
+        else:
+            origen = self.bundle.ruta if self.bundle is not None and self.bundle.ruta else MODEL_PATH
+            self.model_version = version_modelo(self.metadata, origen)
+    
+    def _load_ensemble(self):
+        """Cargar los bundles de ENSEMBLE_MODELS fusionados en un solo grafo"""
+        from utils.ensemble import cargar_ensemble
+        
+        logger.info(f"🧩 Cargando ensemble: {ENSEMBLE_MODELS}")
+        self.ensemble = cargar_ensemble(custom_objects=obtener_custom_objects())
+        self.model = self.ensemble.model
+        # Los miembros ya tienen el escalado plegado: entrada bruta, salida en AQI
+        self.escalado_plegado = True
+        primero = self.ensemble.bundles[0]
+        self.scaler = primero.scaler_x
+        self.metadata = dict(primero.metadata)
+        logger.info(f"✅ Ensemble cargado: {self.model.count_params():,} parámetros")
+    
+    def _load_bundle(self):
+        """Cargar modelo, scalers y metadatos desde un bundle (sin pickle ni compile)"""
+        logger.info(f"📦 Cargando modelo desde bundle: {self.bundle.ruta}")
+        self.model = construir_modelo(self.bundle, obtener_custom_objects())
+        self.scaler = self.bundle.scaler_x
+        self.scaler_y = self.bundle.scaler_y
+        self.metadata = dict(self.bundle.metadata)
+        logger.info(f"✅ Modelo cargado desde bundle: {self.model.count_params():,} parámetros")
+    
+    def _compilar_inferencia(self):
+        """tf.function del forward determinista con la forma de entrada fija"""
+        import tensorflow as tf
+        
+        model = self.model
+        forma = model.inputs[0].shape
+        
+        @tf.function(input_signature=[tf.TensorSpec([None, forma[1], forma[2]], tf.float32)], reduce_retracing=True)
+        def inferir(X):
+            return model(X, training=False)
+        
+        return inferir
+    
+    def _plegar_escalado(self):
+        """Absorber scaler y scaler_y en los pesos (ver utils/model_folding.py)"""
+        try:
+            plegar_escaladores(
+                self.model,
+                self.scaler,
+                self.scaler_y,
+                columna_y=None if self.scaler_y is not None else 0
+            )
+            self.escalado_plegado = True
+        except PlegadoNoSoportadoError as e:
+            logger.warning(f"⚠️ No se pudo plegar el escalado, se aplica por petición: {e}")
     
     def _load_model(self):
         """Cargar el modelo de Keras"""
@@ -66,37 +199,10 @@ class AQIPredictor:
             if not Path(MODEL_PATH).exists():
                 raise FileNotFoundError(f"Modelo no encontrado en: {MODEL_PATH}")
             
-            # Importar tensorflow para funciones de backend
-            import tensorflow as tf
-            import tensorflow.keras.backend as K
-            
-            # Función para la capa Lambda de atención
-            def attention_lambda(x):
-                """Función personalizada para la capa Lambda de atención"""
-                return tf.reduce_sum(x, axis=1)
-            
-            # Definir custom objects para capas personalizadas y funciones Lambda
-            custom_objects = {
-                'AttentionLayer': AttentionLayer,
-                'Attention': AttentionLayer,
-                # Funciones de TensorFlow para capas Lambda
-                'reduce_sum': tf.reduce_sum,
-                'expand_dims': tf.expand_dims,
-                'tensordot': tf.tensordot,
-                'tanh': tf.nn.tanh,
-                'softmax': tf.nn.softmax,
-                # Backend functions
-                'sum': K.sum,
-                'mean': K.mean,
-                # Función lambda personalizada
-                '<lambda>': attention_lambda,
-                'attention_lambda': attention_lambda,
-            }
-            
             # Cargar modelo SIN compilar para evitar problemas con Lambda
             self.model = load_model(
                 MODEL_PATH,
-                custom_objects=custom_objects,
+                custom_objects=obtener_custom_objects(),
                 compile=False,  # No compilar para evitar problemas con capas personalizadas
                 safe_mode=False
             )
@@ -130,9 +236,8 @@ class AQIPredictor:
             logger.info("✅ Scaler cargado correctamente")
             
             # Intentar cargar scaler_y (para predicciones)
-            scaler_y_path = SCALER_PATH.replace('scaler_', 'scaler_y_')
-            if Path(scaler_y_path).exists():
-                self.scaler_y = joblib.load(scaler_y_path)
+            if Path(SCALER_Y_PATH).exists():
+                self.scaler_y = joblib.load(SCALER_Y_PATH)
                 logger.info("✅ Scaler Y cargado correctamente")
             else:
                 logger.warning("⚠️ Scaler Y no encontrado, usando scaler principal")
@@ -162,6 +267,20 @@ class AQIPredictor:
             logger.warning(f"⚠️ Error al cargar metadatos: {e}")
             self.metadata = {}
     
+    def calentar(self, repeticiones: int = 2):
+        """
+        Ejecutar el modelo con un lote ficticio antes de aceptar tráfico
+        
+        La primera llamada al modelo traza el grafo de TensorFlow y reserva
+        memoria; sin calentar, ese coste lo paga la primera petición real.
+        """
+        X = np.zeros((1, LOOKBACK_HOURS, len(MODEL_FEATURES)), dtype=np.float32)
+        for _ in range(repeticiones):
+            self._inferir(X)
+            if self.estimador_mc is not None:
+                self.estimador_mc.muestrear(X)
+        self._desnormalizar_predicciones(np.zeros(len(FORECAST_HORIZONS)))
+    
     def is_loaded(self) -> bool:
         """Verificar si el modelo y scaler están cargados"""
         return self.model is not None and self.scaler is not None
@@ -170,8 +289,11 @@ class AQIPredictor:
         """Obtener información del modelo"""
         return ModelInfo(
             nombre_modelo=self.metadata.get("nombre_experimento", "LSTM_Attention_AQI"),
-            version="1.0.0",
-            arquitectura="Bidirectional LSTM + Attention",
+            version=self.model_version,
+            arquitectura=(
+                self.metadata.get("arquitectura", "Bidirectional LSTM + Attention") if self.ensemble is None
+                else f"Ensemble de {len(self.ensemble.versiones)} modelos"
+            ),
             parametros_totales=self.model.count_params() if self.model else 0,
             features_entrada=MODEL_FEATURES,
             horizontes_prediccion=[f"{h}h" for h in FORECAST_HORIZONS],
@@ -187,27 +309,19 @@ class AQIPredictor:
         Returns:
             Tuple[CalidadAire, mensaje, color]
         """
-        for categoria, info in AQI_CATEGORIES.items():
-            min_val, max_val = info["range"]
-            if min_val <= aqi_value <= max_val:
-                return (
-                    CalidadAire(categoria),
-                    info["mensaje"],
-                    info["color"]
-                )
-        
-        # Por defecto si está fuera de rango
-        return (
-            CalidadAire.PELIGROSO,
-            "Valor fuera de rango esperado",
-            "#4C0026"
-        )
+        nombre, info = _CATEGORIAS_API[int(categoria(aqi_value, AQI_CATEGORY_LIMITS))]
+        return CalidadAire(nombre), info["mensaje"], info["color"]
+    
+    async def observar(self, latitud: float, longitud: float) -> Tuple[Dict[str, float], Optional[datetime]]:
+        """Últimas mediciones de OpenAQ y el instante de la más reciente, sin ejecutar el modelo"""
+        return await self.openaq_fetcher.get_latest_with_timestamp(latitud, longitud, radius_km=25.0)
     
     async def predict(
         self,
         latitud: float,
         longitud: float,
-        location_name: Optional[str] = None
+        location_name: Optional[str] = None,
+        observacion: Optional[Tuple[Dict[str, float], Optional[datetime]]] = None
     ) -> PredictionResponse:
         """
         Realizar predicción de AQI para una ubicación
@@ -216,6 +330,8 @@ class AQIPredictor:
             latitud: Latitud de la ubicación
             longitud: Longitud de la ubicación
             location_name: Nombre de la ubicación (opcional)
+            observacion: Salida de observar() si ya se pidió a OpenAQ
+                (la cache HTTP la necesita antes para calcular el ETag)
             
         Returns:
             PredictionResponse con las predicciones
@@ -224,141 +340,191 @@ class AQIPredictor:
         fuente_datos = "simulado"
         
         # 1. Intentar obtener datos en tiempo real de OpenAQ con búsqueda progresiva
-        print(f"\n{'='*60}")
-        print(f"🌍 INICIANDO BÚSQUEDA OPENAQ para ({latitud}, {longitud})")
-        print(f"{'='*60}\n")
-        logger.info(f"🌍 Obteniendo datos en tiempo real de OpenAQ para ({latitud}, {longitud})")
+        with medir_etapa("openaq_lookup"):
+            logger.info(
+                "🌍 Obteniendo datos en tiempo real de OpenAQ para (%s, %s)", latitud, longitud,
+                extra={"evento": "openaq_busqueda", "latitud": latitud, "longitud": longitud}
+            )
         
-        datos_actuales = None
-        # OpenAQ v3 solo acepta radio máximo de 25km
-        radios_busqueda = [25.0]  # Radio en km
+            datos_actuales = None
+            # OpenAQ v3 solo acepta radio máximo de 25km
+            radios_busqueda = [25.0]  # Radio en km
         
-        try:
-            for radio in radios_busqueda:
-                print(f"🔍 Buscando estaciones OpenAQ en radio de {radio}km...")
-                logger.info(f"🔍 Buscando estaciones OpenAQ en radio de {radio}km...")
+            try:
+                for radio in radios_busqueda:
+                    logger.debug("🔍 Buscando estaciones OpenAQ en radio de %skm...", radio)
                 
-                datos_temp = await self.openaq_fetcher.get_latest_measurements(
-                    latitud=latitud,
-                    longitud=longitud,
-                    radius_km=radio
-                )
+                    if observacion is not None:
+                        datos_temp = observacion[0]
+                    else:
+                        datos_temp = await self.openaq_fetcher.get_latest_measurements(
+                            latitud=latitud,
+                            longitud=longitud,
+                            radius_km=radio
+                        )
                 
-                print(f"📊 Datos recibidos de OpenAQ: {datos_temp}")
-                logger.info(f"📊 Datos OpenAQ completos: {datos_temp}")
+                    # El diccionario completo solo se serializa si DEBUG está activo
+                    logger.debug("📊 Datos OpenAQ completos: %s", datos_temp)
                 
-                # Verificar si encontramos datos reales
-                # OpenAQ puede devolver cualquier valor, incluso si coincide con nuestros defaults
-                # Lo importante es que venga de una estación real
-                if datos_temp and any(key in datos_temp for key in ["PM2.5", "NO2", "O3", "PM10"]):
-                    logger.info(f"✅ Datos reales obtenidos de OpenAQ en radio {radio}km")
-                    print(f"✅ USANDO DATOS REALES DE OPENAQ: PM2.5={datos_temp.get('PM2.5')}, NO2={datos_temp.get('NO2')}, O3={datos_temp.get('O3')}")
-                    datos_actuales = datos_temp
-                    fuente_datos = f"OpenAQ (tiempo real, {radio}km)"
-                    break
-                else:
-                    logger.warning(f"⚠️ OpenAQ no retornó contaminantes en {radio}km")
+                    # Verificar si encontramos datos reales
+                    # OpenAQ puede devolver cualquier valor, incluso si coincide con nuestros defaults
+                    # Lo importante es que venga de una estación real
+                    if datos_temp and any(key in datos_temp for key in ["PM2.5", "NO2", "O3", "PM10"]):
+                        logger.info(
+                            "✅ Datos reales obtenidos de OpenAQ en radio %skm", radio,
+                            extra={
+                                "evento": "openaq_datos",
+                                "radio_km": radio,
+                                "pm25": datos_temp.get("PM2.5"),
+                                "no2": datos_temp.get("NO2"),
+                                "o3": datos_temp.get("O3")
+                            }
+                        )
+                        datos_actuales = datos_temp
+                        fuente_datos = f"OpenAQ (tiempo real, {radio}km)"
+                        break
+                    else:
+                        logger.warning(f"⚠️ OpenAQ no retornó contaminantes en {radio}km")
             
-            if not datos_actuales:
-                logger.warning("⚠️ OpenAQ no retornó datos reales en ningún radio, usando datos estimados")
-                advertencias.append(f"No hay estaciones OpenAQ cercanas (buscado hasta {radios_busqueda[-1]}km)")
-                datos_actuales = self._get_default_current_data()
-                fuente_datos = "Datos estimados (sin cobertura OpenAQ)"
-            else:
-                print(f"✅ USANDO DATOS REALES DE OPENAQ")
-                logger.info(f"✅ Usando datos reales de OpenAQ: {fuente_datos}")
+                if not datos_actuales:
+                    logger.warning("⚠️ OpenAQ no retornó datos reales en ningún radio, usando datos estimados")
+                    advertencias.append(f"No hay estaciones OpenAQ cercanas (buscado hasta {radios_busqueda[-1]}km)")
+                    datos_actuales = self._get_default_current_data()
+                    fuente_datos = "Datos estimados (sin cobertura OpenAQ)"
+                else:
+                    logger.info("✅ Usando datos reales de OpenAQ: %s", fuente_datos)
                 
-        except Exception as e:
-            logger.error(f"❌ Error al obtener datos de OpenAQ: {e}")
-            advertencias.append(f"Error OpenAQ: {str(e)[:100]}")
-            datos_actuales = self._get_default_current_data()
-            fuente_datos = "Datos estimados (error de conexión)"
+            except Exception as e:
+                logger.error(f"❌ Error al obtener datos de OpenAQ: {e}")
+                advertencias.append(f"Error OpenAQ: {str(e)[:100]}")
+                datos_actuales = self._get_default_current_data()
+                fuente_datos = "Datos estimados (error de conexión)"
         
         # 2. Obtener datos históricos de TEMPO o simulados
-        logger.info(f"📊 Obteniendo datos históricos para predicción...")
+        logger.debug("📊 Obteniendo datos históricos para predicción...")
         
-        try:
-            datos_historicos = await self.data_fetcher.get_historical_data(
-                latitud=latitud,
-                longitud=longitud,
-                horas=LOOKBACK_HOURS
-            )
-        except Exception as e:
-            logger.error(f"❌ Error al obtener datos históricos: {e}")
-            advertencias.append(f"Usando datos simulados para histórico: {str(e)[:100]}")
-            datos_historicos = self._generar_datos_simulados()
+        with medir_etapa("tempo_history"):
+            try:
+                datos_historicos = await self.data_fetcher.get_historical_data(
+                    latitud=latitud,
+                    longitud=longitud,
+                    horas=LOOKBACK_HOURS
+                )
+            except Exception as e:
+                logger.error(f"❌ Error al obtener datos históricos: {e}")
+                advertencias.append(f"Usando datos simulados para histórico: {str(e)[:100]}")
+                datos_historicos = self._generar_datos_simulados()
         
         # 3. Verificar que tenemos suficientes datos
-        if len(datos_historicos) < LOOKBACK_HOURS:
-            advertencias.append(
-                f"Solo se obtuvieron {len(datos_historicos)} horas de {LOOKBACK_HOURS} requeridas"
-            )
+        with medir_etapa("window_prep"):
+            if len(datos_historicos) < LOOKBACK_HOURS:
+                advertencias.append(
+                    f"Solo se obtuvieron {len(datos_historicos)} horas de {LOOKBACK_HOURS} requeridas"
+                )
         
-        # 4. Preparar datos para el modelo
-        X = self._preparar_datos(datos_historicos)
+            # 4. Preparar datos para el modelo
+            X = self._preparar_datos(datos_historicos)
         
         # 5. Realizar predicción
-        logger.info("🔮 Realizando predicción...")
-        predicciones_raw = self.model.predict(X, verbose=0)
+        with medir_etapa("inference"):
+            logger.debug("🔮 Realizando predicción...")
+            if self.ensemble is not None:
+                predicciones_raw, salidas_miembros = self.ensemble.predecir(X)
+            else:
+                predicciones_raw = self._inferir(np.asarray(X, dtype=np.float32)).numpy()
         
         # 6. Desnormalizar predicciones
-        predicciones_aqi = self._desnormalizar_predicciones(predicciones_raw[0])
+        with medir_etapa("denormalization"):
+            predicciones_aqi = self._desnormalizar_predicciones(predicciones_raw[0])
+        
+        # 6b. Incertidumbre (MC dropout, un único forward de K réplicas)
+        incertidumbre = None
+        if self.estimador_mc is not None:
+            with medir_etapa("uncertainty"):
+                muestras = self.estimador_mc.muestrear(X)[:, 0, :]
+                muestras_aqi = self._desnormalizar_lote(muestras)
+                incertidumbre = self.estimador_mc.resumir(muestras_aqi, predicciones_aqi)
+        
+        # 6c. Detalle por miembro del ensemble (misma llamada de inferencia)
+        miembros_ensemble = None
+        if self.ensemble is not None:
+            horizontes = [f"{h}h" for h in FORECAST_HORIZONS]
+            contribuciones = self.ensemble.contribuciones(salidas_miembros[0])
+            miembros_ensemble = [
+                MiembroEnsemble(
+                    version=version,
+                    peso=round(float(peso), 4),
+                    predicciones={h: round(float(v), 2) for h, v in zip(horizontes, salidas_miembros[0, j])},
+                    contribucion={h: round(float(v), 2) for h, v in zip(horizontes, contribuciones[j])}
+                )
+                for j, (version, peso) in enumerate(zip(self.ensemble.versiones, self.ensemble.pesos))
+            ]
         
         # 7. Crear predicciones con contaminantes
-        predicciones_lista = []
-        for i, horizonte in enumerate(FORECAST_HORIZONS):
-            aqi_pred = float(predicciones_aqi[i])
-            calidad, mensaje, color = self.clasificar_aqi(aqi_pred)
+        with medir_etapa("pollutant_estimation"):
+            predicciones_lista = []
+            for i, horizonte in enumerate(FORECAST_HORIZONS):
+                aqi_pred = float(predicciones_aqi[i])
+                calidad, mensaje, color = self.clasificar_aqi(aqi_pred)
             
-            # Estimar contaminantes futuros basados en AQI predicho
-            contaminantes_futuros = self._estimar_contaminantes_desde_aqi(aqi_pred, datos_actuales)
+                # Estimar contaminantes futuros basados en AQI predicho
+                contaminantes_futuros = self._estimar_contaminantes_desde_aqi(aqi_pred, datos_actuales)
             
-            predicciones_lista.append(
-                HorizontePrediccion(
-                    horizonte=f"{horizonte}h",
-                    aqi_predicho=round(aqi_pred, 2),
-                    calidad=calidad,
-                    mensaje=mensaje,
-                    color=color,
-                    confianza=0.85,  # Placeholder - podría calcularse con ensembles
-                    contaminantes=contaminantes_futuros
+                predicciones_lista.append(
+                    HorizontePrediccion(
+                        horizonte=f"{horizonte}h",
+                        aqi_predicho=round(aqi_pred, 2),
+                        calidad=calidad,
+                        mensaje=mensaje,
+                        color=color,
+                        confianza=round(float(incertidumbre["confianza"][i]), 3) if incertidumbre else None,
+                        intervalo_inferior=round(float(incertidumbre["inferior"][i]), 2) if incertidumbre else None,
+                        intervalo_superior=round(float(incertidumbre["superior"][i]), 2) if incertidumbre else None,
+                        contaminantes=contaminantes_futuros
+                    )
                 )
-            )
         
         # 8. Calcular AQI actual desde contaminantes reales
         # Si tenemos PM2.5 de OpenAQ, calcular AQI real
-        if "PM2.5" in datos_actuales and datos_actuales["PM2.5"] is not None:
-            aqi_actual = self._calcular_aqi_desde_pm25(datos_actuales["PM2.5"])
-            logger.info(f"✅ AQI calculado desde PM2.5: {aqi_actual:.1f} (PM2.5={datos_actuales['PM2.5']:.1f} µg/m³)")
-        else:
-            # Fallback: estimar desde datos históricos
-            aqi_actual = self._estimar_aqi_actual(datos_historicos)
-            logger.warning(f"⚠️ AQI estimado desde históricos: {aqi_actual:.1f}")
+        with medir_etapa("aqi_calculation"):
+            if "PM2.5" in datos_actuales and datos_actuales["PM2.5"] is not None:
+                aqi_actual = float(subindice("PM2.5", datos_actuales["PM2.5"]))
+                logger.info(
+                    "✅ AQI calculado desde PM2.5: %.1f (PM2.5=%.1f µg/m³)", aqi_actual, datos_actuales["PM2.5"],
+                    extra={"evento": "aqi_actual", "aqi": aqi_actual, "pm25": datos_actuales["PM2.5"]}
+                )
+            else:
+                # Fallback: estimar desde datos históricos
+                aqi_actual = self._estimar_aqi_actual(datos_historicos)
+                logger.warning(f"⚠️ AQI estimado desde históricos: {aqi_actual:.1f}")
         
         # 9. Crear objeto de contaminantes actuales
-        contaminantes_actuales = ContaminantesData(
-            **{
-                "PM2.5": datos_actuales.get("PM2.5"),
-                "PM10": datos_actuales.get("PM10"),
-                "O3": datos_actuales.get("O3"),
-                "NO2": datos_actuales.get("NO2"),
-                "temperatura": datos_actuales.get("temperatura"),
-                "humedad": datos_actuales.get("humedad"),
-                "viento": datos_actuales.get("viento")
-            }
-        )
+        with medir_etapa("response_build"):
+            contaminantes_actuales = ContaminantesData(
+                **{
+                    "PM2.5": datos_actuales.get("PM2.5"),
+                    "PM10": datos_actuales.get("PM10"),
+                    "O3": datos_actuales.get("O3"),
+                    "NO2": datos_actuales.get("NO2"),
+                    "temperatura": datos_actuales.get("temperatura"),
+                    "humedad": datos_actuales.get("humedad"),
+                    "viento": datos_actuales.get("viento")
+                }
+            )
         
-        return PredictionResponse(
-            ubicacion={"latitud": latitud, "longitud": longitud},
-            nombre_ubicacion=location_name,
-            timestamp=datetime.now(),
-            predicciones=predicciones_lista,
-            aqi_actual_estimado=aqi_actual,
-            contaminantes_actuales=contaminantes_actuales,
-            datos_entrada_disponibles=len(datos_historicos) >= LOOKBACK_HOURS,
-            fuente_datos=fuente_datos,
-            advertencias=advertencias if advertencias else None
-        )
+            return PredictionResponse(
+                ubicacion={"latitud": latitud, "longitud": longitud},
+                nombre_ubicacion=location_name,
+                timestamp=datetime.now(),
+                predicciones=predicciones_lista,
+                aqi_actual_estimado=aqi_actual,
+                contaminantes_actuales=contaminantes_actuales,
+                datos_entrada_disponibles=len(datos_historicos) >= LOOKBACK_HOURS,
+                fuente_datos=fuente_datos,
+                advertencias=advertencias if advertencias else None,
+                version_modelo=self.model_version,
+                miembros_ensemble=miembros_ensemble
+            )
     
     def _preparar_datos(self, df: pd.DataFrame) -> np.ndarray:
         """
@@ -388,8 +554,11 @@ class AQIPredictor:
         elif len(datos) > LOOKBACK_HOURS:
             datos = datos[-LOOKBACK_HOURS:]
         
-        # Normalizar
-        datos_norm = self.scaler.transform(datos)
+        # Normalizar (si el escalado está plegado, el modelo recibe los datos brutos)
+        if self.escalado_plegado:
+            datos_norm = datos.astype(np.float32)
+        else:
+            datos_norm = self.scaler.transform(datos)
         
         # Reshape para el modelo: (1, timesteps, features)
         return datos_norm.reshape(1, LOOKBACK_HOURS, len(features_disponibles))
@@ -404,6 +573,10 @@ class AQIPredictor:
         Returns:
             Predicciones en escala original
         """
+        # Escalado plegado en la Dense final: la salida ya está en AQI
+        if self.escalado_plegado:
+            return np.maximum(np.asarray(predicciones_norm, dtype=np.float64), 0).flatten()
+        
         # Si tenemos scaler_y específico, usarlo (modelo nuevo)
         if self.scaler_y is not None:
             # Asegurar que sea 2D: (n_samples, n_features)
@@ -435,6 +608,12 @@ class AQIPredictor:
         
         return result
     
+    def _desnormalizar_lote(self, muestras: np.ndarray) -> np.ndarray:
+        """Desnormalizar (K, horizontes) salidas de una vez"""
+        if self.escalado_plegado or self.scaler_y is not None:
+            return self._desnormalizar_predicciones(muestras).reshape(muestras.shape)
+        return np.stack([self._desnormalizar_predicciones(m) for m in muestras])
+    
     def _estimar_aqi_actual(self, df: pd.DataFrame) -> Optional[float]:
         """Estimar AQI actual a partir del DataFrame histórico"""
         if df.empty:
@@ -444,109 +623,12 @@ class AQIPredictor:
         if 'AQI' in df.columns:
             return float(df['AQI'].iloc[-1])
         
-        # Calcular AQI de cada contaminante y tomar el máximo
-        aqi_values = []
-        
-        # AQI desde PM2.5
-        if 'PM2.5' in df.columns:
-            pm25 = float(df['PM2.5'].iloc[-1])
-            aqi_pm25 = self._calculate_aqi_from_pm25(pm25)
-            aqi_values.append(aqi_pm25)
-        
-        # AQI desde PM10
-        if 'PM10' in df.columns:
-            pm10 = float(df['PM10'].iloc[-1])
-            aqi_pm10 = self._calculate_aqi_from_pm10(pm10)
-            aqi_values.append(aqi_pm10)
-        
-        # AQI desde O3
-        if 'O3' in df.columns:
-            o3 = float(df['O3'].iloc[-1])
-            aqi_o3 = self._calculate_aqi_from_o3(o3)
-            aqi_values.append(aqi_o3)
-        
-        # AQI desde NO2
-        if 'NO2' in df.columns:
-            no2 = float(df['NO2'].iloc[-1])
-            aqi_no2 = self._calculate_aqi_from_no2(no2)
-            aqi_values.append(aqi_no2)
-        
-        # Retornar el AQI máximo (el peor contaminante define el AQI total)
-        if aqi_values:
-            return max(aqi_values)
-        
-        return None
-    
-    def _calculate_aqi_from_pm25(self, pm25: float) -> float:
-        """Calcular AQI basado en PM2.5 usando escala EPA"""
-        breakpoints = [
-            (0, 12.0, 0, 50),
-            (12.1, 35.4, 51, 100),
-            (35.5, 55.4, 101, 150),
-            (55.5, 150.4, 151, 200),
-            (150.5, 250.4, 201, 300),
-            (250.5, 500.4, 301, 500)
-        ]
-        
-        for c_low, c_high, aqi_low, aqi_high in breakpoints:
-            if c_low <= pm25 <= c_high:
-                aqi = ((aqi_high - aqi_low) / (c_high - c_low)) * (pm25 - c_low) + aqi_low
-                return round(aqi, 1)
-        
-        return 500.0
-    
-    def _calculate_aqi_from_pm10(self, pm10: float) -> float:
-        """Calcular AQI basado en PM10 usando escala EPA"""
-        breakpoints = [
-            (0, 54, 0, 50),
-            (55, 154, 51, 100),
-            (155, 254, 101, 150),
-            (255, 354, 151, 200),
-            (355, 424, 201, 300),
-            (425, 604, 301, 500)
-        ]
-        
-        for c_low, c_high, aqi_low, aqi_high in breakpoints:
-            if c_low <= pm10 <= c_high:
-                aqi = ((aqi_high - aqi_low) / (c_high - c_low)) * (pm10 - c_low) + aqi_low
-                return round(aqi, 1)
-        
-        return 500.0
-    
-    def _calculate_aqi_from_o3(self, o3: float) -> float:
-        """Calcular AQI basado en O3 (ppb) usando escala EPA"""
-        breakpoints = [
-            (0, 54, 0, 50),
-            (55, 70, 51, 100),
-            (71, 85, 101, 150),
-            (86, 105, 151, 200),
-            (106, 200, 201, 300)
-        ]
-        
-        for c_low, c_high, aqi_low, aqi_high in breakpoints:
-            if c_low <= o3 <= c_high:
-                aqi = ((aqi_high - aqi_low) / (c_high - c_low)) * (o3 - c_low) + aqi_low
-                return round(aqi, 1)
-        
-        return 300.0
-    
-    def _calculate_aqi_from_no2(self, no2: float) -> float:
-        """Calcular AQI basado en NO2 (ppb) usando escala EPA"""
-        breakpoints = [
-            (0, 53, 0, 50),
-            (54, 100, 51, 100),
-            (101, 360, 101, 150),
-            (361, 649, 151, 200),
-            (650, 1249, 201, 300),
-            (1250, 2049, 301, 500)
-        ]
-        
-        for c_low, c_high, aqi_low, aqi_high in breakpoints:
-            if c_low <= no2 <= c_high:
-                aqi = ((aqi_high - aqi_low) / (c_high - c_low)) * (no2 - c_low) + aqi_low
-                return round(aqi, 1)
-        
-        return 500.0
+        # AQI de cada contaminante de la última hora; el peor define el AQI total
+        ultima = {c: float(df[c].iloc[-1]) for c in ('PM2.5', 'PM10', 'O3', 'NO2') if c in df.columns}
+        if not ultima:
+            return None
+        aqi = float(aqi_total(ultima))
+        return None if np.isnan(aqi) else round(aqi, 1)
     
     def _estimar_contaminantes_desde_aqi(
         self, 
@@ -563,17 +645,8 @@ class AQIPredictor:
         Returns:
             ContaminantesData con valores estimados
         """
-        # Estimar PM2.5 desde AQI (inverso de la fórmula EPA)
-        if aqi <= 50:
-            pm25 = (aqi / 50) * 12.0
-        elif aqi <= 100:
-            pm25 = ((aqi - 51) / 49) * (35.4 - 12.1) + 12.1
-        elif aqi <= 150:
-            pm25 = ((aqi - 101) / 49) * (55.4 - 35.5) + 35.5
-        elif aqi <= 200:
-            pm25 = ((aqi - 151) / 49) * (150.4 - 55.5) + 55.5
-        else:
-            pm25 = ((aqi - 201) / 99) * (250.4 - 150.5) + 150.5
+        # Estimar PM2.5 desde AQI (inversa de los breakpoints EPA)
+        pm25 = float(concentracion_desde_aqi("PM2.5", aqi))
         
         # Estimar otros contaminantes basados en relaciones típicas
         pm10 = pm25 * 1.7  # PM10 típicamente 1.5-2x PM2.5
@@ -602,31 +675,6 @@ class AQIPredictor:
             }
         )
     
-    def _calcular_aqi_desde_pm25(self, pm25: float) -> float:
-        """
-        Calcular AQI usando la fórmula EPA para PM2.5
-        
-        Args:
-            pm25: Concentración de PM2.5 en µg/m³
-            
-        Returns:
-            Valor de AQI
-        """
-        # Breakpoints EPA para PM2.5 (24 horas)
-        # https://www.airnow.gov/aqi/aqi-calculator-concentration/
-        if pm25 <= 12.0:
-            return (50 / 12.0) * pm25
-        elif pm25 <= 35.4:
-            return ((100 - 51) / (35.4 - 12.1)) * (pm25 - 12.1) + 51
-        elif pm25 <= 55.4:
-            return ((150 - 101) / (55.4 - 35.5)) * (pm25 - 35.5) + 101
-        elif pm25 <= 150.4:
-            return ((200 - 151) / (150.4 - 55.5)) * (pm25 - 55.5) + 151
-        elif pm25 <= 250.4:
-            return ((300 - 201) / (250.4 - 150.5)) * (pm25 - 150.5) + 201
-        else:
-            return ((500 - 301) / (500.4 - 250.5)) * (pm25 - 250.5) + 301
-    
     def _get_default_current_data(self) -> Dict[str, float]:
         """Obtener datos por defecto cuando OpenAQ no está disponible"""
         return {
@@ -0,0 +1,77 @@
+"""
+Perfilador por muestreo para diagnosticar peticiones lentas
+Produce pilas colapsadas (formato de flamegraph.pl / speedscope)
+"""
+
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Optional
+
+from config.config import PROFILING_INTERVAL_MS
+
+# Funciones en las que el hilo está bloqueado esperando I/O (no consume CPU)
+_FRAMES_OCIOSOS = {"select", "poll", "epoll", "kqueue", "_run_once"}
+
+
+def _describir_frame(frame) -> str:
+    """
+    Nombre estable del frame: la línea de definición de la función, no la
+    línea en curso, para que sus muestras se agreguen en un solo frame
+    """
+    codigo = frame.f_code
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Muestrear periódicamente la pila de un hilo (por defecto, el que lo crea)
+
+    Uso:
+        with SamplingProfiler() as perfil:
+            await predictor.predict(...)
+        texto = perfil.collapsed()
+
+    Las muestras en las que el hilo está esperando I/O en el event loop se
+    descartan, así que el resultado aproxima el tiempo de CPU del hilo. Si
+    hay otras peticiones concurrentes en el mismo event loop también aparecen.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval_ms: float = PROFILING_INTERVAL_MS):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval_ms / 1000.0
+        self.muestras: Counter = Counter()
+        self.muestras_ociosas = 0
+        self._stop = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._stop.clear()
+        self._hilo = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._hilo.join()
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            if frame.f_code.co_name in _FRAMES_OCIOSOS:
+                self.muestras_ociosas += 1
+                continue
+            pila = []
+            while frame is not None:
+                pila.append(_describir_frame(frame))
+                frame = frame.f_back
+            self.muestras[";".join(reversed(pila))] += 1
+
+    def collapsed(self) -> str:
+        """Pilas colapsadas: una línea 'raíz;...;hoja conteo' por pila distinta"""
+        lineas = [f"{pila} {conteo}" for pila, conteo in self.muestras.most_common()]
+        return "\n".join(lineas) + "\n"
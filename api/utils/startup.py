@@ -0,0 +1,102 @@
+"""
+Registro del arranque de la API
+Mide cuánto cuesta cada fase (importaciones pesadas, carga del modelo,
+calentamiento) y mantiene el estado de readiness que exponen /health/ready
+y /metrics.
+"""
+
+import importlib
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Dependencias pesadas que la API puede diferir (STARTUP_MODE=lazy)
+MODULOS_PESADOS = ("numpy", "pandas", "sklearn", "joblib", "tensorflow", "keras")
+
+
+class RegistroArranque:
+    """Fases del arranque con su duración y el estado de readiness"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases: Dict[str, float] = {}
+        self.estado = "iniciando"  # iniciando | cargando | listo | error
+        self.error: Optional[str] = None
+        self.listo_en: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def fase(self, nombre: str):
+        """Medir una fase del arranque"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracion = time.perf_counter() - t0
+            with self._lock:
+                self.fases[nombre] = self.fases.get(nombre, 0.0) + duracion
+            logger.info("⏱️ Arranque: %s en %.2fs", nombre, duracion,
+                        extra={"evento": "arranque_fase", "fase": nombre, "segundos": round(duracion, 3)})
+
+    def importar(self, modulos: Iterable[str] = MODULOS_PESADOS):
+        """
+        Importar los módulos pesados uno a uno, midiendo cada uno
+
+        Solo se atribuye tiempo al primer import de cada módulo; los que ya
+        estaban cargados (p. ej. precargados por run_prod.py) cuentan 0.
+        """
+        for nombre in modulos:
+            if nombre in sys.modules:
+                self.fases.setdefault(f"import:{nombre}", 0.0)
+                continue
+            try:
+                with self.fase(f"import:{nombre}"):
+                    importlib.import_module(nombre)
+            except ImportError:
+                logger.debug("Módulo opcional %s no disponible", nombre)
+
+    def marcar_listo(self):
+        self.listo_en = time.perf_counter() - self.inicio
+        self.estado = "listo"
+        logger.info("✅ API lista en %.2fs desde el arranque", self.listo_en,
+                    extra={"evento": "arranque_listo", "segundos": round(self.listo_en, 3)})
+
+    def marcar_error(self, error: Exception):
+        self.estado = "error"
+        self.error = str(error)
+
+    @property
+    def listo(self) -> bool:
+        return self.estado == "listo"
+
+    def resumen(self) -> Dict:
+        """Estado y desglose de tiempos (segundos) para /health/ready"""
+        return {
+            "estado": self.estado,
+            "error": self.error,
+            "segundos_desde_inicio": round(time.perf_counter() - self.inicio, 3),
+            "listo_en_segundos": round(self.listo_en, 3) if self.listo_en is not None else None,
+            "fases": {nombre: round(segundos, 3) for nombre, segundos in self.fases.items()},
+        }
+
+
+ARRANQUE = RegistroArranque()
+
+REGISTRY.gauge(
+    "aqi_startup_phase_seconds",
+    "Duración de cada fase del arranque",
+    lambda: {(nombre,): segundos for nombre, segundos in ARRANQUE.fases.items()},
+    ("phase",)
+)
+REGISTRY.gauge(
+    "aqi_ready",
+    "1 si el modelo está cargado y calentado",
+    lambda: 1.0 if ARRANQUE.listo else 0.0
+)
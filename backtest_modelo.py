@@ -0,0 +1,106 @@
+"""
+📊 BACKTESTING DEL MODELO SERVIDO
+================================================================
+Pasa el modelo (el bundle de la API o el indicado) por un histórico largo
+y calcula MAE, RMSE, R², sesgo y acierto de categoría EPA por horizonte,
+por estación y por hora del día (entrenamiento/backtesting.py).
+
+El histórico se recorre por tramos de `--tramo` ventanas, así que no hace
+falta que quepa en memoria:
+
+- `--dataset`: dataset de construir_dataset.py (con `--desde/--hasta` solo
+  se abren los shards de esos meses).
+- `--arrays X.npy y.npy [fechas.npy [estaciones.npy]]`: arrays en unidades
+  reales que se abren con mmap.
+
+Uso:
+    python backtest_modelo.py --dataset datos/dataset --desde 2024-01-01
+    python backtest_modelo.py --arrays X.npy y.npy fechas.npy --salida informes/backtest
+"""
+
+import os
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Reduce warnings de TensorFlow
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+from entrenamiento.backtesting import backtest, resumen, tramos_de_arrays, tramos_de_dataset
+from entrenamiento.evaluacion import cargar_modelo_servido, version_de
+
+
+def _contar(tramos, total):
+    """Pasar los tramos contando ventanas (para el progreso y las ventanas/s)"""
+    for tramo in tramos:
+        total[0] += len(tramo[0])
+        print(f"   ⏳ {total[0]:,} ventanas", end='\r', flush=True)
+        yield tramo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtesting del modelo por horizonte, estación y hora")
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument('--dataset', help="Directorio de construir_dataset.py")
+    origen.add_argument('--arrays', nargs='+', metavar='NPY', help="X.npy y.npy [fechas.npy [estaciones.npy]]")
+    parser.add_argument('--modelo', help="Bundle .aqib (por defecto el configurado en la API)")
+    parser.add_argument('--estaciones', nargs='+', help="Solo estas estaciones (--dataset)")
+    parser.add_argument('--desde', help="Fecha ISO de la primera ventana (--dataset)")
+    parser.add_argument('--hasta', help="Fecha ISO de la última ventana (--dataset)")
+    parser.add_argument('--tramo', type=int, default=65_536, help="Ventanas en memoria a la vez")
+    parser.add_argument('--lote', type=int, default=4096, help="Ventanas por llamada al modelo")
+    parser.add_argument('--salida', help="Directorio donde escribir las tablas en CSV")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("📊 BACKTESTING")
+    print("=" * 80)
+    bundle, model, scaler_y = cargar_modelo_servido(args.modelo)
+    print(f"🧠 Modelo: {version_de(bundle)}")
+
+    if args.dataset:
+        estaciones, tramos = tramos_de_dataset(args.dataset, args.estaciones, args.desde, args.hasta, args.tramo)
+    else:
+        if not 2 <= len(args.arrays) <= 4:
+            raise SystemExit("❌ --arrays espera X.npy y.npy [fechas.npy [estaciones.npy]]")
+        arrays = [np.load(ruta, mmap_mode='r') for ruta in args.arrays] + [None] * (4 - len(args.arrays))
+        X, y, fechas, codigos = arrays
+        if fechas is not None and np.issubdtype(fechas.dtype, np.datetime64):
+            fechas = fechas.astype('datetime64[ns]').view(np.int64)
+        estaciones = []
+        tramos = tramos_de_arrays(X, y, codigos, fechas, args.tramo)
+
+    total = [0]
+    t0 = time.perf_counter()
+    acumulado = backtest(model, _contar(tramos, total), scaler_y, escalador_x=bundle.scaler_x,
+                         estaciones=estaciones, lote=args.lote)
+    segundos = time.perf_counter() - t0
+    if not total[0]:
+        raise SystemExit("❌ No hay ventanas en el rango indicado")
+    print(f"\n✅ {total[0]:,} ventanas en {segundos:.1f}s ({total[0] / segundos:,.0f} ventanas/s)\n")
+
+    tablas = resumen(acumulado)
+    with pd.option_context('display.float_format', '{:.3f}'.format, 'display.width', 120):
+        print("🌐 Global\n", tablas['global'].to_string(), "\n", sep='')
+        print("⏱️ Por horizonte\n", tablas['horizonte'].to_string(), "\n", sep='')
+        por_estacion = acumulado.tabla(('estacion',)).sort_values('MAE', ascending=False)
+        print(f"📍 Por estación ({len(por_estacion)}, peor MAE primero)\n", por_estacion.head(20).to_string(), "\n", sep='')
+        por_hora = acumulado.tabla(('hora',))
+        print("🕐 Por hora del día (hora predicha)\n", por_hora.to_string(), sep='')
+
+    if args.salida:
+        salida = Path(args.salida)
+        salida.mkdir(parents=True, exist_ok=True)
+        for nombre, tabla in tablas.items():
+            tabla.to_csv(salida / f"backtest_{nombre}.csv")
+        print(f"\n💾 Tablas en {salida}")
+
+
+if __name__ == '__main__':
+    main()
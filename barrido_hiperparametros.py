@@ -0,0 +1,320 @@
+"""
+🔬 BARRIDO DE HIPERPARÁMETROS DEL LSTM + ATTENTION
+================================================================
+Sustituye a los experimentos a mano de TEMPO.ipynb: toma un espacio de
+búsqueda (unidades, lookback, dropout, learning rate, tamaño de lote),
+ejecuta los ensayos en un pool de procesos con un número fijo de hilos de
+TensorFlow por proceso y guarda cada resultado en el almacén SQLite de
+entrenamiento/experimentos.py.
+
+Poda por successive halving: todos los ensayos entrenan `--epocas-min`
+épocas; solo el mejor 1/eta (por val_loss) sigue hasta eta veces más épocas,
+y así hasta `--epocas-max`. Cada ensayo continúa desde su checkpoint (pesos
+y estado del optimizador) y usa early stopping: el que deja de mejorar se
+detiene aunque siga entre los mejores.
+
+Uso:
+    python barrido_hiperparametros.py --ensayos 27 --procesos 4
+    python barrido_hiperparametros.py --espacio espacio.json --historico datos_la.csv
+    python barrido_hiperparametros.py --mostrar 20            # solo consultar el almacén
+    python barrido_hiperparametros.py --importar-json experimentos_lstm.json
+
+Formato de --espacio (listas de valores por hiperparámetro):
+    {"unidades": [32, 64, 128], "lookback": [24, 48], "dropout": [0.1, 0.3],
+     "learning_rate": [0.0005, 0.001, 0.002], "lote": [32, 64]}
+"""
+
+import os
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Reduce warnings de TensorFlow
+
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+from entrenamiento.datos import FORECAST_HORIZONS, FEATURES, ventanas_entrenamiento_validacion
+from entrenamiento.pipeline import a_escalador_afin, escalado_de_ventanas
+from entrenamiento.experimentos import (
+    HIPERPARAMETROS, abrir_almacen, registrar_ensayo, mejores, resumen_por, importar_json
+)
+
+ESPACIO_POR_DEFECTO = {
+    'unidades': [32, 64, 128],
+    'lookback': [24, 48],
+    'dropout': [0.1, 0.3],
+    'learning_rate': [0.0005, 0.001, 0.002],
+    'lote': [32, 64],
+}
+
+
+def muestrear_espacio(espacio: Dict[str, List], n: int, semilla: int = 42) -> List[Dict]:
+    """La rejilla completa si tiene <= n puntos; si no, n puntos distintos al azar"""
+    faltan = [h for h in HIPERPARAMETROS if h not in espacio]
+    if faltan:
+        raise SystemExit(f"❌ Faltan hiperparámetros en el espacio: {faltan}")
+    rejilla = [dict(zip(HIPERPARAMETROS, valores))
+               for valores in itertools.product(*(espacio[h] for h in HIPERPARAMETROS))]
+    if len(rejilla) <= n:
+        return rejilla
+    return random.Random(semilla).sample(rejilla, n)
+
+
+def peldanos(epocas_min: int, epocas_max: int, eta: int) -> List[int]:
+    """Épocas acumuladas al final de cada peldaño: min, min*eta, ... hasta max"""
+    presupuesto = [epocas_min]
+    while presupuesto[-1] < epocas_max:
+        presupuesto.append(min(presupuesto[-1] * eta, epocas_max))
+    return presupuesto
+
+
+# ============================================================================
+# PROCESOS DEL POOL
+# ============================================================================
+
+_DATOS: Dict = {}
+_CACHE_VENTANAS: Dict[int, tuple] = {}
+
+
+def _iniciar_proceso(hilos: int, datos: Dict):
+    """Limitar los hilos antes de importar TensorFlow (cada proceso usa `hilos` núcleos)"""
+    for variable in ('OMP_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[variable] = str(hilos)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(hilos)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    _DATOS.update(datos)
+
+
+def _ventanas(lookback: int):
+    """Ventanas normalizadas de entrenamiento y validación (una vez por lookback y proceso)"""
+    if lookback not in _CACHE_VENTANAS:
+        d = _DATOS
+        (X, y), (X_val, y_val) = ventanas_entrenamiento_validacion(
+            d['horas'], d['series'], d['series_validacion'], 3000, 7000, d['historico'], lookback=lookback
+        )
+        # MinMax con el rango de entrenamiento; y con el rango del AQI (como reentrenar)
+        escalador_x, escalador_y = (a_escalador_afin(e) for e in escalado_de_ventanas(X))
+        norm_x = lambda V: escalador_x.transform(V).astype(np.float32)
+        norm_y = lambda V: escalador_y.transform(V).astype(np.float32)
+        _CACHE_VENTANAS[lookback] = (norm_x(X), norm_y(y), norm_x(X_val), norm_y(y_val))
+    return _CACHE_VENTANAS[lookback]
+
+
+def entrenar_tramo(tarea: Dict) -> Dict:
+    """
+    Entrenar un ensayo hasta `tarea['hasta']` épocas acumuladas
+
+    Continúa desde el checkpoint del peldaño anterior si existe. Solo se
+    sobrescribe el checkpoint si el tramo mejora la mejor val_loss.
+    """
+    from tensorflow import keras
+    from tensorflow.keras.callbacks import EarlyStopping
+    from entrenamiento.modelos import crear_modelo_lstm_attention, AttentionLayer
+
+    cfg = tarea['configuracion']
+    Xn, yn, Xn_val, yn_val = _ventanas(cfg['lookback'])
+    checkpoint = Path(tarea['checkpoint'])
+    t0 = time.perf_counter()
+
+    if tarea['epocas'] > 0 and checkpoint.exists():
+        model = keras.models.load_model(checkpoint, custom_objects={'AttentionLayer': AttentionLayer})
+    else:
+        model = crear_modelo_lstm_attention(
+            (cfg['lookback'], len(FEATURES)), len(FORECAST_HORIZONS),
+            unidades=cfg['unidades'], dropout=cfg['dropout']
+        )
+        model.compile(optimizer=keras.optimizers.Adam(learning_rate=cfg['learning_rate']), loss='mse')
+
+    parada = EarlyStopping(monitor='val_loss', patience=tarea['paciencia'], restore_best_weights=True)
+    historia = model.fit(
+        Xn, yn,
+        validation_data=(Xn_val, yn_val),
+        initial_epoch=tarea['epocas'],
+        epochs=tarea['hasta'],
+        batch_size=cfg['lote'],
+        callbacks=[parada],
+        verbose=0
+    )
+    val_loss = historia.history['val_loss']
+    epocas = tarea['epocas'] + len(val_loss)
+    mejor_tramo = float(min(val_loss))
+    mejora = tarea['val_loss'] is None or mejor_tramo < tarea['val_loss']
+
+    resultado = {
+        'nombre': tarea['nombre'],
+        'epocas': epocas,
+        'val_loss': tarea['val_loss'],
+        'mejor_epoca': tarea['mejor_epoca'],
+        'metricas': tarea['metricas'],
+        'segundos': tarea['segundos'] + time.perf_counter() - t0,
+        # Detenido: el early stopping cortó el tramo o no mejoró lo anterior
+        'detenido': epocas < tarea['hasta'] or not mejora,
+    }
+    if mejora:
+        model.save(checkpoint)
+        pred = model.predict(Xn_val, batch_size=1024, verbose=0)
+        error = pred - yn_val
+        r2 = 1 - (error ** 2).sum(axis=0) / ((yn_val - yn_val.mean(axis=0)) ** 2).sum(axis=0)
+        # Mismas claves que guardar_experimento (escala normalizada)
+        metricas = {f"R2_{h}h": float(r) for h, r in zip(FORECAST_HORIZONS, r2)}
+        metricas.update({
+            'R2_promedio': float(r2.mean()),
+            'MAE_prom': float(np.abs(error).mean()),
+            'RMSE_prom': float(np.sqrt((error ** 2).mean())),
+        })
+        resultado.update({
+            'val_loss': mejor_tramo,
+            'mejor_epoca': tarea['epocas'] + int(np.argmin(val_loss)) + 1,
+            'metricas': metricas,
+        })
+    return resultado
+
+
+# ============================================================================
+# BARRIDO
+# ============================================================================
+
+def mostrar(con, n: int, barrido=None):
+    filas = mejores(con, n, barrido)
+    if not filas:
+        print("⚠️ No hay ensayos en el almacén")
+        return
+    print(f"\n{'barrido':<22} {'ensayo':<14} {'unid':>5} {'lookb':>5} {'drop':>5} {'lr':>8} {'lote':>5} "
+          f"{'épocas':>6} {'val_loss':>9} {'MAE':>7} {'R²':>6} {'estado':<11}")
+    for f in filas:
+        r2 = f"{f['r2']:>6.3f}" if f['r2'] is not None else f"{'-':>6}"
+        mae = f"{f['mae']:>7.4f}" if f['mae'] is not None else f"{'-':>7}"
+        print(f"{f['barrido'][:22]:<22} {f['nombre'][:14]:<14} {f['unidades'] or '-':>5} {f['lookback'] or '-':>5} "
+              f"{f['dropout'] if f['dropout'] is not None else '-':>5} {f['learning_rate'] or '-':>8} "
+              f"{f['lote'] or '-':>5} {f['epocas'] or '-':>6} {f['val_loss']:>9.5f} {mae} {r2} {f['estado']:<11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido de hiperparámetros con successive halving")
+    parser.add_argument('--espacio', help="JSON con los valores de cada hiperparámetro")
+    parser.add_argument('--ensayos', type=int, default=27, help="Configuraciones a probar")
+    parser.add_argument('--epocas-min', type=int, default=2, help="Épocas del primer peldaño")
+    parser.add_argument('--epocas-max', type=int, default=18)
+    parser.add_argument('--eta', type=int, default=3, help="Sigue 1 de cada eta ensayos por peldaño")
+    parser.add_argument('--paciencia', type=int, default=3, help="Early stopping (épocas sin mejorar)")
+    parser.add_argument('--procesos', type=int, default=max(1, (os.cpu_count() or 1) // 2))
+    parser.add_argument('--hilos', type=int, help="Hilos de TensorFlow por proceso (por defecto núcleos/procesos)")
+    parser.add_argument('--series', type=int, default=8, help="Series sintéticas de entrenamiento")
+    parser.add_argument('--series-validacion', type=int, default=2)
+    parser.add_argument('--horas', type=int, default=3000)
+    parser.add_argument('--historico', nargs='*', default=[], help="CSV/parquet horarios con FEATURES")
+    parser.add_argument('--almacen', default=str(BASE_DIR / 'experimentos.db'))
+    parser.add_argument('--nombre', help="Nombre del barrido (por defecto barrido_<fecha>)")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--mostrar', type=int, metavar='N', help="Solo mostrar los N mejores ensayos del almacén")
+    parser.add_argument('--importar-json', metavar='RUTA', help="Importar un experimentos_lstm.json al almacén")
+    args = parser.parse_args()
+
+    con = abrir_almacen(args.almacen)
+    if args.importar_json:
+        print(f"✅ {importar_json(con, args.importar_json)} experimentos importados de {args.importar_json}")
+    if args.mostrar or args.importar_json:
+        mostrar(con, args.mostrar or 10)
+        return
+
+    espacio = ESPACIO_POR_DEFECTO
+    if args.espacio:
+        with open(args.espacio, 'r', encoding='utf-8') as f:
+            espacio = json.load(f)
+    configuraciones = muestrear_espacio(espacio, args.ensayos, args.semilla)
+    presupuesto = peldanos(args.epocas_min, args.epocas_max, args.eta)
+    barrido = args.nombre or f"barrido_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    hilos = args.hilos or max(1, (os.cpu_count() or 1) // args.procesos)
+    trabajo = Path(tempfile.mkdtemp(prefix='barrido_'))
+
+    print("=" * 80)
+    print("🔬 BARRIDO DE HIPERPARÁMETROS (successive halving)")
+    print("=" * 80)
+    print(f"📋 {barrido}: {len(configuraciones)} ensayos, peldaños {presupuesto} épocas, eta={args.eta}")
+    print(f"⚙️ {args.procesos} procesos x {hilos} hilos | almacén {args.almacen}")
+
+    ensayos = {}
+    for i, cfg in enumerate(configuraciones):
+        nombre = f"ensayo_{i:03d}"
+        ensayos[nombre] = {
+            'nombre': nombre, 'configuracion': cfg, 'epocas': 0, 'val_loss': None,
+            'mejor_epoca': None, 'metricas': None, 'segundos': 0.0, 'detenido': False,
+            'checkpoint': str(trabajo / f"{nombre}.keras"), 'paciencia': args.paciencia,
+        }
+        registrar_ensayo(con, barrido, {**ensayos[nombre], 'estado': 'pendiente', 'peldano': 0})
+
+    datos = {'series': args.series, 'series_validacion': args.series_validacion,
+             'horas': args.horas, 'historico': args.historico}
+    activos = list(ensayos)
+    t0 = time.perf_counter()
+    try:
+        # spawn: cada proceso importa TensorFlow de cero con sus límites de hilos
+        with ProcessPoolExecutor(
+            max_workers=args.procesos,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_iniciar_proceso,
+            initargs=(hilos, datos)
+        ) as pool:
+            for peldano, hasta in enumerate(presupuesto):
+                print(f"\n🪜 Peldaño {peldano}: {len(activos)} ensayos hasta {hasta} épocas")
+                futuros = {
+                    pool.submit(entrenar_tramo, {**ensayos[n], 'hasta': hasta}): n
+                    for n in activos if not ensayos[n]['detenido']
+                }
+                for futuro in as_completed(futuros):
+                    r = futuro.result()
+                    ensayo = ensayos[r['nombre']]
+                    ensayo.update(r)
+                    registrar_ensayo(con, barrido, {
+                        **ensayo, 'peldano': peldano,
+                        'estado': 'detenido' if ensayo['detenido'] else 'en_curso',
+                    })
+                    cfg = ensayo['configuracion']
+                    print(f"   {'⏹️' if ensayo['detenido'] else '✅'} {r['nombre']} "
+                          f"{json.dumps(cfg)}: val_loss {ensayo['val_loss']:.5f} ({ensayo['epocas']} épocas)")
+
+                # Successive halving: sigue el mejor 1/eta (los detenidos compiten pero no entrenan)
+                ordenados = sorted(activos, key=lambda n: ensayos[n]['val_loss'])
+                siguen = ordenados[:max(1, math.ceil(len(ordenados) / args.eta))]
+                ultimo = peldano == len(presupuesto) - 1
+                for n in activos:
+                    if ultimo or n not in siguen:
+                        estado = 'completado' if ultimo or ensayos[n]['detenido'] else 'podado'
+                        registrar_ensayo(con, barrido, {**ensayos[n], 'peldano': peldano, 'estado': estado})
+                activos = siguen
+                if all(ensayos[n]['detenido'] for n in activos):
+                    for n in activos:
+                        registrar_ensayo(con, barrido, {**ensayos[n], 'peldano': peldano, 'estado': 'completado'})
+                    break
+    finally:
+        shutil.rmtree(trabajo, ignore_errors=True)
+
+    epocas_totales = sum(e['epocas'] for e in ensayos.values())
+    print(f"\n⏱️ {time.perf_counter() - t0:.0f}s | {epocas_totales} épocas entrenadas "
+          f"(sin poda: {len(ensayos) * args.epocas_max})")
+    mostrar(con, 10, barrido)
+    print("\n📊 Mejor val_loss por hiperparámetro:")
+    for h in HIPERPARAMETROS:
+        valores = ", ".join(f"{f['valor']}: {f['mejor']:.5f}" for f in resumen_por(con, h, barrido))
+        print(f"   {h:<14} {valores}")
+    print("=" * 80)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark del cálculo vectorizado del AQI (api/utils/aqi.py)
+
+Compara subíndice, AQI total de 4 contaminantes y categoría con el bucle
+por valor que usaban predictor.py y openaq_fetcher.py (el bucle se mide
+sobre 100k valores; a 1M tardaría demasiado). La inversa no tenía versión
+en bucle comparable.
+
+Uso:
+    python benchmarks/bench_aqi.py --valores 1000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+API_DIR = Path(__file__).resolve().parent.parent / "api"
+sys.path.insert(0, str(API_DIR))
+
+from utils.aqi import LIMITES_CATEGORIAS, TABLAS, aqi_total, categoria, concentracion_desde_aqi, subindice
+
+
+# Tramos como tuplas de Python, igual que en la implementación anterior
+TRAMOS = {
+    c: list(zip(t.c_bajo.tolist(), t.c_alto.tolist(), t.i_bajo.tolist(), t.i_alto.tolist()))
+    for c, t in TABLAS.items()
+}
+
+
+def subindice_bucle(tramos, valor: float) -> float:
+    """La implementación anterior: recorrer los tramos con un for"""
+    for c_low, c_high, aqi_low, aqi_high in tramos:
+        if c_low <= valor <= c_high:
+            return ((aqi_high - aqi_low) / (c_high - c_low)) * (valor - c_low) + aqi_low
+    return 500.0
+
+
+def medir(funcion, n: int, repeticiones: int) -> float:
+    """Valores/s de la mejor repetición"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return n / mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del cálculo vectorizado del AQI")
+    parser.add_argument("--valores", type=int, default=1_000_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    n, r = args.valores, args.repeticiones
+    rng = np.random.default_rng(0)
+    valores = {
+        "PM2.5": np.round(rng.gamma(2.0, 12.0, n), 1),
+        "O3": np.round(rng.uniform(0, 120, n)),
+        "NO2": np.round(rng.uniform(0, 200, n)),
+    }
+    valores["PM10"] = np.round(valores["PM2.5"] * rng.uniform(1.3, 2.4, n))
+    aqi = subindice("PM2.5", valores["PM2.5"])
+
+    m = min(n, 100_000)
+    listas = {c: v[:m].tolist() for c, v in valores.items()}
+    aqi_lista = aqi[:m].tolist()
+    limites = LIMITES_CATEGORIAS.tolist()
+
+    resultados = {
+        "subindice PM2.5": (
+            medir(lambda: subindice("PM2.5", valores["PM2.5"]), n, r),
+            medir(lambda: [subindice_bucle(TRAMOS["PM2.5"], v) for v in listas["PM2.5"]], m, r),
+        ),
+        "AQI total (4)": (
+            medir(lambda: aqi_total(valores), n, r),
+            medir(lambda: [max(subindice_bucle(TRAMOS[c], listas[c][i]) for c in listas) for i in range(m)], m, r),
+        ),
+        "categoría": (
+            medir(lambda: categoria(aqi), n, r),
+            medir(lambda: [next((k for k, l in enumerate(limites) if a <= l), len(limites)) for a in aqi_lista], m, r),
+        ),
+        "inversa PM2.5": (medir(lambda: concentracion_desde_aqi("PM2.5", aqi), n, r), None),
+    }
+
+    print(f"\n{n:,} valores")
+    print(f"{'operación':<16} {'vectorizado/s':>14} {'bucle/s':>12} {'aceleración':>12}")
+    for nombre, (vectorizado, bucle) in resultados.items():
+        print(f"{nombre:<16} {vectorizado:>14,.0f} {bucle or 0:>12,.0f} "
+              f"{f'{vectorizado / bucle:.0f}x' if bucle else '-':>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark del ensemble fusionado (utils/ensemble.py)
+Compara la llamada única al grafo fusionado con una llamada compilada por
+miembro y con una llamada predict() por miembro (la forma ingenua), tomando
+como referencia un solo modelo. Para medir con más miembros que bundles
+distintos se puede repetir una ruta.
+
+Uso:
+    python benchmarks/bench_ensemble.py --bundles a.aqib b.aqib --lotes 1 32 --repeticiones 50
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+API_DIR = Path(__file__).resolve().parent.parent / "api"
+sys.path.insert(0, str(API_DIR))
+
+
+def medir(funcion, repeticiones: int) -> dict:
+    funcion()  # calentar (trazado del grafo)
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    tiempos.sort()
+    return {"p50": tiempos[len(tiempos) // 2], "p99": tiempos[int(len(tiempos) * 0.99) - 1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste del ensemble fusionado frente a llamadas por miembro")
+    parser.add_argument("--bundles", nargs="+", required=True, help="Bundles .aqib de los miembros")
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+    from config.config import LOOKBACK_HOURS, MODEL_FEATURES
+    from utils.ensemble import cargar_ensemble
+    from utils.predictor import obtener_custom_objects
+
+    ensemble = cargar_ensemble(args.bundles, custom_objects=obtener_custom_objects())
+    forma = [None, LOOKBACK_HOURS, len(MODEL_FEATURES)]
+    compilados = [
+        tf.function(lambda X, m=m: m(X, training=False), input_signature=[tf.TensorSpec(forma, tf.float32)])
+        for m in ensemble.miembros
+    ]
+    n = len(ensemble.miembros)
+    rng = np.random.default_rng(0)
+
+    print(f"\nMiembros: {n} ({', '.join(ensemble.versiones)})")
+    print(f"{'lote':>5} {'1 modelo':>10} {'fusionado':>10} {'N compilados':>13} {'N predict()':>12} {'fusionado/1':>12}")
+    for lote in args.lotes:
+        X = rng.uniform(0, 50, size=(lote, LOOKBACK_HOURS, len(MODEL_FEATURES))).astype(np.float32)
+        uno = medir(lambda: compilados[0](X).numpy(), args.repeticiones)
+        fusionado = medir(lambda: ensemble.predecir(X), args.repeticiones)
+        secuencial = medir(lambda: [f(X).numpy() for f in compilados], args.repeticiones)
+        ingenuo = medir(
+            lambda: [m.predict(X, verbose=0) for m in ensemble.miembros],
+            max(3, args.repeticiones // 5)
+        )
+        print(f"{lote:>5} {uno['p50']:>8.1f}ms {fusionado['p50']:>8.1f}ms {secuencial['p50']:>11.1f}ms "
+              f"{ingenuo['p50']:>10.1f}ms {fusionado['p50'] / uno['p50']:>11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark del perfil de rendimiento del entrenamiento en CPU
+(entrenamiento/rendimiento.py)
+
+Mide ventanas/s del paso de entrenamiento con cada opción: hilos intra/inter,
+jit_compile (XLA), precisión mixta bfloat16 y lote grande con learning rate
+escalado. Cada configuración corre en un proceso nuevo (los hilos y la
+política de precisión son globales en TensorFlow). Se descarta la primera
+tanda de pasos (trazado y compilación) y se informa también de la pérdida
+al final de los pasos medidos, para ver que bf16 o el lote grande no divergen.
+
+Uso:
+    python benchmarks/bench_entrenamiento_cpu.py --arquitectura tcn --pasos 50
+    python benchmarks/bench_entrenamiento_cpu.py --hilos 1 4 8 --lotes 32 256
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+
+def medir(config: dict) -> dict:
+    """Entrenar `pasos` lotes con una configuración (en un proceso propio)"""
+    from entrenamiento.rendimiento import aplicar_perfil
+    from entrenamiento.datos import LOOKBACK, FORECAST_HORIZONS, FEATURES
+
+    args = SimpleNamespace(
+        hilos_intra=config['hilos'], hilos_inter=config.get('inter', 0), jit=config['jit'],
+        bf16='si' if config['bf16'] else 'no', lote=config['lote'],
+        escalar_lr='lineal' if config['lote'] > 32 else 'no', calentamiento=0
+    )
+    perfil = aplicar_perfil(args)
+
+    import tensorflow as tf
+    from tensorflow import keras
+    from entrenamiento.modelos import ARQUITECTURAS
+
+    rng = np.random.default_rng(0)
+    n = 4096
+    X = rng.uniform(size=(n, LOOKBACK, len(FEATURES))).astype(np.float32)
+    y = (X[:, -1, -1:] + 0.1 * rng.normal(size=(n, len(FORECAST_HORIZONS)))).astype(np.float32)
+    ds = tf.data.Dataset.from_tensor_slices((X, y)).repeat().batch(perfil['lote']).prefetch(tf.data.AUTOTUNE)
+
+    model = ARQUITECTURAS[config['arquitectura']][0]((LOOKBACK, len(FEATURES)), len(FORECAST_HORIZONS))
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=perfil['lr']), loss='mse',
+                  jit_compile=perfil['jit_compile'])
+
+    model.fit(ds, steps_per_epoch=config['calentamiento'], epochs=1, verbose=0, shuffle=False)  # trazado y compilación
+    t0 = time.perf_counter()
+    historia = model.fit(ds, steps_per_epoch=config['pasos'], epochs=1, verbose=0, shuffle=False,
+                         callbacks=perfil['callbacks'])
+    segundos = time.perf_counter() - t0
+    return {**config, 'bf16': perfil['bf16'], 'lr': perfil['lr'],
+            'ventanas_s': config['pasos'] * perfil['lote'] / segundos,
+            'loss': float(historia.history['loss'][-1])}
+
+
+def main():
+    from entrenamiento.rendimiento import cpu_admite_bf16
+
+    parser = argparse.ArgumentParser(description="Ventanas/s del entrenamiento con cada opción de rendimiento")
+    parser.add_argument('--arquitectura', choices=['lstm_attention', 'tcn'], default='lstm_attention')
+    parser.add_argument('--hilos', type=int, nargs='+', help="Valores de hilos intra-op (por defecto 1 y todos)")
+    parser.add_argument('--lotes', type=int, nargs='+', default=[32, 256])
+    parser.add_argument('--pasos', type=int, default=30, help="Pasos medidos por configuración")
+    parser.add_argument('--calentamiento', type=int, default=5, help="Pasos descartados (trazado/XLA)")
+    args = parser.parse_args()
+
+    nucleos = os.cpu_count() or 1
+    hilos = args.hilos or sorted({1, nucleos})
+    bf16 = [False, True] if cpu_admite_bf16() else [False]
+    base = {'arquitectura': args.arquitectura, 'pasos': args.pasos, 'calentamiento': args.calentamiento}
+
+    configs = []
+    # Hilos con el resto por defecto; después jit/bf16 y lotes con todos los hilos
+    for h in hilos:
+        configs.append({**base, 'hilos': h, 'jit': False, 'bf16': False, 'lote': args.lotes[0]})
+    for lote in args.lotes:
+        for jit in (False, True):
+            for b in bf16:
+                c = {**base, 'hilos': hilos[-1], 'jit': jit, 'bf16': b, 'lote': lote}
+                if c not in configs:
+                    configs.append(c)
+
+    print(f"\n{args.arquitectura} | {nucleos} núcleos | bf16 nativo: {'sí' if cpu_admite_bf16() else 'no'}")
+    print(f"{'hilos':>5} {'lote':>5} {'lr':>8} {'jit':>4} {'bf16':>5} {'ventanas/s':>11} {'vs base':>8} {'loss':>8}")
+    referencia = None
+    contexto = multiprocessing.get_context('spawn')
+    for config in configs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+            try:
+                r = pool.submit(medir, config).result()
+            except Exception as e:
+                print(f"{config['hilos']:>5} {config['lote']:>5} {'':>8} {'sí' if config['jit'] else 'no':>4} "
+                      f"{'sí' if config['bf16'] else 'no':>5}   error: {str(e).splitlines()[0][:60]}")
+                continue
+        referencia = referencia or r['ventanas_s']
+        print(f"{r['hilos']:>5} {r['lote']:>5} {r['lr']:>8.4g} {'sí' if r['jit'] else 'no':>4} "
+              f"{'sí' if r['bf16'] else 'no':>5} {r['ventanas_s']:>11,.0f} {r['ventanas_s'] / referencia:>7.2f}x "
+              f"{r['loss']:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark del pipeline de logging bajo carga
+Emite los mismos registros, al mismo nivel (INFO) y con el mismo formato,
+con los handlers de consola y fichero síncronos (basicConfig) y con la cola
+no bloqueante de utils.logging_config, con y sin el límite de tasa, así que
+la diferencia es solo el handler.
+
+Cada "petición" reproduce los registros de AQIPredictor.predict y
+OpenAQFetcher y cede el event loop entre etapas, como las llamadas await.
+
+Uso:
+    python benchmarks/bench_logging.py --peticiones 2000 --concurrencia 64
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent.parent / "api"
+sys.path.insert(0, str(API_DIR))
+
+# sincrono: handlers en el event loop; cola: QueueHandlerNoBloqueante sin límite
+# de tasa; cola_limite: además el límite por punto de emisión por defecto
+MODOS = ("sincrono", "cola", "cola_limite")
+
+MEDICIONES = {
+    "PM2.5": 12.0, "PM10": 40.0, "O3": 30.0, "NO2": 56.0,
+    "temperatura": 20.0, "humedad": 60.0, "viento": 8.0, "AQI": 59.0
+}
+
+
+async def peticion(logger, lat, lon):
+    """Registros de una predicción (AQIPredictor.predict + OpenAQFetcher), todos a INFO"""
+    logger.info(
+        "🌍 Obteniendo datos en tiempo real de OpenAQ para (%s, %s)", lat, lon,
+        extra={"evento": "openaq_busqueda", "latitud": lat, "longitud": lon}
+    )
+    logger.info("🔍 Buscando estaciones OpenAQ en radio de %skm...", 25.0)
+    logger.info("🌍 Obteniendo datos OpenAQ para (%s, %s)", lat, lon)
+    logger.info("🔍 Consultando OpenAQ: %s", "https://api.openaq.org/v3/locations")
+    await asyncio.sleep(0)
+    logger.info("✅ Encontradas %d estaciones cerca de (%s, %s)", 3, lat, lon,
+                extra={"evento": "openaq_estaciones", "estaciones": ["Estación 0", "Estación 1", "Estación 2"]})
+    for param, valor in MEDICIONES.items():
+        logger.info("   ✓ %s: %.2f (de %d mediciones)", param, valor, 3)
+    logger.info("📊 Datos OpenAQ completos: %s", MEDICIONES)
+    await asyncio.sleep(0)
+    logger.info("📊 Obteniendo datos históricos para predicción...")
+    logger.info("🔮 Realizando predicción...")
+    await asyncio.sleep(0)
+    logger.info("✅ AQI calculado desde PM2.5: %.1f (PM2.5=%.1f µg/m³)", 50.0, 12.0,
+                extra={"evento": "aqi_actual", "aqi": 50.0, "pm25": 12.0})
+
+
+async def carga(modo, peticiones, concurrencia):
+    logger = logging.getLogger("bench")
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias = []
+
+    async def una(i):
+        async with semaforo:
+            inicio = time.perf_counter()
+            await peticion(logger, 34.05 + i * 1e-4, -118.24)
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una(i) for i in range(peticiones)))
+    return latencias, time.perf_counter() - inicio
+
+
+def ejecutar_modo(modo, peticiones, concurrencia, directorio):
+    """Ejecutar un modo en este proceso (stdout/stderr redirigidos a disco)"""
+    salida = open(os.path.join(directorio, f"stdout_{modo}.log"), "w", encoding="utf-8")
+    sys.stdout = sys.stderr = salida
+    archivo = os.path.join(directorio, f"api_{modo}.log")
+
+    if modo == "sincrono":
+        # Mismos destinos y formato, pero escritos en el hilo del event loop
+        from utils.logging_config import FormateadorTexto
+        formateador = FormateadorTexto('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        destinos = [logging.StreamHandler(), logging.FileHandler(archivo, mode='a', encoding='utf-8')]
+        for destino in destinos:
+            destino.setFormatter(formateador)
+        logging.basicConfig(level=logging.INFO, handlers=destinos)
+    else:
+        # El límite por punto de emisión se lee de la configuración al importar
+        os.environ["LOG_RATE_LIMIT_PER_SECOND"] = "0" if modo == "cola" else "5"
+        from utils.logging_config import configurar_logging, detener_logging
+        configurar_logging(archivo)
+
+    latencias, total = asyncio.run(carga(modo, peticiones, concurrencia))
+    if modo != "sincrono":
+        detener_logging()
+    latencias.sort()
+    return {
+        "modo": modo,
+        "p50_ms": latencias[len(latencias) // 2] * 1000,
+        "p99_ms": latencias[int(len(latencias) * 0.99)] * 1000,
+        "peticiones_por_s": peticiones / total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=64)
+    parser.add_argument("--modo", choices=MODOS, help=argparse.SUPPRESS)
+    parser.add_argument("--directorio", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        resultado = ejecutar_modo(args.modo, args.peticiones, args.concurrencia, args.directorio)
+        sys.__stdout__.write(json.dumps(resultado) + "\n")
+        return
+
+    # Cada modo en un proceso limpio para no mezclar la configuración de logging
+    with tempfile.TemporaryDirectory() as directorio:
+        resultados = []
+        for modo in MODOS:
+            salida = subprocess.run(
+                [sys.executable, __file__, "--modo", modo, "--directorio", directorio,
+                 "--peticiones", str(args.peticiones), "--concurrencia", str(args.concurrencia)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            resultados.append(json.loads(salida.strip().splitlines()[-1]))
+
+    print(f"{'modo':<12} {'p50 (ms)':>10} {'p99 (ms)':>10} {'pet/s':>10}")
+    for r in resultados:
+        print(f"{r['modo']:<12} {r['p50_ms']:>10.2f} {r['p99_ms']:>10.2f} {r['peticiones_por_s']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark del coste de la incertidumbre MC dropout
+Compara, para varios K, la pasada única con K réplicas en el batch
+(utils.mc_dropout.EstimadorMC) con K llamadas secuenciales de una réplica
+(misma función compilada), tomando como referencia la llamada determinista
+que ya hace cada predicción.
+
+Uso:
+    python benchmarks/bench_mc_dropout.py --muestras 8 16 32 64 128 --repeticiones 50
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+API_DIR = Path(__file__).resolve().parent.parent / "api"
+sys.path.insert(0, str(API_DIR))
+
+
+def medir(funcion, repeticiones: int) -> dict:
+    funcion()  # calentar (trazado del grafo)
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    tiempos.sort()
+    return {"p50": tiempos[len(tiempos) // 2], "p99": tiempos[int(len(tiempos) * 0.99) - 1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste de MC dropout por número de réplicas")
+    parser.add_argument("--muestras", type=int, nargs="+", default=[8, 16, 32, 64, 128])
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--sin-secuencial", action="store_true", help="No medir K llamadas secuenciales")
+    args = parser.parse_args()
+
+    from config.config import LOOKBACK_HOURS, MODEL_FEATURES
+    from utils.mc_dropout import EstimadorMC
+    from utils.predictor import AQIPredictor
+
+    predictor = AQIPredictor()
+    model = predictor.model
+    X = np.random.default_rng(0).uniform(size=(1, LOOKBACK_HOURS, len(MODEL_FEATURES))).astype(np.float32)
+
+    base = medir(lambda: model.predict(X, verbose=0), args.repeticiones)
+    print(f"\nReferencia: predict() determinista p50 {base['p50']:.1f} ms, p99 {base['p99']:.1f} ms\n")
+    print(f"{'K':>5} {'lote p50':>10} {'lote p99':>10} {'secuencial p50':>15} {'aceleración':>12}")
+
+    # Secuencial justo: la misma función compilada, con una réplica por llamada
+    una_replica = EstimadorMC(model, 1)
+
+    for k in args.muestras:
+        estimador = EstimadorMC(model, k)
+        lote = medir(lambda: estimador.muestrear(X), args.repeticiones)
+        if args.sin_secuencial:
+            print(f"{k:>5} {lote['p50']:>9.1f}ms {lote['p99']:>9.1f}ms {'-':>15} {'-':>12}")
+            continue
+        secuencial = medir(
+            lambda: [una_replica.muestrear(X) for _ in range(k)],
+            max(3, args.repeticiones // 10)
+        )
+        print(f"{k:>5} {lote['p50']:>9.1f}ms {lote['p99']:>9.1f}ms {secuencial['p50']:>13.1f}ms "
+              f"{secuencial['p50'] / lote['p50']:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
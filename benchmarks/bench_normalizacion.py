@@ -0,0 +1,122 @@
+"""
+Benchmark de la normalización de mediciones de OpenAQ (api/utils/normalizacion.py)
+
+Compara promedios_por_parametro con el bucle que usaba
+OpenAQFetcher._process_measurements (diccionario de nombres rehecho en cada
+medición, _convert_units valor a valor y np.mean por parámetro) sobre el
+mismo lote de registros sintéticos con la forma de OpenAQ v3.
+
+Uso:
+    python benchmarks/bench_normalizacion.py --registros 500000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+API_DIR = Path(__file__).resolve().parent.parent / "api"
+sys.path.insert(0, str(API_DIR))
+
+from utils.normalizacion import normalizar, promedios, promedios_por_parametro
+
+# (nombre, unidad) como los devuelve OpenAQ, incluidos parámetros que el modelo no usa
+TIPOS = [
+    ("pm25", "µg/m³"), ("pm10", "µg/m³"), ("o3", "ppb"), ("o3", "ppm"), ("no2", "ppb"),
+    ("no2", "µg/m³"), ("temperature", "c"), ("temperature", "f"), ("relativehumidity", "%"),
+    ("wind_speed", "m/s"), ("co", "ppm"), ("so2", "ppb"), ("bc", "µg/m³"),
+]
+
+
+def convertir_bucle(value: float, unit: str, parameter: str) -> float:
+    """_convert_units anterior"""
+    unit = unit.lower()
+    if parameter in ["PM2.5", "PM10"]:
+        return value
+    elif parameter == "O3":
+        return value * 2.0 if "ppb" in unit else value
+    elif parameter == "NO2":
+        return value * 1.88 if "ppb" in unit else value
+    elif parameter == "temperatura":
+        return (value - 32) * 5/9 if "f" in unit or "fahrenheit" in unit else value
+    return value
+
+
+def procesar_bucle(measurements):
+    """_process_measurements anterior (sin el AQI ni los valores por defecto)"""
+    params_data = {}
+    for measurement in measurements:
+        parameter_info = measurement.get("parameter", {})
+        parameter = parameter_info.get("name", "").lower()
+        value = measurement.get("value")
+        unit = parameter_info.get("units", "")
+        if value is None:
+            continue
+        param_mapping = {
+            "pm25": "PM2.5", "pm2.5": "PM2.5", "pm10": "PM10", "o3": "O3", "no2": "NO2",
+            "temperature": "temperatura", "humidity": "humedad",
+            "wind_speed": "viento", "windspeed": "viento", "ws": "viento",
+        }
+        mapped_param = param_mapping.get(parameter)
+        if mapped_param:
+            params_data.setdefault(mapped_param, []).append(convertir_bucle(value, unit, mapped_param))
+    return {param: float(np.mean(values)) for param, values in params_data.items() if values}
+
+
+def registros_sinteticos(n: int, semilla: int = 0):
+    rng = np.random.default_rng(semilla)
+    tipos = rng.integers(0, len(TIPOS), n)
+    valores = rng.gamma(2.0, 15.0, n)
+    faltan = rng.random(n) < 0.02
+    return [
+        {"parameter": {"name": TIPOS[t][0], "units": TIPOS[t][1]},
+         "value": None if falta else float(v), "locationsId": int(i % 500)}
+        for i, (t, v, falta) in enumerate(zip(tipos.tolist(), valores.tolist(), faltan.tolist()))
+    ]
+
+
+def medir(funcion, n: int, repeticiones: int) -> float:
+    """Registros/s de la mejor repetición"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return n / mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la normalización de mediciones de OpenAQ")
+    parser.add_argument("--registros", type=int, default=500_000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    n, r = args.registros, args.repeticiones
+    registros = registros_sinteticos(n)
+
+    # Misma respuesta que el bucle en lo que este ya entendía (no convertía ppm)
+    comparables = [m for m in registros if m["parameter"]["units"] != "ppm"]
+    anterior = procesar_bucle(comparables)
+    nuevo = promedios_por_parametro(comparables)
+    for param, media in anterior.items():
+        assert abs(nuevo[param][0] - media) <= 1e-9 * max(1.0, abs(media)), param
+
+    estaciones = np.array([m["locationsId"] for m in registros])
+    codigos, valores = normalizar(registros)
+    resultados = {
+        "bucle anterior": medir(lambda: procesar_bucle(registros), n, r),
+        "normalizar + medias": medir(lambda: promedios_por_parametro(registros), n, r),
+        "solo normalizar": medir(lambda: normalizar(registros), n, r),
+        "medias por estación": medir(lambda: promedios(codigos, valores, estaciones), n, r),
+    }
+
+    print(f"\n{n:,} registros")
+    print(f"{'etapa':<22} {'registros/s':>14} {'vs bucle':>10}")
+    for nombre, velocidad in resultados.items():
+        print(f"{nombre:<22} {velocidad:>14,.0f} {velocidad / resultados['bucle anterior']:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
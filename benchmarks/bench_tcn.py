@@ -0,0 +1,92 @@
+"""
+Benchmark TCN frente al BiLSTM + Attention
+Entrena ambas familias (entrenamiento/modelos.py) con los mismos datos
+sintéticos y compara tiempo de entrenamiento, MAE de validación en AQI y
+latencia de inferencia compilada (como la sirve AQIPredictor) con lotes de
+1, 64 y 1024 ventanas.
+
+Uso:
+    python benchmarks/bench_tcn.py --epocas 10 --horas 5000
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+
+def latencia(model, lote: int, repeticiones: int) -> float:
+    """p50 en ms de la llamada compilada"""
+    import tensorflow as tf
+
+    forma = model.inputs[0].shape
+    llamada = tf.function(
+        lambda X: model(X, training=False),
+        input_signature=[tf.TensorSpec([None, forma[1], forma[2]], tf.float32)]
+    )
+    X = np.random.default_rng(0).uniform(size=(lote, forma[1], forma[2])).astype(np.float32)
+    llamada(X)  # calentar (trazado del grafo)
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        llamada(X).numpy()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return float(np.median(tiempos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TCN frente a BiLSTM + Attention")
+    parser.add_argument("--arquitecturas", nargs="+", default=["lstm_attention", "tcn"])
+    parser.add_argument("--epocas", type=int, default=10)
+    parser.add_argument("--horas", type=int, default=5000, help="Horas de la serie sintética")
+    parser.add_argument("--lote", type=int, default=32, help="Batch de entrenamiento")
+    parser.add_argument("--lotes-inferencia", type=int, nargs="+", default=[1, 64, 1024])
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+    from sklearn.preprocessing import MinMaxScaler
+    from entrenamiento.datos import LOOKBACK, FORECAST_HORIZONS, FEATURES, generar_datos_sinteticos, crear_secuencias
+    from entrenamiento.modelos import ARQUITECTURAS
+
+    X, y = crear_secuencias(generar_datos_sinteticos(args.horas), FEATURES, LOOKBACK, FORECAST_HORIZONS)
+    n, t, f = X.shape
+    scaler, scaler_y = MinMaxScaler(), MinMaxScaler()
+    Xn = scaler.fit_transform(X.reshape(-1, f)).reshape(n, t, f).astype(np.float32)
+    yn = scaler_y.fit_transform(y).astype(np.float32)
+    corte = int(n * 0.8)  # sin mezclar, como reentrenar_modelo_rapido.py
+
+    filas = []
+    for nombre in args.arquitecturas:
+        fabrica, _, descripcion = ARQUITECTURAS[nombre]
+        tf.keras.utils.set_random_seed(0)
+        model = fabrica((LOOKBACK, len(FEATURES)), len(FORECAST_HORIZONS))
+        model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=0.001), loss='mse')
+        print(f"🏋️ {descripcion}: {model.count_params():,} parámetros, {args.epocas} épocas...")
+        t0 = time.perf_counter()
+        model.fit(Xn[:corte], yn[:corte], epochs=args.epocas, batch_size=args.lote, verbose=0)
+        entrenamiento = time.perf_counter() - t0
+
+        pred = scaler_y.inverse_transform(model.predict(Xn[corte:], batch_size=1024, verbose=0))
+        mae = float(np.abs(pred - y[corte:]).mean())
+        tiempos = [latencia(model, b, max(3, args.repeticiones if b < 1024 else args.repeticiones // 4))
+                   for b in args.lotes_inferencia]
+        filas.append((nombre, model.count_params(), entrenamiento / args.epocas, entrenamiento, mae, tiempos))
+
+    cabecera_lotes = " ".join(f"{'lote ' + str(b):>11}" for b in args.lotes_inferencia)
+    print(f"\n{'modelo':<15} {'parámetros':>11} {'s/época':>8} {'total':>8} {'MAE val':>8} {cabecera_lotes}")
+    for nombre, params, por_epoca, total, mae, tiempos in filas:
+        lat = " ".join(f"{ms:>9.2f}ms" for ms in tiempos)
+        print(f"{nombre:<15} {params:>11,} {por_epoca:>7.1f}s {total:>7.1f}s {mae:>8.2f} {lat}")
+
+
+if __name__ == "__main__":
+    main()
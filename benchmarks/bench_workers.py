@@ -0,0 +1,152 @@
+"""
+Benchmark de memoria y rendimiento de run_prod.py con 1..N workers
+
+Para cada número de workers arranca el servidor, espera a que /health
+indique el modelo cargado, lanza carga concurrente contra
+/predict/coordinates y mide:
+  - peticiones/s y latencias p50/p99
+  - Rss, Pss y memoria privada de cada proceso (/proc/<pid>/smaps_rollup).
+    Pss reparte las páginas compartidas entre los procesos que las usan, así
+    que la suma de Pss es la memoria real del conjunto; la privada es lo que
+    cuesta cada worker adicional.
+
+Lo que comparten los workers es el código y las bibliotecas importadas por
+el padre (y la cache de páginas del bundle). Los pesos NO se comparten: cada
+worker los copia del bundle mapeado a sus propias variables de TensorFlow, y
+la memoria privada por worker (runtime de TensorFlow, grafos compilados,
+pesos) no baja al añadir workers.
+
+Solo Linux (fork y /proc). El rate limiting se desactiva durante la prueba.
+
+Uso:
+    python benchmarks/bench_workers.py --workers 1 2 4 --peticiones 400
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+
+API_DIR = Path(__file__).resolve().parent.parent / "api"
+
+
+def memoria_proceso(pid: int) -> dict:
+    """Rss, Pss y memoria privada (Private_Clean + Private_Dirty) en MB de un proceso"""
+    valores = {"Privada": 0.0}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for linea in f:
+            campo, _, resto = linea.partition(":")
+            if campo in ("Rss", "Pss"):
+                valores[campo] = int(resto.split()[0]) / 1024
+            elif campo in ("Private_Clean", "Private_Dirty"):
+                valores["Privada"] += int(resto.split()[0]) / 1024
+    return valores
+
+
+def hijos(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+async def esperar_listo(url: str, timeout: float = 300):
+    limite = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < limite:
+            try:
+                async with session.get(f"{url}/health") as resp:
+                    if resp.status == 200 and (await resp.json()).get("model_loaded"):
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(1)
+    raise TimeoutError("El servidor no arrancó a tiempo")
+
+
+async def generar_carga(url: str, peticiones: int, concurrencia: int) -> dict:
+    latencias = []
+    errores = 0
+    cola: asyncio.Queue = asyncio.Queue()
+    for i in range(peticiones):
+        # Coordenadas distintas para no servir desde la cache HTTP
+        cola.put_nowait((40.0 + (i % 200) * 0.1, -3.7 - (i // 200) * 0.1))
+
+    async def trabajador(session):
+        nonlocal errores
+        while not cola.empty():
+            lat, lon = cola.get_nowait()
+            t0 = time.perf_counter()
+            async with session.get(f"{url}/predict/coordinates", params={"lat": lat, "lon": lon}) as resp:
+                await resp.read()
+                if resp.status != 200:
+                    errores += 1
+            latencias.append(time.perf_counter() - t0)
+
+    inicio = time.perf_counter()
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120)) as session:
+        await asyncio.gather(*(trabajador(session) for _ in range(concurrencia)))
+    total = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "rps": len(latencias) / total,
+        "p50": latencias[len(latencias) // 2] * 1000,
+        "p99": latencias[int(len(latencias) * 0.99) - 1] * 1000,
+        "errores": errores,
+    }
+
+
+def medir(workers: int, puerto: int, peticiones: int, concurrencia: int) -> dict:
+    entorno = dict(os.environ, RATE_LIMIT_ENABLED="False", LOG_LEVEL="WARNING")
+    proceso = subprocess.Popen(
+        [sys.executable, "run_prod.py", "--workers", str(workers), "--port", str(puerto)],
+        cwd=str(API_DIR), env=entorno,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{puerto}"
+    try:
+        asyncio.run(esperar_listo(url))
+        # Con varios workers, /health responde en cuanto uno está listo
+        time.sleep(5 if workers > 1 else 0)
+        carga = asyncio.run(generar_carga(url, peticiones, concurrencia))
+
+        pids = [proceso.pid] + (hijos(proceso.pid) if workers > 1 else [])
+        memorias = [memoria_proceso(pid) for pid in pids]
+        return {
+            "workers": workers,
+            **carga,
+            "rss_total": sum(m["Rss"] for m in memorias),
+            "pss_total": sum(m["Pss"] for m in memorias),
+            "pss_worker": [round(m["Pss"]) for m in memorias[1:]] or [round(memorias[0]["Pss"])],
+            "privada_worker": [round(m["Privada"]) for m in memorias[1:]] or [round(memorias[0]["Privada"])],
+        }
+    finally:
+        proceso.send_signal(signal.SIGTERM)
+        proceso.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de run_prod.py con varios workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--peticiones", type=int, default=400)
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--puerto", type=int, default=8799)
+    args = parser.parse_args()
+
+    resultados = [medir(n, args.puerto + i, args.peticiones, args.concurrencia)
+                  for i, n in enumerate(args.workers)]
+
+    print(f"\n{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'err':>4} "
+          f"{'Rss MB':>8} {'Pss MB':>8}  Pss / privada por worker (MB)")
+    for r in resultados:
+        print(f"{r['workers']:>7} {r['rps']:>8.1f} {r['p50']:>8.1f} {r['p99']:>8.1f} {r['errores']:>4} "
+              f"{r['rss_total']:>8.0f} {r['pss_total']:>8.0f}  {r['pss_worker']} / {r['privada_worker']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+🏗️ CONSTRUCCIÓN DEL DATASET DE ENTRENAMIENTO MULTI-ESTACIÓN
+================================================================
+Lee registros horarios en bruto de muchas estaciones (CSV/parquet/npz con una
+columna de estación, `fecha` y las FEATURES), los alinea a una rejilla
+horaria y escribe las ventanas (X: 48x8) y objetivos (y: AQI a 3/6/12/24 h)
+en shards .npz comprimidos de tamaño fijo, con un índice `indice.json`.
+
+- Paralelo: cada estación se procesa en un proceso del pool.
+- Incremental: la unidad de trabajo es (estación, mes). Cada unidad guarda
+  el hash de las horas que la alimentan; si no cambia, no se reconstruye.
+  Al añadir un mes solo se escriben sus shards (y los del mes anterior,
+  cuyas últimas ventanas ganan objetivos).
+- Reanudable: el índice se reescribe de forma atómica al terminar cada
+  estación; una ejecución interrumpida continúa donde se quedó.
+
+Uso:
+    python construir_dataset.py --entrada datos/crudos/*.csv --salida datos/dataset
+    python reentrenar_modelo_rapido.py --shards datos/dataset
+"""
+
+import os
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Reduce warnings de TensorFlow
+
+import argparse
+import glob
+import hashlib
+import json
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+from entrenamiento.datos import LOOKBACK, FORECAST_HORIZONS, FEATURES
+
+NOMBRE_INDICE = 'indice.json'
+VERSION_INDICE = 1
+
+
+def _nombre_seguro(estacion) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', str(estacion)).strip('_') or 'estacion'
+
+
+def alinear_horario(df: pd.DataFrame, max_hueco: int) -> pd.DataFrame:
+    """
+    Rejilla horaria completa de una estación
+
+    Varios registros en la misma hora se promedian; los huecos de hasta
+    `max_hueco` horas se interpolan y los más largos quedan como NaN (las
+    ventanas que los tocan se descartan).
+    """
+    df = df.assign(fecha=pd.to_datetime(df['fecha']).dt.floor('h'))
+    horario = df.groupby('fecha')[FEATURES].mean().sort_index()
+    # En nanosegundos siempre (las `fechas` de los shards son enteros ns)
+    rejilla = pd.date_range(horario.index.min(), horario.index.max(), freq='h', unit='ns')
+    horario = horario.reindex(rejilla)
+    if max_hueco > 0:
+        # interpolate(limit=n) rellenaría también las n primeras horas de un
+        # hueco largo: solo se interpolan los huecos de n horas o menos
+        vacio = horario.isna()
+        # Cada hueco comparte grupo con la última hora con dato que lo precede
+        tramo = (~vacio).cumsum()
+        interpolado = horario.interpolate(limit_area='inside')
+        for columna in FEATURES:
+            largo = vacio[columna].groupby(tramo[columna]).transform('sum')
+            corto = vacio[columna] & (largo <= max_hueco)
+            horario.loc[corto, columna] = interpolado.loc[corto, columna]
+    return horario
+
+
+def _hash_tramo(horario: pd.DataFrame) -> str:
+    h = hashlib.sha1()
+    h.update(horario.index.asi8.tobytes())
+    h.update(np.ascontiguousarray(horario.to_numpy(dtype=np.float32)).tobytes())
+    return h.hexdigest()
+
+
+def _escribir_npz(ruta: Path, **arrays):
+    """Shard comprimido escrito de forma atómica"""
+    tmp = ruta.with_name(ruta.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp, ruta)
+
+
+def construir_estacion(estacion, df: pd.DataFrame, salida: str, previas: Dict[str, Dict],
+                       ventanas_por_shard: int, max_hueco: int) -> Dict[str, Dict]:
+    """
+    Shards de una estación, mes a mes
+
+    Args:
+        previas: Unidades ya construidas de esta estación ({mes: entrada del índice})
+
+    Returns:
+        {mes: entrada del índice} con todas las unidades vigentes
+    """
+    horario = alinear_horario(df, max_hueco)
+    valores = horario.to_numpy(dtype=np.float32)
+    aqi = valores[:, FEATURES.index('AQI')]
+    max_h = max(FORECAST_HORIZONS)
+
+    # Ventana i válida si las horas [i - LOOKBACK, i + max_h] no tienen NaN
+    malas = np.concatenate([[0], np.cumsum(np.isnan(valores).any(axis=1))])
+    origenes = np.arange(LOOKBACK, len(valores) - max_h)
+    validas = origenes[(malas[origenes + max_h + 1] - malas[origenes - LOOKBACK]) == 0]
+    ventanas = np.lib.stride_tricks.sliding_window_view(valores, LOOKBACK, axis=0)
+
+    directorio = Path(salida) / _nombre_seguro(estacion)
+    directorio.mkdir(parents=True, exist_ok=True)
+    fechas = horario.index
+    meses = fechas.to_period('M')
+    unidades = {}
+
+    for mes in meses.unique():
+        clave = str(mes)
+        en_mes = validas[meses[validas] == mes]
+        # Horas que alimentan las ventanas del mes (historia previa y horizonte)
+        posiciones = np.flatnonzero(meses == mes)
+        tramo = horario.iloc[max(posiciones[0] - LOOKBACK, 0):posiciones[-1] + max_h + 1]
+        firma = _hash_tramo(tramo)
+
+        previa = previas.get(clave)
+        if previa and previa['hash'] == firma and all((Path(salida) / s['ruta']).exists() for s in previa['shards']):
+            unidades[clave] = previa
+            continue
+
+        shards = []
+        for k, inicio in enumerate(range(0, len(en_mes), ventanas_por_shard)):
+            bloque = en_mes[inicio:inicio + ventanas_por_shard]
+            relativa = Path(_nombre_seguro(estacion)) / f"{clave}_{k:03d}.npz"
+            _escribir_npz(
+                Path(salida) / relativa,
+                X=np.ascontiguousarray(ventanas[bloque - LOOKBACK].transpose(0, 2, 1)),
+                y=np.stack([aqi[bloque + h] for h in FORECAST_HORIZONS], axis=1),
+                fechas=fechas[bloque].asi8
+            )
+            shards.append({'ruta': relativa.as_posix(), 'ventanas': int(len(bloque))})
+
+        # Shards sobrantes de una versión anterior más larga de la unidad
+        vigentes = {s['ruta'] for s in shards}
+        for s in (previa or {}).get('shards', []):
+            if s['ruta'] not in vigentes:
+                (Path(salida) / s['ruta']).unlink(missing_ok=True)
+
+        unidades[clave] = {'hash': firma, 'ventanas': int(len(en_mes)), 'shards': shards}
+    return unidades
+
+
+def cargar_indice(salida: Path, ventanas_por_shard: int) -> Dict:
+    ruta = salida / NOMBRE_INDICE
+    if ruta.exists():
+        with open(ruta, 'r', encoding='utf-8') as f:
+            indice = json.load(f)
+        parametros = (indice.get('lookback'), indice.get('horizontes'), indice.get('features'))
+        if parametros != (LOOKBACK, FORECAST_HORIZONS, FEATURES) or indice.get('ventanas_por_shard') != ventanas_por_shard:
+            raise SystemExit("❌ El índice existente usa otros parámetros: usa otra --salida o bórralo")
+        return indice
+    return {
+        'version': VERSION_INDICE,
+        'lookback': LOOKBACK,
+        'horizontes': FORECAST_HORIZONS,
+        'features': FEATURES,
+        'ventanas_por_shard': ventanas_por_shard,
+        'estaciones': {},
+    }
+
+
+def guardar_indice(salida: Path, indice: Dict):
+    tmp = salida / (NOMBRE_INDICE + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(indice, f, indent=1)
+    os.replace(tmp, salida / NOMBRE_INDICE)
+
+
+def leer_registros(rutas: List[str], columna_estacion: str) -> pd.DataFrame:
+    columnas = [columna_estacion, 'fecha'] + FEATURES
+    partes = []
+    for ruta in rutas:
+        if ruta.endswith('.parquet'):
+            df = pd.read_parquet(ruta, columns=columnas)
+        elif ruta.endswith('.npz'):
+            # Partes en columnas de generar_sinteticos.py (un array por columna;
+            # las categóricas guardan los códigos y `<columna>_categorias`)
+            with np.load(ruta) as datos:
+                df = pd.DataFrame({
+                    c: pd.Categorical.from_codes(datos[c], datos[f'{c}_categorias'])
+                    if f'{c}_categorias' in datos.files else datos[c]
+                    for c in columnas
+                })
+        else:
+            df = pd.read_csv(ruta, usecols=columnas)
+        partes.append(df)
+    return pd.concat(partes, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construir el dataset de ventanas multi-estación en shards")
+    parser.add_argument('--entrada', nargs='+', required=True, help="CSV/parquet/npz (se admiten patrones glob)")
+    parser.add_argument('--salida', required=True, help="Directorio del dataset (shards + indice.json)")
+    parser.add_argument('--columna-estacion', default='estacion')
+    parser.add_argument('--ventanas-por-shard', type=int, default=4096)
+    parser.add_argument('--max-hueco', type=int, default=3, help="Horas seguidas sin dato que se interpolan")
+    parser.add_argument('--procesos', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    rutas = sorted({r for patron in args.entrada for r in glob.glob(patron)})
+    if not rutas:
+        raise SystemExit(f"❌ No hay archivos de entrada: {args.entrada}")
+    salida = Path(args.salida)
+    salida.mkdir(parents=True, exist_ok=True)
+    indice = cargar_indice(salida, args.ventanas_por_shard)
+
+    print("=" * 80)
+    print("🏗️ CONSTRUCCIÓN DEL DATASET MULTI-ESTACIÓN")
+    print("=" * 80)
+    t0 = time.perf_counter()
+    registros = leer_registros(rutas, args.columna_estacion)
+    estaciones = registros.groupby(args.columna_estacion, sort=True)
+    print(f"📂 {len(rutas)} archivos, {len(registros):,} registros, {estaciones.ngroups} estaciones")
+
+    nuevas = 0
+    with ProcessPoolExecutor(max_workers=args.procesos) as pool:
+        futuros = {
+            pool.submit(
+                construir_estacion, estacion, grupo, str(salida),
+                indice['estaciones'].get(str(estacion), {}),
+                args.ventanas_por_shard, args.max_hueco
+            ): str(estacion)
+            for estacion, grupo in estaciones
+        }
+        for futuro in as_completed(futuros):
+            estacion = futuros[futuro]
+            previas = indice['estaciones'].get(estacion, {})
+            unidades = futuro.result()
+            cambiadas = sum(1 for mes, u in unidades.items() if previas.get(mes, {}).get('hash') != u['hash'])
+            nuevas += cambiadas
+            # Conservar meses que ya no están en la entrada (p. ej. datos antiguos archivados)
+            indice['estaciones'][estacion] = {**previas, **unidades}
+            guardar_indice(salida, indice)
+            print(f"   ✅ {estacion}: {sum(u['ventanas'] for u in unidades.values()):,} ventanas, "
+                  f"{cambiadas} de {len(unidades)} meses reconstruidos")
+
+    total = sum(u['ventanas'] for e in indice['estaciones'].values() for u in e.values())
+    n_shards = sum(len(u['shards']) for e in indice['estaciones'].values() for u in e.values())
+    print(f"\n📦 {total:,} ventanas en {n_shards} shards ({nuevas} meses nuevos o modificados) "
+          f"en {time.perf_counter() - t0:.1f}s")
+    print(f"   Índice: {salida / NOMBRE_INDICE}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+🎓 DESTILACIÓN DEL MODELO LSTM + ATTENTION EN MODELOS LIGEROS
+================================================================
+El modelo servido (maestro: BiLSTM(128) + Attention) etiqueta muchas ventanas
+sintéticas (y, si se indican, históricas) y cada candidato ligero (estudiante)
+aprende a reproducir sus salidas. Para cada candidato se informa del error
+frente al maestro y frente al valor real y de la latencia en CPU, y se
+guarda como bundle .aqib con los mismos escalados que el maestro: la API lo
+sirve sin cambios con MODEL_BUNDLE_PATH (o cargándolo desde /admin/models).
+
+Uso:
+    python destilar_modelo.py --candidatos gru32 conv32 --series 20 --horas 5000
+    python destilar_modelo.py --historico datos_la.csv --alfa 0.8
+"""
+
+import os
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Reduce warnings de TensorFlow
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+from entrenamiento.datos import (
+    LOOKBACK, FORECAST_HORIZONS, FEATURES, ventanas_entrenamiento_validacion
+)
+from entrenamiento.modelos import ESTUDIANTES
+from entrenamiento.evaluacion import cargar_modelo_servido, medir_latencia, version_de
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Destilar el modelo servido en modelos ligeros")
+    parser.add_argument("--maestro", help="Bundle .aqib del maestro (por defecto el configurado en la API)")
+    parser.add_argument("--candidatos", nargs="+", default=list(ESTUDIANTES), choices=list(ESTUDIANTES))
+    parser.add_argument("--series", type=int, default=20, help="Series sintéticas de entrenamiento")
+    parser.add_argument("--series-validacion", type=int, default=3)
+    parser.add_argument("--horas", type=int, default=5000, help="Horas por serie sintética")
+    parser.add_argument("--historico", nargs="*", default=[], help="CSV/parquet horarios con FEATURES")
+    parser.add_argument("--alfa", type=float, default=1.0,
+                        help="Peso del maestro en el objetivo (1 = solo maestro, 0 = solo valor real)")
+    parser.add_argument("--epocas", type=int, default=15)
+    parser.add_argument("--lote", type=int, default=256)
+    parser.add_argument("--salida", default=str(BASE_DIR / 'modelos_guardados'))
+    args = parser.parse_args()
+
+    from tensorflow import keras
+    from tensorflow.keras.callbacks import EarlyStopping
+    from utils.model_bundle import escribir_bundle
+
+    print("=" * 80)
+    print("🎓 DESTILACIÓN DEL MODELO LSTM + ATTENTION")
+    print("=" * 80)
+
+    # 1. Maestro
+    bundle, maestro, scaler_y = cargar_modelo_servido(args.maestro)
+    version_maestro = version_de(bundle)
+    print(f"👨‍🏫 Maestro {version_maestro}: {maestro.count_params():,} parámetros")
+
+    # 2. Ventanas (en unidades reales) y etiquetas del maestro
+    print("📊 Generando ventanas...")
+    # Series distintas para entrenar y validar; el último 20% de cada histórico valida
+    (X, y), (X_val, y_val) = ventanas_entrenamiento_validacion(
+        args.horas, args.series, args.series_validacion, 1000, 5000, args.historico
+    )
+    Xn = bundle.scaler_x.transform(X).astype(np.float32)
+    Xn_val = bundle.scaler_x.transform(X_val).astype(np.float32)
+    print(f"   Train: {len(X):,} ventanas | Val: {len(X_val):,} ventanas")
+
+    t0 = time.perf_counter()
+    objetivo_maestro = maestro.predict(Xn, batch_size=1024, verbose=0)
+    maestro_val = maestro.predict(Xn_val, batch_size=1024, verbose=0)
+    print(f"   Etiquetado por el maestro: {time.perf_counter() - t0:.1f}s")
+
+    objetivo = args.alfa * objetivo_maestro + (1 - args.alfa) * scaler_y.transform(y)
+    maestro_val_aqi = scaler_y.inverse_transform(maestro_val)
+    mae_maestro = float(np.abs(maestro_val_aqi - y_val).mean())
+
+    # 3. Candidatos
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    resultados = [{
+        "nombre": "maestro", "parametros": maestro.count_params(),
+        "mae_maestro": 0.0, "mae_real": mae_maestro,
+        "ms_1": medir_latencia(maestro, 1), "ms_256": medir_latencia(maestro, 256, 10),
+        "ruta": bundle.ruta,
+    }]
+    for nombre in args.candidatos:
+        fabrica, descripcion = ESTUDIANTES[nombre]
+        print(f"\n🧠 Entrenando {nombre} ({descripcion})...")
+        estudiante = fabrica((LOOKBACK, len(FEATURES)), len(FORECAST_HORIZONS))
+        estudiante.compile(optimizer=keras.optimizers.Adam(learning_rate=0.002), loss='mse')
+        t0 = time.perf_counter()
+        historia = estudiante.fit(
+            Xn, objetivo,
+            validation_data=(Xn_val, maestro_val),
+            epochs=args.epocas,
+            batch_size=args.lote,
+            callbacks=[EarlyStopping(monitor='val_loss', patience=3, restore_best_weights=True)],
+            verbose=2
+        )
+        segundos = time.perf_counter() - t0
+
+        pred_val = scaler_y.inverse_transform(estudiante.predict(Xn_val, batch_size=1024, verbose=0))
+        resultado = {
+            "nombre": nombre,
+            "parametros": estudiante.count_params(),
+            "mae_maestro": float(np.abs(pred_val - maestro_val_aqi).mean()),
+            "mae_real": float(np.abs(pred_val - y_val).mean()),
+            "ms_1": medir_latencia(estudiante, 1),
+            "ms_256": medir_latencia(estudiante, 256, 10),
+        }
+
+        # 4. Bundle con los escalados del maestro: drop-in para AQIPredictor
+        metadata = {
+            "timestamp": f"{timestamp}_{nombre}",
+            "nombre_experimento": f"Estudiante_{nombre}",
+            "arquitectura": descripcion,
+            "destilado_de": version_maestro,
+            "alfa": args.alfa,
+            "lookback": LOOKBACK,
+            "forecast_horizons": FORECAST_HORIZONS,
+            "features": FEATURES,
+            "epochs_trained": len(historia.history['loss']),
+            "segundos_entrenamiento": round(segundos, 1),
+            "metricas": {"mae_vs_maestro": resultado["mae_maestro"], "mae": resultado["mae_real"]},
+            "model_params": estudiante.count_params(),
+        }
+        ruta = Path(args.salida) / f"Estudiante_{nombre}_{timestamp}.aqib"
+        escribir_bundle(ruta, estudiante.get_weights(), estudiante.to_json(),
+                        bundle.scaler_x, scaler_y, metadata, {"destilado_de": version_maestro})
+        resultado["ruta"] = ruta
+        resultados.append(resultado)
+        print(f"   💾 {ruta.name}")
+
+    # 5. Precisión frente a latencia
+    print("\n" + "=" * 80)
+    print("📊 PRECISIÓN vs LATENCIA (validación, AQI; latencia p50 en CPU)")
+    print("=" * 80)
+    print(f"{'modelo':<10} {'parámetros':>11} {'MAE vs maestro':>15} {'MAE real':>9} "
+          f"{'lote 1':>9} {'lote 256':>10} {'aceleración':>12}")
+    for r in resultados:
+        print(f"{r['nombre']:<10} {r['parametros']:>11,} {r['mae_maestro']:>15.2f} {r['mae_real']:>9.2f} "
+              f"{r['ms_1']:>7.2f}ms {r['ms_256']:>8.1f}ms {resultados[0]['ms_256'] / r['ms_256']:>11.1f}x")
+
+    if len(resultados) > 1:
+        mejor = min(resultados[1:], key=lambda r: r["mae_maestro"])
+        print(f"\n🚀 Para servir el estudiante más fiel al maestro ({mejor['nombre']}):")
+        print(f"   MODEL_BUNDLE_PATH={mejor['ruta']}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Piezas comunes de los scripts de entrenamiento de la raíz del proyecto
+(reentrenar_modelo_rapido.py, destilar_modelo.py, ...): generación y
+ventaneo de datos y fábricas de modelos.
+"""
@@ -0,0 +1,239 @@
+"""
+Backtesting vectorizado: métricas por horizonte, estación y hora del día
+
+El modelo recorre el histórico por tramos (lotes grandes con una llamada
+compilada) y cada tramo se reduce a estadísticos suficientes por celda
+(estación, hora, horizonte) con np.bincount: n, Σe, Σ|e|, Σe², Σy, Σy² y
+aciertos de categoría EPA. De ahí salen MAE, RMSE, R², sesgo y tasa de
+acierto de cualquier agregación (por horizonte, por estación, por hora o
+global) sin volver a pasar por los datos, así que la memoria no depende de
+la longitud del histórico: basta con que quepa un tramo.
+
+La hora es la del instante predicho (hora de origen + horizonte), que es
+la que muestra el ciclo diario del error.
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from entrenamiento.datos import FORECAST_HORIZONS
+from entrenamiento.pipeline import leer_shard_ventanas
+
+# Categorías EPA de la tabla compartida con la API (api/config/aqi_epa.json)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'api'))
+from utils.aqi import categoria
+
+SIN_HORA = 24           # Celda para ventanas sin fecha
+HORAS = 25
+NS_POR_HORA = 3_600_000_000_000
+
+# Estadísticos acumulados por celda (estación, hora, horizonte)
+ESTADISTICOS = ('n', 'suma_error', 'suma_abs', 'suma_cuadrados', 'suma_y', 'suma_y2', 'aciertos')
+
+
+class Acumulador:
+    """Estadísticos suficientes del error por (estación, hora, horizonte)"""
+
+    def __init__(self, estaciones: Sequence[str] = (), horizontes: Sequence[int] = FORECAST_HORIZONS):
+        self.estaciones = [str(e) for e in estaciones]
+        self.horizontes = list(horizontes)
+        self.stats = np.zeros((len(ESTADISTICOS), 0, HORAS, len(self.horizontes)))
+        self._crecer(max(len(self.estaciones), 1))
+
+    def _crecer(self, n_estaciones: int):
+        faltan = n_estaciones - self.stats.shape[1]
+        if faltan > 0:
+            self.stats = np.concatenate(
+                [self.stats, np.zeros((len(ESTADISTICOS), faltan) + self.stats.shape[2:])], axis=1)
+        self.estaciones += [str(i) for i in range(len(self.estaciones), self.stats.shape[1])]
+
+    def actualizar(self, y_true: np.ndarray, y_pred: np.ndarray,
+                   estaciones: Optional[np.ndarray] = None, fechas: Optional[np.ndarray] = None):
+        """
+        Sumar un tramo
+
+        Args:
+            y_true, y_pred: (n, horizontes) en unidades de AQI (NaN = sin observación)
+            estaciones: (n,) códigos enteros de estación (por defecto 0)
+            fechas: (n,) instante de origen en ns (por defecto sin hora)
+        """
+        n, n_h = y_true.shape
+        celdas = self.stats.shape[1:]
+        if estaciones is None:
+            estaciones = np.zeros(n, dtype=np.int64)
+        elif len(estaciones):
+            self._crecer(int(estaciones.max()) + 1)
+            celdas = self.stats.shape[1:]
+        if fechas is None:
+            horas = np.full((n, n_h), SIN_HORA, dtype=np.int64)
+        else:
+            origen = np.asarray(fechas, dtype=np.int64) // NS_POR_HORA
+            horas = (origen[:, None] + np.asarray(self.horizontes)) % 24
+
+        clave = (np.asarray(estaciones, dtype=np.int64)[:, None] * HORAS + horas) * n_h + np.arange(n_h)
+        valido = np.isfinite(y_true) & np.isfinite(y_pred)
+        clave, yt, yp = clave[valido], y_true[valido].astype(np.float64), y_pred[valido].astype(np.float64)
+        error = yp - yt
+
+        total = int(np.prod(celdas))
+        pesos = (None, error, np.abs(error), error * error, yt, yt * yt,
+                 (categoria(yt) == categoria(yp)).astype(np.float64))
+        for k, w in enumerate(pesos):
+            self.stats[k] += np.bincount(clave, weights=w, minlength=total).reshape(celdas)
+
+    def fusionar(self, otro: 'Acumulador'):
+        """Sumar otro acumulador (p. ej. de otro proceso) con las mismas estaciones"""
+        self._crecer(otro.stats.shape[1])
+        self.stats[:, :otro.stats.shape[1]] += otro.stats
+
+    def tabla(self, por: Sequence[str] = ('horizonte',)) -> pd.DataFrame:
+        """
+        Métricas agregadas por una o varias dimensiones ('estacion', 'hora',
+        'horizonte'); `por=()` da la fila global
+        """
+        ejes = {'estacion': 1, 'hora': 2, 'horizonte': 3}
+        desconocidas = set(por) - set(ejes)
+        if desconocidas:
+            raise ValueError(f"Dimensiones desconocidas: {sorted(desconocidas)}")
+        sumar = tuple(e for d, e in ejes.items() if d not in por)
+        s = self.stats.sum(axis=sumar, keepdims=True)
+        orden = [ejes[d] for d in por]
+        s = s.transpose([0] + orden + [e for e in (1, 2, 3) if e not in orden]).reshape(len(ESTADISTICOS), -1)
+        n, suma_e, suma_abs, suma_cuad, suma_y, suma_y2, aciertos = s
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ss_tot = suma_y2 - suma_y * suma_y / n
+            metricas = pd.DataFrame({
+                'n': n.astype(np.int64),
+                'MAE': suma_abs / n,
+                'RMSE': np.sqrt(suma_cuad / n),
+                'R2': 1 - suma_cuad / ss_tot,
+                'sesgo': suma_e / n,
+                'acierto_categoria': aciertos / n,
+            })
+
+        if por:
+            etiquetas = {'estacion': self.estaciones, 'hora': list(range(24)) + ['sin hora'],
+                         'horizonte': [f"{h}h" for h in self.horizontes]}
+            metricas.index = pd.MultiIndex.from_product([etiquetas[d] for d in por], names=list(por))
+            metricas = metricas[metricas['n'] > 0]
+        else:
+            metricas.index = ['global']
+        return metricas
+
+
+def _llamada_compilada(model):
+    import tensorflow as tf
+
+    forma = model.inputs[0].shape
+    return tf.function(
+        lambda X: model(X, training=False),
+        input_signature=[tf.TensorSpec([None, forma[1], forma[2]], tf.float32)]
+    )
+
+
+def predecir(llamada, Xn: np.ndarray, lote: int) -> np.ndarray:
+    return np.concatenate([llamada(Xn[i:i + lote]).numpy() for i in range(0, len(Xn), lote)])
+
+
+def normalizar(X: np.ndarray, escalador_x) -> np.ndarray:
+    """X * scale_ + min_ en float32 (EscaladorAfin o MinMaxScaler)"""
+    Xn = np.asarray(X, dtype=np.float32) * escalador_x.scale_.astype(np.float32)
+    Xn += escalador_x.min_.astype(np.float32)
+    return Xn
+
+
+def backtest(model, tramos: Iterable[Tuple], escalador_y, escalador_x=None,
+             y_normalizada: bool = False, estaciones: Sequence[str] = (), lote: int = 4096) -> Acumulador:
+    """
+    Recorrer los tramos con el modelo y acumular las métricas
+
+    Args:
+        tramos: (X, y, estaciones, fechas); estaciones y fechas pueden ser None
+        escalador_y: desnormaliza las predicciones (y también y si `y_normalizada`)
+        escalador_x: si se da, X llega en unidades reales y se normaliza aquí
+        lote: ventanas por llamada al modelo
+    """
+    llamada = _llamada_compilada(model)
+    acumulado = Acumulador(estaciones)
+    for X, y, codigos, fechas in tramos:
+        Xn = normalizar(X, escalador_x) if escalador_x is not None else np.asarray(X, dtype=np.float32)
+        y_pred = escalador_y.inverse_transform(predecir(llamada, Xn, lote))
+        y_true = escalador_y.inverse_transform(y) if y_normalizada else np.asarray(y)
+        acumulado.actualizar(y_true, y_pred, codigos, fechas)
+    return acumulado
+
+
+def tramos_de_arrays(X: np.ndarray, y: np.ndarray, estaciones: Optional[np.ndarray] = None,
+                     fechas: Optional[np.ndarray] = None, tramo: int = 65_536) -> Iterator[Tuple]:
+    """Tramos de arrays en memoria o np.memmap (np.load(..., mmap_mode='r'))"""
+    for i in range(0, len(X), tramo):
+        corte = slice(i, i + tramo)
+        yield (np.asarray(X[corte]), np.asarray(y[corte]),
+               None if estaciones is None else np.asarray(estaciones[corte]),
+               None if fechas is None else np.asarray(fechas[corte]))
+
+
+def tramos_de_dataset(dataset, estaciones: Optional[Sequence[str]] = None, desde=None, hasta=None,
+                      tramo: int = 65_536) -> Tuple[List[str], Iterator[Tuple]]:
+    """
+    Tramos de un dataset de construir_dataset.py
+
+    Se abren solo los shards de los meses en [desde, hasta] y se juntan
+    hasta `tramo` ventanas antes de pasarlas al modelo.
+
+    Returns:
+        (nombres de estación en el orden de los códigos, iterador de tramos)
+    """
+    dataset = Path(dataset)
+    with open(dataset / 'indice.json', 'r', encoding='utf-8') as f:
+        indice = json.load(f)
+    nombres = sorted(e for e in indice['estaciones'] if not estaciones or e in estaciones)
+    desde_ns = pd.Timestamp(desde).as_unit('ns').value if desde else None
+    hasta_ns = pd.Timestamp(hasta).as_unit('ns').value if hasta else None
+    mes_desde = str(pd.Timestamp(desde).to_period('M')) if desde else None
+    mes_hasta = str(pd.Timestamp(hasta).to_period('M')) if hasta else None
+
+    def generar():
+        partes, acumuladas = [], 0
+        for codigo, estacion in enumerate(nombres):
+            for mes, unidad in sorted(indice['estaciones'][estacion].items()):
+                if (mes_desde and mes < mes_desde) or (mes_hasta and mes > mes_hasta):
+                    continue
+                for shard in unidad['shards']:
+                    ruta = dataset / shard['ruta']
+                    X, y = leer_shard_ventanas(str(ruta))
+                    with np.load(ruta) as datos:
+                        fechas = datos['fechas']
+                    sel = np.ones(len(fechas), dtype=bool)
+                    if desde_ns is not None:
+                        sel &= fechas >= desde_ns
+                    if hasta_ns is not None:
+                        sel &= fechas <= hasta_ns
+                    if not sel.all():
+                        X, y, fechas = X[sel], y[sel], fechas[sel]
+                    if len(fechas):
+                        partes.append((X, y, np.full(len(fechas), codigo, dtype=np.int64), fechas))
+                        acumuladas += len(fechas)
+                    if acumuladas >= tramo:
+                        yield tuple(np.concatenate(c) for c in zip(*partes))
+                        partes, acumuladas = [], 0
+        if partes:
+            yield tuple(np.concatenate(c) for c in zip(*partes))
+
+    return nombres, generar()
+
+
+def resumen(acumulado: Acumulador) -> Dict[str, pd.DataFrame]:
+    """Las tablas habituales de un backtest"""
+    return {
+        'global': acumulado.tabla(()),
+        'horizonte': acumulado.tabla(('horizonte',)),
+        'estacion': acumulado.tabla(('estacion', 'horizonte')),
+        'hora': acumulado.tabla(('hora', 'horizonte')),
+    }
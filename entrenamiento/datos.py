@@ -0,0 +1,151 @@
+"""
+Datos de entrenamiento: series sintéticas, históricos y ventanas (X, y)
+"""
+
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+LOOKBACK = 48              # 48 horas de historia
+FORECAST_HORIZONS = [3, 6, 12, 24]  # Horizontes de predicción
+FEATURES = ['PM2.5', 'PM10', 'O3', 'NO2', 'temperatura', 'humedad', 'viento', 'AQI']
+FRACCION_ENTRENAMIENTO = 0.8  # Parte inicial de cada histórico que se usa para entrenar
+
+
+def generar_datos_sinteticos(n_samples=5000, semilla=42, inicio='2024-01-01'):
+    """
+    Genera datos sintéticos realistas de calidad del aire
+    """
+    np.random.seed(semilla)
+    
+    # Crear serie temporal
+    time_index = pd.date_range(inicio, periods=n_samples, freq='h')
+    
+    # Patrones base con variación diurna
+    hour = np.arange(n_samples) % 24
+    day_of_week = (np.arange(n_samples) // 24) % 7
+    
+    # PM2.5: Mayor en horas pico (8am, 6pm) y días laborables
+    pm25_base = 25 + 15 * np.sin(2 * np.pi * hour / 24) + 5 * (day_of_week < 5)
+    pm25 = pm25_base + np.random.normal(0, 5, n_samples)
+    pm25 = np.clip(pm25, 0, 150)
+    
+    # PM10: Correlacionado con PM2.5 pero mayor
+    pm10 = pm25 * 1.7 + np.random.normal(0, 8, n_samples)
+    pm10 = np.clip(pm10, 0, 250)
+    
+    # O3: Mayor en horas de sol (mediodía)
+    o3_base = 40 + 20 * np.sin(2 * np.pi * (hour - 12) / 24)
+    o3 = o3_base + np.random.normal(0, 8, n_samples)
+    o3 = np.clip(o3, 0, 150)
+    
+    # NO2: Mayor en horas pico de tráfico
+    no2_base = 30 + 20 * ((hour >= 7) & (hour <= 9) | (hour >= 17) & (hour <= 19))
+    no2 = no2_base + np.random.normal(0, 5, n_samples)
+    no2 = np.clip(no2, 0, 100)
+    
+    # Temperatura: Ciclo diurno y estacional
+    temp_base = 20 + 10 * np.sin(2 * np.pi * hour / 24)
+    temp = temp_base + np.random.normal(0, 2, n_samples)
+    
+    # Humedad: Inversa a temperatura
+    hum = 60 - 0.5 * (temp - 20) + np.random.normal(0, 5, n_samples)
+    hum = np.clip(hum, 20, 90)
+    
+    # Viento: Aleatorio con tendencia
+    wind = 5 + np.random.exponential(3, n_samples)
+    wind = np.clip(wind, 0, 30)
+    
+    # AQI: Calculado principalmente de PM2.5
+    aqi = pm25 * 2 + pm10 * 0.5 + o3 * 0.3 + no2 * 0.2
+    aqi = np.clip(aqi, 0, 300)
+    
+    # Crear DataFrame
+    df = pd.DataFrame({
+        'fecha': time_index,
+        'PM2.5': pm25,
+        'PM10': pm10,
+        'O3': o3,
+        'NO2': no2,
+        'temperatura': temp,
+        'humedad': hum,
+        'viento': wind,
+        'AQI': aqi
+    })
+    
+    return df
+
+
+def cargar_historico(ruta) -> pd.DataFrame:
+    """
+    Cargar un histórico horario (CSV o parquet) con las columnas de FEATURES
+    
+    Si trae columna 'fecha' se ordena por ella; las horas sin dato se
+    interpolan para no romper las ventanas.
+    """
+    ruta = Path(ruta)
+    df = pd.read_parquet(ruta) if ruta.suffix == '.parquet' else pd.read_csv(ruta)
+    faltan = [f for f in FEATURES if f not in df.columns]
+    if faltan:
+        raise ValueError(f"{ruta.name}: faltan columnas {faltan}")
+    if 'fecha' in df.columns:
+        df['fecha'] = pd.to_datetime(df['fecha'])
+        df = df.sort_values('fecha').reset_index(drop=True)
+    df[FEATURES] = df[FEATURES].interpolate(limit_direction='both')
+    return df.dropna(subset=FEATURES)
+
+
+def crear_secuencias(data, features, lookback, horizons) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Crea secuencias de entrada y salida para LSTM
+    
+    Ventana i: X = filas [i - lookback, i), y = AQI en i + h para cada horizonte.
+    Se construyen con vistas deslizantes (sin bucle por ventana).
+    """
+    valores = data[features].to_numpy(dtype=np.float32)
+    aqi = data['AQI'].to_numpy(dtype=np.float32)
+    inicios = np.arange(lookback, len(data) - max(horizons))
+    if len(inicios) == 0:
+        return (np.empty((0, lookback, len(features)), np.float32),
+                np.empty((0, len(horizons)), np.float32))
+    
+    ventanas = np.lib.stride_tricks.sliding_window_view(valores, lookback, axis=0)
+    X = ventanas[inicios - lookback].transpose(0, 2, 1)
+    y = np.stack([aqi[inicios + h] for h in horizons], axis=1)
+    return np.ascontiguousarray(X), y
+
+
+def ventanas_de_series(series: Sequence[pd.DataFrame], lookback=LOOKBACK,
+                       horizons=FORECAST_HORIZONS) -> Tuple[np.ndarray, np.ndarray]:
+    """Ventanas de varias series independientes (ninguna cruza de una serie a otra)"""
+    partes: List[Tuple[np.ndarray, np.ndarray]] = [
+        crear_secuencias(df, FEATURES, lookback, horizons) for df in series
+    ]
+    return (np.concatenate([p[0] for p in partes]),
+            np.concatenate([p[1] for p in partes]))
+
+
+def ventanas_entrenamiento_validacion(horas: int, series: int, series_validacion: int, semilla: int,
+                                      semilla_validacion: int, historico: Sequence = (),
+                                      lookback=LOOKBACK, horizons=FORECAST_HORIZONS):
+    """
+    Ventanas de entrenamiento y validación sin solapamiento
+
+    Series sintéticas distintas para cada parte (semillas `semilla + i` y
+    `semilla_validacion + i`) y, de cada histórico, el primer
+    FRACCION_ENTRENAMIENTO para entrenar y el resto para validar.
+
+    Returns:
+        ((X, y), (X_val, y_val))
+    """
+    entrenamiento = [generar_datos_sinteticos(horas, semilla=semilla + i) for i in range(series)]
+    validacion = [generar_datos_sinteticos(horas, semilla=semilla_validacion + i) for i in range(series_validacion)]
+    for ruta in historico:
+        df = cargar_historico(ruta)
+        corte = int(len(df) * FRACCION_ENTRENAMIENTO)
+        entrenamiento.append(df.iloc[:corte].reset_index(drop=True))
+        validacion.append(df.iloc[corte:].reset_index(drop=True))
+    return (ventanas_de_series(entrenamiento, lookback, horizons),
+            ventanas_de_series(validacion, lookback, horizons))
@@ -0,0 +1,63 @@
+"""
+Utilidades comunes para evaluar modelos frente al que sirve la API
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from entrenamiento.datos import FORECAST_HORIZONS
+
+# Los módulos de la API (bundle, custom objects, configuración)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'api'))
+
+
+def cargar_modelo_servido(ruta_bundle=None):
+    """
+    Modelo de la API y sus escalados: el bundle indicado, MODEL_BUNDLE_PATH o
+    el bundle generado desde MODEL_PATH
+    
+    Returns:
+        (bundle, modelo sin plegar, scaler_y); si el modelo no tiene scaler_y
+        se construye uno con la escala de la columna 0 de X (modelos antiguos)
+    """
+    from config.config import MODEL_PATH, MODEL_BUNDLE_PATH
+    from utils.model_bundle import EscaladorAfin, cargar_bundle, construir_modelo, preparar_bundle
+    from utils.predictor import obtener_custom_objects
+
+    ruta_bundle = ruta_bundle or MODEL_BUNDLE_PATH
+    bundle = cargar_bundle(ruta_bundle) if ruta_bundle else preparar_bundle(MODEL_PATH)
+    model = construir_modelo(bundle, obtener_custom_objects())
+
+    scaler_y = bundle.scaler_y
+    if scaler_y is None:
+        n = len(FORECAST_HORIZONS)
+        scaler_y = EscaladorAfin(np.full(n, bundle.scaler_x.min_[0]), np.full(n, bundle.scaler_x.scale_[0]))
+    return bundle, model, scaler_y
+
+
+def version_de(bundle) -> str:
+    from utils.model_bundle import version_modelo
+
+    return version_modelo(bundle.metadata, bundle.ruta)
+
+
+def medir_latencia(model, lote: int, repeticiones: int = 30) -> float:
+    """p50 en ms de una llamada compilada (la forma en que se sirve el modelo)"""
+    import tensorflow as tf
+
+    forma = model.inputs[0].shape
+    llamada = tf.function(
+        lambda X: model(X, training=False),
+        input_signature=[tf.TensorSpec([None, forma[1], forma[2]], tf.float32)]
+    )
+    X = np.random.default_rng(0).uniform(size=(lote, forma[1], forma[2])).astype(np.float32)
+    llamada(X)
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        llamada(X).numpy()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return float(np.median(tiempos))
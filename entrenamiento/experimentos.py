@@ -0,0 +1,165 @@
+"""
+Almacén local de experimentos (SQLite)
+
+Sustituye al experimentos_lstm.json que escribe guardar_experimento en
+TEMPO.ipynb cuando hay cientos de ensayos: cada ensayo es una fila con los
+hiperparámetros y las métricas en columnas indexadas, así que ordenar o
+agrupar un barrido completo es una consulta y no cargar y recorrer un JSON.
+Los experimentos del JSON se pueden importar (barrido 'manual').
+
+    con = abrir_almacen('experimentos.db')
+    registrar_ensayo(con, 'barrido_1', ensayo)
+    mejores(con, 10, barrido='barrido_1')
+"""
+
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Hiperparámetros con columna propia (el resto va en `configuracion`)
+HIPERPARAMETROS = ['unidades', 'lookback', 'dropout', 'learning_rate', 'lote']
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ensayos (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    barrido         TEXT NOT NULL,
+    nombre          TEXT NOT NULL,
+    fecha           TEXT NOT NULL,
+    estado          TEXT NOT NULL,
+    unidades        INTEGER,
+    lookback        INTEGER,
+    dropout         REAL,
+    learning_rate   REAL,
+    lote            INTEGER,
+    peldano         INTEGER,
+    epocas          INTEGER,
+    mejor_epoca     INTEGER,
+    val_loss        REAL,
+    mae             REAL,
+    rmse            REAL,
+    r2              REAL,
+    segundos        REAL,
+    configuracion   TEXT,
+    metricas        TEXT,
+    notas           TEXT DEFAULT '',
+    UNIQUE (barrido, nombre)
+);
+CREATE INDEX IF NOT EXISTS ix_ensayos_barrido_loss ON ensayos (barrido, val_loss);
+CREATE INDEX IF NOT EXISTS ix_ensayos_loss ON ensayos (val_loss);
+CREATE INDEX IF NOT EXISTS ix_ensayos_hiperparametros
+    ON ensayos (unidades, lookback, dropout, learning_rate, lote);
+"""
+
+_COLUMNAS = [
+    'barrido', 'nombre', 'fecha', 'estado', *HIPERPARAMETROS, 'peldano', 'epocas',
+    'mejor_epoca', 'val_loss', 'mae', 'rmse', 'r2', 'segundos', 'configuracion', 'metricas', 'notas'
+]
+
+
+def abrir_almacen(ruta) -> sqlite3.Connection:
+    """Conexión al almacén (se crea con su esquema si no existe)"""
+    Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(str(ruta))
+    con.row_factory = sqlite3.Row
+    con.execute("PRAGMA journal_mode=WAL")
+    con.executescript(_ESQUEMA)
+    return con
+
+
+def registrar_ensayo(con: sqlite3.Connection, barrido: str, ensayo: Dict):
+    """
+    Insertar o actualizar (mismo barrido y nombre) un ensayo
+
+    `ensayo` trae 'nombre', 'configuracion' (dict con HIPERPARAMETROS) y
+    opcionalmente 'estado', 'peldano', 'epocas', 'mejor_epoca', 'val_loss',
+    'segundos', 'notas' y 'metricas' (con 'MAE_prom', 'RMSE_prom' y
+    'R2_promedio' como en experimentos_lstm.json).
+    """
+    configuracion = ensayo['configuracion']
+    metricas = ensayo.get('metricas') or {}
+    fila = {
+        'barrido': barrido,
+        'nombre': ensayo['nombre'],
+        'fecha': ensayo.get('fecha') or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'estado': ensayo.get('estado', 'completado'),
+        **{h: configuracion.get(h) for h in HIPERPARAMETROS},
+        'peldano': ensayo.get('peldano'),
+        'epocas': ensayo.get('epocas'),
+        'mejor_epoca': ensayo.get('mejor_epoca'),
+        'val_loss': ensayo.get('val_loss'),
+        'mae': metricas.get('MAE_prom'),
+        'rmse': metricas.get('RMSE_prom'),
+        'r2': metricas.get('R2_promedio'),
+        'segundos': ensayo.get('segundos'),
+        'configuracion': json.dumps(configuracion, ensure_ascii=False),
+        'metricas': json.dumps(metricas, ensure_ascii=False),
+        'notas': ensayo.get('notas', ''),
+    }
+    actualizar = ', '.join(f"{c} = excluded.{c}" for c in _COLUMNAS if c not in ('barrido', 'nombre'))
+    con.execute(
+        f"INSERT INTO ensayos ({', '.join(_COLUMNAS)}) VALUES ({', '.join('?' * len(_COLUMNAS))}) "
+        f"ON CONFLICT (barrido, nombre) DO UPDATE SET {actualizar}",
+        [fila[c] for c in _COLUMNAS]
+    )
+    con.commit()
+
+
+def mejores(con: sqlite3.Connection, n: int = 10, barrido: Optional[str] = None) -> List[sqlite3.Row]:
+    """Los `n` ensayos con menor val_loss (de un barrido o de todos)"""
+    if barrido is None:
+        return con.execute(
+            "SELECT * FROM ensayos WHERE val_loss IS NOT NULL ORDER BY val_loss LIMIT ?", (n,)
+        ).fetchall()
+    return con.execute(
+        "SELECT * FROM ensayos WHERE barrido = ? AND val_loss IS NOT NULL ORDER BY val_loss LIMIT ?",
+        (barrido, n)
+    ).fetchall()
+
+
+def resumen_por(con: sqlite3.Connection, hiperparametro: str, barrido: Optional[str] = None) -> List[sqlite3.Row]:
+    """val_loss mínima y media por valor de un hiperparámetro"""
+    if hiperparametro not in HIPERPARAMETROS:
+        raise ValueError(f"Hiperparámetro desconocido: {hiperparametro}")
+    filtro, parametros = ("WHERE barrido = ? AND val_loss IS NOT NULL", (barrido,)) if barrido \
+        else ("WHERE val_loss IS NOT NULL", ())
+    return con.execute(
+        f"SELECT {hiperparametro} AS valor, COUNT(*) AS ensayos, MIN(val_loss) AS mejor, "
+        f"AVG(val_loss) AS media FROM ensayos {filtro} GROUP BY {hiperparametro} ORDER BY mejor",
+        parametros
+    ).fetchall()
+
+
+def importar_json(con: sqlite3.Connection, ruta='experimentos_lstm.json', barrido: str = 'manual') -> int:
+    """
+    Importar los experimentos de guardar_experimento (TEMPO.ipynb)
+
+    Returns:
+        Número de experimentos importados
+    """
+    with open(ruta, 'r', encoding='utf-8') as f:
+        experimentos = json.load(f)
+    for i, exp in enumerate(experimentos):
+        cfg = exp.get('configuracion', {})
+        historia = exp.get('historia', {})
+        unidades = str(cfg.get('LSTM_units', '')).split('-')[0]
+        registrar_ensayo(con, barrido, {
+            # Los nombres del notebook se repiten: el índice los distingue
+            'nombre': f"{i:04d}_{exp.get('nombre', '')}",
+            'fecha': exp.get('fecha'),
+            'configuracion': {
+                **cfg,
+                'unidades': int(unidades) if unidades.isdigit() else None,
+                'lookback': cfg.get('LOOKBACK'),
+                'dropout': cfg.get('Dropout'),
+                'learning_rate': cfg.get('LEARNING_RATE'),
+                'lote': cfg.get('BATCH_SIZE'),
+            },
+            'metricas': exp.get('metricas', {}),
+            'epocas': historia.get('epocas_totales'),
+            'mejor_epoca': historia.get('mejor_epoca'),
+            'val_loss': historia.get('mejor_val_loss'),
+            'notas': exp.get('notas', ''),
+        })
+    return len(experimentos)
@@ -0,0 +1,133 @@
+"""
+Fábricas de modelos con el contrato de la API: (LOOKBACK, n_features) -> horizontes
+"""
+
+import sys
+from pathlib import Path
+
+from tensorflow import keras
+from tensorflow.keras import layers
+
+# La AttentionLayer de la API, con el mismo nombre de módulo (utils.attention_layer)
+# que usan sus custom objects al cargar el modelo
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'api'))
+from utils.attention_layer import AttentionLayer
+
+
+def crear_modelo_lstm_attention(input_shape, n_outputs, unidades=128, dropout=0.3):
+    """
+    Crea modelo LSTM con AttentionLayer personalizada
+    ✅ SIN LAMBDA - Usa AttentionLayer directamente
+    
+    `unidades` por dirección (las variantes podadas de podar_modelo.py usan menos);
+    `unidades` y `dropout` son parte del espacio de barrido_hiperparametros.py
+    """
+    inputs = layers.Input(shape=input_shape, name='input_layer')
+    
+    # Bidirectional LSTM
+    x = layers.Bidirectional(
+        layers.LSTM(unidades, return_sequences=True),
+        name='bidirectional_lstm'
+    )(inputs)
+    
+    # ✅ AttentionLayer personalizada (NO Lambda!)
+    x = AttentionLayer(name='attention')(x)
+    
+    # Dropout para regularización
+    x = layers.Dropout(dropout, name='dropout')(x)
+    
+    # Dense intermedia
+    x = layers.Dense(32, activation='relu', name='dense_1')(x)
+    
+    # Salida: 4 horizontes de predicción (float32 también con precisión mixta)
+    outputs = layers.Dense(n_outputs, activation='linear', name='output', dtype='float32')(x)
+    
+    model = keras.Model(inputs=inputs, outputs=outputs, name='LSTM_with_Attention')
+    
+    return model
+
+
+# ============================================================================
+# MODELOS LIGEROS (estudiantes de destilar_modelo.py)
+# ============================================================================
+# La primera capa lee la entrada directamente y la última es una Dense lineal,
+# así la API puede plegar los escalados (api/utils/model_folding.py); el
+# Dropout mantiene disponible la incertidumbre MC dropout.
+
+def crear_modelo_gru(input_shape, n_outputs, unidades=32, dropout=0.1):
+    """GRU unidireccional + Dense: pocas decenas de miles de parámetros"""
+    inputs = layers.Input(shape=input_shape, name='input_layer')
+    x = layers.GRU(unidades, name='gru')(inputs)
+    x = layers.Dropout(dropout, name='dropout')(x)
+    x = layers.Dense(max(unidades // 2, 8), activation='relu', name='dense_1')(x)
+    outputs = layers.Dense(n_outputs, activation='linear', name='output')(x)
+    return keras.Model(inputs=inputs, outputs=outputs, name=f'GRU_{unidades}')
+
+
+def crear_modelo_conv1d(input_shape, n_outputs, filtros=32, dropout=0.1):
+    """
+    Conv1D 'valid' con stride + pooling global: sin recurrencia, todo el
+    cómputo es paralelo a lo largo de las 48 horas
+    """
+    inputs = layers.Input(shape=input_shape, name='input_layer')
+    x = layers.Conv1D(filtros, 5, strides=2, activation='relu', name='conv_1')(inputs)
+    x = layers.Conv1D(filtros, 3, strides=2, activation='relu', name='conv_2')(x)
+    x = layers.GlobalAveragePooling1D(name='pool')(x)
+    x = layers.Dropout(dropout, name='dropout')(x)
+    x = layers.Dense(max(filtros // 2, 8), activation='relu', name='dense_1')(x)
+    outputs = layers.Dense(n_outputs, activation='linear', name='output')(x)
+    return keras.Model(inputs=inputs, outputs=outputs, name=f'Conv1D_{filtros}')
+
+
+# Candidatos de destilación: nombre -> (fábrica, descripción para ModelInfo)
+ESTUDIANTES = {
+    'gru32': (lambda s, n: crear_modelo_gru(s, n, 32), 'GRU(32) destilado'),
+    'gru16': (lambda s, n: crear_modelo_gru(s, n, 16), 'GRU(16) destilado'),
+    'conv32': (lambda s, n: crear_modelo_conv1d(s, n, 32), 'Conv1D(32) destilado'),
+    'conv16': (lambda s, n: crear_modelo_conv1d(s, n, 16), 'Conv1D(16) destilado'),
+}
+
+
+# ============================================================================
+# TCN (convoluciones causales dilatadas)
+# ============================================================================
+
+def crear_modelo_tcn(input_shape, n_outputs, filtros=64, kernel_size=3,
+                     dilataciones=(1, 2, 4, 8), dropout=0.1):
+    """
+    Crea modelo TCN: bloques residuales de Conv1D causales dilatadas
+    
+    Sin recurrencia: las 48 horas se procesan en paralelo. Con kernel 3 y
+    dilataciones 1-2-4-8 (dos convoluciones por bloque) el campo receptivo
+    es 1 + 2*(3-1)*15 = 61 horas >= LOOKBACK, así que la última posición ve
+    la ventana completa. La proyección de entrada es una Conv1D 1x1 'valid'
+    para que la API pueda plegar el escalado de entrada.
+    """
+    inputs = layers.Input(shape=input_shape, name='input_layer')
+    x = layers.Conv1D(filtros, 1, name='proyeccion')(inputs)
+    
+    for d in dilataciones:
+        residuo = x
+        for j in (1, 2):
+            x = layers.Conv1D(
+                filtros, kernel_size, padding='causal', dilation_rate=d,
+                activation='relu', name=f'tcn_d{d}_conv{j}'
+            )(x)
+            x = layers.SpatialDropout1D(dropout, name=f'tcn_d{d}_dropout{j}')(x)
+        x = layers.Add(name=f'tcn_d{d}_residuo')([residuo, x])
+    
+    # Solo la última posición temporal (ve toda la ventana)
+    x = layers.Cropping1D((input_shape[0] - 1, 0), name='ultima_hora')(x)
+    x = layers.Flatten(name='flatten')(x)
+    x = layers.Dense(32, activation='relu', name='dense_1')(x)
+    outputs = layers.Dense(n_outputs, activation='linear', name='output', dtype='float32')(x)
+    
+    return keras.Model(inputs=inputs, outputs=outputs, name='TCN')
+
+
+# Arquitecturas de reentrenar_modelo_rapido.py --arquitectura:
+# nombre -> (fábrica, prefijo de los archivos, descripción para ModelInfo)
+ARQUITECTURAS = {
+    'lstm_attention': (crear_modelo_lstm_attention, 'LSTM_Attention_AQI', 'Bidirectional LSTM + Attention'),
+    'tcn': (crear_modelo_tcn, 'TCN_AQI', 'TCN (Conv1D causales dilatadas)'),
+}
@@ -0,0 +1,225 @@
+"""
+Pipeline tf.data de entrenamiento en streaming desde shards en disco
+
+Dos tipos de shard:
+- Series: una serie horaria contigua de una estación (.npz con el array
+  `valores` de forma (horas, len(FEATURES)) en el orden de FEATURES, o un
+  CSV/parquet con esas columnas). Las ventanas (LOOKBACK, features) -> AQI
+  en cada horizonte se generan al vuelo y nunca cruzan de un shard a otro.
+- Ventanas: los .npz de construir_dataset.py (arrays `X`, `y`), listados en
+  su `indice.json`.
+
+En memoria solo hay `ciclo` shards abiertos, el buffer de mezcla y los lotes
+precargados, así que la memoria no depende de cuántos años o estaciones haya.
+
+    escalado_x, escalado_y = ajustar_escalado(rutas)
+    ds = crear_dataset(rutas, escalado_x, escalado_y, lote=64)
+    modelo.fit(ds, epochs=...)
+"""
+
+import glob
+import json
+import sys
+from pathlib import Path
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from entrenamiento.datos import LOOKBACK, FORECAST_HORIZONS, FEATURES, cargar_historico
+
+INDICE_AQI = FEATURES.index('AQI')
+
+# Los módulos de la API (EscaladorAfin)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'api'))
+
+
+def listar_shards(origen) -> List[str]:
+    """
+    Rutas de shards: un dataset de construir_dataset.py (los shards de su
+    indice.json), un directorio (todos sus .npz/.csv/.parquet), un patrón
+    glob o una lista
+    """
+    if isinstance(origen, (list, tuple)):
+        return [str(r) for r in origen]
+    ruta = Path(origen)
+    if (ruta / 'indice.json').exists():
+        with open(ruta / 'indice.json', 'r', encoding='utf-8') as f:
+            indice = json.load(f)
+        if (indice['lookback'], indice['horizontes'], indice['features']) != (LOOKBACK, FORECAST_HORIZONS, FEATURES):
+            raise ValueError(f"{ruta}: el dataset se construyó con otros parámetros de ventana")
+        return [
+            str(ruta / shard['ruta'])
+            for estacion in sorted(indice['estaciones'])
+            for _, unidad in sorted(indice['estaciones'][estacion].items())
+            for shard in unidad['shards']
+        ]
+    if ruta.is_dir():
+        return sorted(str(r) for r in ruta.rglob('*') if r.suffix in ('.npz', '.csv', '.parquet'))
+    return sorted(glob.glob(str(origen)))
+
+
+def guardar_shard(ruta, valores: np.ndarray):
+    """Escribir una serie (horas, len(FEATURES)) como shard .npz comprimido"""
+    valores = np.asarray(valores, dtype=np.float32)
+    if valores.ndim != 2 or valores.shape[1] != len(FEATURES):
+        raise ValueError(f"Se esperaba (horas, {len(FEATURES)}) y llegó {valores.shape}")
+    np.savez_compressed(ruta, valores=valores)
+
+
+def leer_shard(ruta) -> np.ndarray:
+    """Serie (horas, len(FEATURES)) en float32"""
+    ruta = Path(ruta.decode() if isinstance(ruta, bytes) else ruta)
+    if ruta.suffix == '.npz':
+        with np.load(ruta) as datos:
+            return datos['valores'].astype(np.float32, copy=False)
+    return cargar_historico(ruta)[FEATURES].to_numpy(dtype=np.float32)
+
+
+def es_shard_de_ventanas(ruta) -> bool:
+    """True para los shards (X, y) de construir_dataset.py"""
+    if not str(ruta).endswith('.npz'):
+        return False
+    with np.load(ruta) as datos:
+        return 'X' in datos.files
+
+
+def leer_shard_ventanas(ruta) -> Tuple[np.ndarray, np.ndarray]:
+    """(X (n, LOOKBACK, features), y (n, horizontes)) en float32"""
+    ruta = ruta.decode() if isinstance(ruta, bytes) else ruta
+    with np.load(ruta) as datos:
+        return datos['X'].astype(np.float32, copy=False), datos['y'].astype(np.float32, copy=False)
+
+
+def escalado_de_series(series: Iterable[np.ndarray]) -> Tuple[Tuple[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]]:
+    """
+    Parámetros MinMax (scale_, min_) de X y de y a partir de arrays (horas, features)
+
+    Equivalente a MinMaxScaler().fit sobre todas las filas, sin concatenarlas.
+    La salida usa el rango del AQI para todos los horizontes.
+    """
+    minimos = np.full(len(FEATURES), np.inf)
+    maximos = np.full(len(FEATURES), -np.inf)
+    for serie in series:
+        if len(serie):
+            minimos = np.minimum(minimos, serie.min(axis=0))
+            maximos = np.maximum(maximos, serie.max(axis=0))
+    if not np.isfinite(minimos).all():
+        raise ValueError("No hay datos para ajustar el escalado")
+
+    rango = np.where(maximos > minimos, maximos - minimos, 1.0)
+    escala = 1.0 / rango
+    n = len(FORECAST_HORIZONS)
+    escalado_x = (escala, -minimos * escala)
+    escalado_y = (np.full(n, escala[INDICE_AQI]), np.full(n, -minimos[INDICE_AQI] * escala[INDICE_AQI]))
+    return escalado_x, escalado_y
+
+
+def ajustar_escalado(rutas: Sequence[str]) -> Tuple[Tuple[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]]:
+    """
+    Parámetros MinMax (scale_, min_) de X y de y recorriendo los shards uno a uno
+
+    Equivalente a MinMaxScaler().fit sobre todas las horas, sin cargarlas a
+    la vez.
+    """
+    ventanas = bool(rutas) and es_shard_de_ventanas(rutas[0])
+    return escalado_de_series(
+        leer_shard_ventanas(ruta)[0].reshape(-1, len(FEATURES)) if ventanas else leer_shard(ruta)
+        for ruta in rutas
+    )
+
+
+def escalado_de_ventanas(X: np.ndarray) -> Tuple[Tuple[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]]:
+    """escalado_de_series sobre ventanas en memoria (n, lookback, features)"""
+    return escalado_de_series([X.reshape(-1, len(FEATURES))])
+
+
+def a_escalador_afin(escalado: Tuple[np.ndarray, np.ndarray]):
+    """EscaladorAfin de la API con los parámetros (scale_, min_)"""
+    from utils.model_bundle import EscaladorAfin
+
+    escala, minimo = escalado
+    return EscaladorAfin(minimo, escala)
+
+
+def a_min_max_scaler(escalado: Tuple[np.ndarray, np.ndarray]):
+    """MinMaxScaler de sklearn con los mismos parámetros (para guardar el .pkl como siempre)"""
+    from sklearn.preprocessing import MinMaxScaler
+
+    escala, minimo = (np.asarray(p, dtype=np.float64) for p in escalado)
+    data_min = -minimo / escala
+    # Ajustar con las dos filas (mínimo, máximo) reproduce scale_ y min_
+    return MinMaxScaler().fit(np.vstack([data_min, data_min + 1.0 / escala]))
+
+
+def crear_dataset(
+    rutas: Sequence[str],
+    escalado_x: Tuple[np.ndarray, np.ndarray],
+    escalado_y: Tuple[np.ndarray, np.ndarray],
+    lote: int = 32,
+    buffer_mezcla: int = 10_000,
+    ciclo: int = 4,
+    mezclar: bool = True,
+    lookback: int = LOOKBACK,
+    horizontes: Sequence[int] = FORECAST_HORIZONS,
+    semilla: int = 42,
+):
+    """
+    tf.data.Dataset de lotes (X_norm, y_norm)
+
+    Args:
+        rutas: Shards (ver listar_shards)
+        escalado_x, escalado_y: (scale_, min_) de ajustar_escalado o de un MinMaxScaler
+        lote: Tamaño de lote
+        buffer_mezcla: Ventanas en el buffer de mezcla (acota la memoria)
+        ciclo: Shards leídos en paralelo (interleave)
+        mezclar: False para validación (orden determinista)
+    """
+    import tensorflow as tf
+
+    n_features = len(FEATURES)
+    h = tf.constant(list(horizontes), dtype=tf.int64)
+    max_h = int(max(horizontes))
+    escala_x, minimo_x = (tf.constant(p, dtype=tf.float32) for p in escalado_x)
+    escala_y, minimo_y = (tf.constant(p, dtype=tf.float32) for p in escalado_y)
+
+    def _cargar(ruta):
+        serie = tf.numpy_function(leer_shard, [ruta], tf.float32, stateful=False)
+        serie.set_shape([None, n_features])
+        # Normalizar la serie completa una vez (no cada ventana por separado)
+        return serie * escala_x + minimo_x, serie[:, INDICE_AQI]
+
+    def _ventanas(serie_norm, aqi):
+        ultimo = tf.shape(serie_norm, out_type=tf.int64)[0] - max_h
+        inicios = tf.data.Dataset.range(lookback, tf.maximum(ultimo, lookback))
+        if mezclar:
+            inicios = inicios.shuffle(4096, seed=semilla)
+        return inicios.map(
+            lambda i: (serie_norm[i - lookback:i], tf.gather(aqi, i + h) * escala_y + minimo_y),
+            num_parallel_calls=tf.data.AUTOTUNE,
+            deterministic=not mezclar
+        )
+
+    def _cargar_ventanas(ruta):
+        X, y = tf.numpy_function(leer_shard_ventanas, [ruta], [tf.float32, tf.float32], stateful=False)
+        X.set_shape([None, lookback, n_features])
+        y.set_shape([None, len(horizontes)])
+        return tf.data.Dataset.from_tensor_slices((X * escala_x + minimo_x, y * escala_y + minimo_y))
+
+    ds = tf.data.Dataset.from_tensor_slices(list(rutas))
+    if mezclar:
+        ds = ds.shuffle(len(rutas), seed=semilla, reshuffle_each_iteration=True)
+    if es_shard_de_ventanas(rutas[0]):
+        # Shards de construir_dataset.py: las ventanas ya están hechas
+        por_shard = _cargar_ventanas
+    else:
+        ds = ds.map(_cargar, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not mezclar)
+        por_shard = _ventanas
+    ds = ds.interleave(
+        por_shard,
+        cycle_length=ciclo,
+        num_parallel_calls=tf.data.AUTOTUNE,
+        deterministic=not mezclar
+    )
+    if mezclar:
+        ds = ds.shuffle(buffer_mezcla, seed=semilla, reshuffle_each_iteration=True)
+    return ds.batch(lote).prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,146 @@
+"""
+Perfil de rendimiento del entrenamiento en CPU
+
+- Hilos intra/inter-op de TensorFlow (antes de crear ningún tensor).
+- jit_compile (XLA) del paso de entrenamiento: Keras lo desactiva por
+  defecto en máquinas solo-CPU.
+- Precisión mixta bfloat16 si la CPU tiene instrucciones bf16 (AVX512_BF16
+  o AMX); los pesos siguen en float32 y la última capa calcula en float32.
+- Lote grande con learning rate escalado (regla lineal o raíz) y
+  calentamiento lineal del learning rate en los primeros pasos.
+
+Todo está desactivado por defecto: lo que compensa depende del modelo y de
+la CPU (en un núcleo con AMX, bf16 acelera la TCN con lote 256 pero frena el
+BiLSTM), así que conviene elegir con benchmarks/bench_entrenamiento_cpu.py,
+que mide ventanas/s con cada opción.
+"""
+
+import argparse
+import os
+from typing import Dict, Optional
+
+LOTE_BASE = 32          # Lote con el que se eligió el learning rate base
+LR_BASE = 0.001
+
+
+def cpu_admite_bf16() -> bool:
+    """True si la CPU tiene bfloat16 nativo (AVX512_BF16 o AMX-BF16)"""
+    try:
+        with open('/proc/cpuinfo', 'r', encoding='utf-8') as f:
+            banderas = next((l for l in f if l.startswith('flags')), '').split()
+    except OSError:
+        return False
+    return 'avx512_bf16' in banderas or 'amx_bf16' in banderas
+
+
+def configurar_hilos(intra: Optional[int] = None, inter: Optional[int] = None):
+    """Hilos de TensorFlow (0/None = lo que decida TensorFlow)"""
+    import tensorflow as tf
+
+    if intra:
+        tf.config.threading.set_intra_op_parallelism_threads(intra)
+    if inter:
+        tf.config.threading.set_inter_op_parallelism_threads(inter)
+
+
+def activar_precision_mixta(modo: str = 'auto') -> bool:
+    """
+    Política global 'mixed_bfloat16' ('si', 'no' o 'auto' según la CPU)
+
+    Returns:
+        True si quedó activada (los modelos que se creen después la usan)
+    """
+    from tensorflow import keras
+
+    activar = modo == 'si' or (modo == 'auto' and cpu_admite_bf16())
+    keras.mixed_precision.set_global_policy('mixed_bfloat16' if activar else 'float32')
+    return activar
+
+
+def lr_escalado(lote: int, lr_base: float = LR_BASE, lote_base: int = LOTE_BASE, regla: str = 'lineal') -> float:
+    """Learning rate para `lote` a partir del de `lote_base` (lineal: proporcional; raiz: sqrt)"""
+    factor = lote / lote_base
+    if regla == 'raiz':
+        factor = factor ** 0.5
+    elif regla != 'lineal':
+        raise ValueError(f"Regla de escalado desconocida: {regla}")
+    return lr_base * factor
+
+
+def callback_calentamiento(lr: float, pasos: int):
+    """Callback que sube el learning rate linealmente de lr/pasos a lr en los primeros `pasos` lotes"""
+    from tensorflow import keras
+
+    class CalentamientoLR(keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.paso = 0
+
+        def on_train_batch_begin(self, batch, logs=None):
+            if self.paso < pasos:
+                self.paso += 1
+                self.model.optimizer.learning_rate.assign(lr * self.paso / pasos)
+
+    return CalentamientoLR()
+
+
+def a_float32(fabrica, model, **kwargs):
+    """
+    Copia float32 de un modelo entrenado con precisión mixta
+
+    Los pesos ya son float32; reconstruir con la política float32 evita que
+    el .keras guardado (y el bundle) calcule en bfloat16 al servir.
+    """
+    from tensorflow import keras
+
+    anterior = keras.mixed_precision.global_policy()
+    keras.mixed_precision.set_global_policy('float32')
+    try:
+        copia = fabrica(**kwargs)
+        copia.set_weights(model.get_weights())
+    finally:
+        keras.mixed_precision.set_global_policy(anterior)
+    return copia
+
+
+def anadir_argumentos(parser: argparse.ArgumentParser):
+    """Opciones del perfil de rendimiento (comunes a reentrenar y al benchmark)"""
+    grupo = parser.add_argument_group('rendimiento en CPU')
+    grupo.add_argument('--hilos-intra', type=int, default=0, help="Hilos intra-op (0 = automático)")
+    grupo.add_argument('--hilos-inter', type=int, default=0, help="Hilos inter-op (0 = automático)")
+    grupo.add_argument('--jit', action='store_true', help="Compilar el paso de entrenamiento con XLA")
+    grupo.add_argument('--bf16', choices=['auto', 'si', 'no'], default='no',
+                       help="Precisión mixta bfloat16 (auto = si la CPU la admite)")
+    grupo.add_argument('--lote', type=int, default=LOTE_BASE, help="Tamaño de lote")
+    grupo.add_argument('--escalar-lr', choices=['no', 'lineal', 'raiz'], default='no',
+                       help=f"Escalar el learning rate con el lote respecto a {LOTE_BASE}")
+    grupo.add_argument('--calentamiento', type=int, default=0,
+                       help="Pasos de calentamiento lineal del learning rate (lotes grandes)")
+
+
+def aplicar_perfil(args) -> Dict:
+    """
+    Configurar TensorFlow según los argumentos; llamar antes de crear el modelo
+
+    Returns:
+        {'lr', 'lote', 'jit_compile', 'bf16', 'callbacks'} para compile/fit
+    """
+    configurar_hilos(args.hilos_intra, args.hilos_inter)
+    bf16 = activar_precision_mixta(args.bf16)
+    lr = LR_BASE if args.escalar_lr == 'no' else lr_escalado(args.lote, regla=args.escalar_lr)
+    calentamiento = args.calentamiento
+    if args.escalar_lr != 'no' and args.lote > LOTE_BASE and not calentamiento:
+        # Con lotes grandes el lr escalado desde el primer paso puede divergir
+        calentamiento = 100
+    callbacks = [callback_calentamiento(lr, calentamiento)] if calentamiento else []
+    return {'lr': lr, 'lote': args.lote, 'jit_compile': bool(args.jit), 'bf16': bf16, 'callbacks': callbacks}
+
+
+def describir(perfil: Dict) -> str:
+    import tensorflow as tf
+
+    return (f"lote {perfil['lote']}, lr {perfil['lr']:g}, jit {'sí' if perfil['jit_compile'] else 'no'}, "
+            f"bf16 {'sí' if perfil['bf16'] else 'no'}, hilos intra/inter "
+            f"{tf.config.threading.get_intra_op_parallelism_threads() or 'auto'}/"
+            f"{tf.config.threading.get_inter_op_parallelism_threads() or 'auto'} "
+            f"({os.cpu_count()} núcleos)")
@@ -0,0 +1,126 @@
+"""
+Estaciones sintéticas a escala: series horarias correlacionadas y reproducibles
+
+Cada estación tiene parámetros propios (nivel de fondo, tráfico, clima,
+estacionalidad, persistencia de episodios, huecos de datos) sacados de un
+generador con semilla (semilla global, número de estación): la estación 17
+es la misma aunque cambie el número de procesos o el tamaño de las partes.
+
+Las variables no son independientes: temperatura, humedad y viento forman
+la meteorología (con ruido AR(1)); el viento ventila los contaminantes, el
+NO2 sigue al tráfico, el O3 sube con el sol y la temperatura y baja por la
+titulación del NO2, el PM10 acompaña al PM2.5 y el AQI es el máximo de los
+subíndices EPA de PM2.5 y PM10.
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from entrenamiento.datos import FEATURES
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'api'))
+from utils.aqi import aqi_total
+
+
+def _rng(semilla: int, estacion: int) -> np.random.Generator:
+    return np.random.default_rng([semilla, estacion])
+
+
+def parametros_estacion(estacion: int, semilla: int = 42) -> Dict[str, float]:
+    """Parámetros reproducibles de una estación virtual"""
+    rng = _rng(semilla, estacion)
+    latitud = float(rng.uniform(-45, 60))
+    return {
+        'latitud': latitud,
+        'longitud': float(rng.uniform(-125, 150)),
+        'pm25_fondo': float(rng.lognormal(np.log(14), 0.5)),
+        'trafico': float(rng.uniform(0.2, 1.5)),
+        'hora_punta': float(rng.normal(8, 0.7)),
+        'fin_de_semana': float(rng.uniform(0.55, 0.95)),
+        'no2_fondo': float(rng.lognormal(np.log(20), 0.4)),
+        'razon_pm10': float(rng.uniform(1.4, 2.3)),
+        'o3_fondo': float(rng.uniform(25, 50)),
+        'o3_solar': float(rng.uniform(20, 60)),
+        # El hemisferio invierte la estación; la latitud marca la amplitud
+        'temp_media': float(28 - 0.35 * abs(latitud) + rng.normal(0, 2)),
+        'temp_estacional': float(np.sign(latitud) * (3 + 0.25 * abs(latitud))),
+        'temp_diaria': float(rng.uniform(4, 9)),
+        'humedad_media': float(rng.uniform(40, 80)),
+        'viento_medio': float(rng.lognormal(np.log(4), 0.35)),
+        'invierno_pm': float(rng.uniform(0.1, 0.6)),
+        'persistencia': float(rng.uniform(0.95, 0.995)),
+        'episodios': float(rng.uniform(0.15, 0.45)),
+        'huecos': float(rng.uniform(0.0, 2.0)),
+    }
+
+
+def _ar1(rng: np.random.Generator, n: int, phi: float, sigma: float) -> np.ndarray:
+    """Ruido AR(1) estacionario de desviación `sigma`"""
+    ruido = rng.normal(0, sigma * np.sqrt(1 - phi * phi), n)
+    ruido[0] = rng.normal(0, sigma)
+    return lfilter([1.0], [1.0, -phi], ruido)
+
+
+def generar_estacion(estacion: int, fechas: pd.DatetimeIndex, semilla: int = 42,
+                     huecos_por_mes: float = 1.0) -> Dict[str, np.ndarray]:
+    """
+    Serie horaria de una estación en `fechas` (columnas FEATURES en float32)
+
+    Args:
+        huecos_por_mes: Media de cortes de datos por mes (NaN de 1 a 12 h)
+    """
+    p = parametros_estacion(estacion, semilla)
+    rng = _rng(semilla + 1, estacion)
+    n = len(fechas)
+    hora = fechas.hour.to_numpy()
+    dia_anio = fechas.dayofyear.to_numpy()
+    laborable = fechas.dayofweek.to_numpy() < 5
+
+    estacional = np.sin(2 * np.pi * (dia_anio - 105) / 365.25)       # +1 en verano del norte
+    invierno = 0.5 * (1 - estacional * np.sign(p['latitud']))         # 1 en invierno local
+    diario = np.sin(2 * np.pi * (hora - 9) / 24)                      # máximo a las 15 h
+
+    # Meteorología
+    temperatura = (p['temp_media'] + p['temp_estacional'] * estacional + p['temp_diaria'] * diario
+                   + _ar1(rng, n, 0.97, 2.0))
+    humedad = np.clip(p['humedad_media'] - 1.5 * (temperatura - p['temp_media']) + _ar1(rng, n, 0.9, 8.0), 5, 100)
+    viento = np.clip(p['viento_medio'] * np.exp(_ar1(rng, n, 0.9, 0.4)) * (1 + 0.3 * diario), 0, 40)
+
+    # Capa de mezcla baja de noche y viento flojo: los contaminantes se acumulan
+    ventilacion = (p['viento_medio'] / (viento + 1)) ** 0.6 * (1 + 0.3 * np.cos(2 * np.pi * hora / 24))
+    trafico = (np.exp(-(hora - p['hora_punta']) ** 2 / 4) + 0.9 * np.exp(-(hora - p['hora_punta'] - 10) ** 2 / 5))
+    trafico = 0.3 + p['trafico'] * trafico * np.where(laborable, 1.0, p['fin_de_semana'])
+    episodio = np.exp(_ar1(rng, n, p['persistencia'], p['episodios']))
+
+    no2 = p['no2_fondo'] * trafico * ventilacion * np.exp(rng.normal(0, 0.15, n))
+    pm25 = (p['pm25_fondo'] * (1 + p['invierno_pm'] * invierno) * ventilacion * episodio
+            + 0.15 * no2) * np.exp(rng.normal(0, 0.1, n))
+    pm10 = pm25 * p['razon_pm10'] * np.exp(rng.normal(0, 0.12, n))
+    sol = np.clip(np.sin(np.pi * (hora - 6) / 14), 0, None)
+    o3 = np.clip(p['o3_fondo'] + p['o3_solar'] * sol * (1 + 0.03 * (temperatura - 20))
+                 - 0.3 * no2 + rng.normal(0, 5, n), 0, None)
+
+    columnas = {
+        'PM2.5': np.clip(pm25, 0, 500), 'PM10': np.clip(pm10, 0, 600), 'O3': o3, 'NO2': no2,
+        'temperatura': temperatura, 'humedad': humedad, 'viento': viento,
+    }
+    columnas['AQI'] = aqi_total({'PM2.5': columnas['PM2.5'], 'PM10': columnas['PM10']})
+    columnas = {c: columnas[c].astype(np.float32) for c in FEATURES}
+
+    # Cortes de datos (sensor caído: todas las variables a NaN)
+    cortes = rng.poisson(huecos_por_mes * p['huecos'] * n / 730)
+    if cortes:
+        inicio = rng.integers(0, n, cortes)
+        largo = rng.integers(1, 13, cortes)
+        marca = np.zeros(n + 1, dtype=np.int64)
+        np.add.at(marca, inicio, 1)
+        np.add.at(marca, np.minimum(inicio + largo, n), -1)
+        caido = np.cumsum(marca[:-1]) > 0
+        for valores in columnas.values():
+            valores[caido] = np.nan
+    return columnas
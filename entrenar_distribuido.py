@@ -0,0 +1,350 @@
+"""
+🖧 ENTRENAMIENTO DISTRIBUIDO DEL LSTM + ATTENTION (CPU, paralelismo de datos)
+================================================================================
+Cada trabajador es un proceso de TensorFlow con su réplica del modelo;
+MultiWorkerMirroredStrategy promedia los gradientes de todas las réplicas
+en cada paso (all-reduce) y el lote global se reparte entre ellas.
+
+- Local: `--trabajadores N` lanza N procesos en esta máquina (TF_CONFIG con
+  puertos libres de localhost), cada uno con núcleos/N hilos.
+- Varios nodos: en cada nodo `--hosts h1:p1 h2:p2 ... --indice i`.
+- Checkpoint y reanudación: al final de cada época se guarda el estado
+  (pesos, optimizador y época) en <salida>/respaldo; si se interrumpe,
+  relanzar el mismo comando continúa desde la última época guardada.
+- `--escalado 1 2 4` mide ventanas/s con 1, 2 y 4 trabajadores locales
+  (mismo lote por trabajador) e imprime aceleración y eficiencia.
+
+Al terminar, el trabajador 0 escribe el bundle .aqib (drop-in para la API).
+
+El bucle de entrenamiento es explícito (strategy.run + all-reduce) en lugar
+de model.fit: en Keras 3, fit con MultiWorkerMirroredStrategy y más de un
+trabajador falla al construir el modelo con el primer lote distribuido.
+
+Uso:
+    python entrenar_distribuido.py --trabajadores 4 --epocas 20
+    python entrenar_distribuido.py --escalado 1 2 4 --pasos-por-epoca 50
+    python entrenar_distribuido.py --hosts nodo1:12345 nodo2:12345 --indice 0 --shards datos/dataset
+"""
+
+import os
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Reduce warnings de TensorFlow
+
+import argparse
+import json
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+from entrenamiento.datos import LOOKBACK, FORECAST_HORIZONS, FEATURES, generar_datos_sinteticos, ventanas_de_series
+from entrenamiento.pipeline import listar_shards, ajustar_escalado, crear_dataset, escalado_de_ventanas, a_escalador_afin
+
+VALIDATION_SPLIT = 0.2
+
+
+# ============================================================================
+# TRABAJADOR
+# ============================================================================
+
+def _datos(args, lote_global: int):
+    """
+    (train, val, pasos por época, pasos de validación, escalado_x, escalado_y)
+
+    Todos los trabajadores construyen el mismo pipeline; la estrategia lo
+    reparte (auto-shard por datos) entre réplicas.
+    """
+    import tensorflow as tf
+
+    if args.shards:
+        with open(Path(args.shards) / 'indice.json', 'r', encoding='utf-8') as f:
+            indice = json.load(f)
+        ventanas = {
+            str(Path(args.shards) / s['ruta']): s['ventanas']
+            for unidades in indice['estaciones'].values() for u in unidades.values() for s in u['shards']
+        }
+        rutas = listar_shards(args.shards)
+        corte = min(len(rutas) - 1, max(1, int(len(rutas) * (1 - VALIDATION_SPLIT))))
+        rutas_train, rutas_val = rutas[:corte], rutas[corte:]
+        escalado_x, escalado_y = ajustar_escalado(rutas_train)
+        train = crear_dataset(rutas_train, escalado_x, escalado_y, lote=lote_global).repeat()
+        val = crear_dataset(rutas_val, escalado_x, escalado_y, lote=lote_global, mezclar=False).repeat()
+        n_train = sum(ventanas[r] for r in rutas_train)
+        n_val = sum(ventanas[r] for r in rutas_val)
+    else:
+        series = [generar_datos_sinteticos(args.horas, semilla=100 + i) for i in range(args.series)]
+        X, y = ventanas_de_series(series)
+        corte = int(len(X) * (1 - VALIDATION_SPLIT))
+        escalado_x, escalado_y = escalado_de_ventanas(X[:corte])
+        Xn = a_escalador_afin(escalado_x).transform(X).astype(np.float32)
+        yn = a_escalador_afin(escalado_y).transform(y).astype(np.float32)
+        train = (tf.data.Dataset.from_tensor_slices((Xn[:corte], yn[:corte]))
+                 .shuffle(10_000, seed=42).repeat().batch(lote_global, drop_remainder=True))
+        val = tf.data.Dataset.from_tensor_slices((Xn[corte:], yn[corte:])).repeat().batch(lote_global, drop_remainder=True)
+        n_train, n_val = corte, len(X) - corte
+
+    opciones = tf.data.Options()
+    opciones.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+    train = train.with_options(opciones).prefetch(tf.data.AUTOTUNE)
+    val = val.with_options(opciones).prefetch(tf.data.AUTOTUNE)
+    pasos = args.pasos_por_epoca or max(1, n_train // lote_global)
+    pasos_val = max(1, n_val // lote_global)
+    return train, val, pasos, pasos_val, escalado_x, escalado_y
+
+
+def trabajador(args):
+    """Un proceso del clúster (TF_CONFIG ya está en el entorno)"""
+    if args.hilos:
+        os.environ['OMP_NUM_THREADS'] = str(args.hilos)
+    import tensorflow as tf
+    from tensorflow import keras
+
+    if args.hilos:
+        tf.config.threading.set_intra_op_parallelism_threads(args.hilos)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    estrategia = tf.distribute.MultiWorkerMirroredStrategy()
+    config = json.loads(os.environ.get('TF_CONFIG', '{}'))
+    indice = config.get('task', {}).get('index', 0)
+    n = estrategia.num_replicas_in_sync
+    jefe = indice == 0
+    lote_global = args.lote * n
+
+    from entrenamiento.modelos import crear_modelo_lstm_attention
+
+    train, val, pasos, pasos_val, escalado_x, escalado_y = _datos(args, lote_global)
+    with estrategia.scope():
+        modelo = crear_modelo_lstm_attention((LOOKBACK, len(FEATURES)), len(FORECAST_HORIZONS))
+        # Regla lineal: el lote global crece con los trabajadores
+        optimizador = keras.optimizers.Adam(learning_rate=args.lr * n)
+        optimizador.build(modelo.trainable_variables)
+        epoca = tf.Variable(0, dtype=tf.int64, trainable=False)
+        checkpoint = tf.train.Checkpoint(modelo=modelo, optimizador=optimizador, epoca=epoca)
+
+    # Checkpoint/reanudación: todos los trabajadores guardan (es una operación
+    # colectiva) pero solo el del jefe se conserva; con varios nodos <salida>
+    # debe estar en almacenamiento compartido
+    salida = Path(args.salida)
+    respaldo = salida / 'respaldo' if jefe else salida / f'respaldo_tmp_{indice}'
+    gestor = tf.train.CheckpointManager(checkpoint, str(respaldo), max_to_keep=2)
+    ultimo = tf.train.latest_checkpoint(str(salida / 'respaldo'))
+    if ultimo:
+        checkpoint.restore(ultimo)
+        if jefe:
+            print(f"♻️ Reanudando desde la época {int(epoca.numpy())} ({Path(ultimo).name})", flush=True)
+
+    def _mse(X, y, training):
+        pred = modelo(X, training=training)
+        por_ventana = tf.reduce_mean(tf.square(pred - y), axis=-1)
+        # Media sobre el lote global: la suma de las réplicas es la pérdida del paso
+        return tf.nn.compute_average_loss(por_ventana, global_batch_size=lote_global)
+
+    def _paso_replica(X, y):
+        with tf.GradientTape() as cinta:
+            perdida = _mse(X, y, True)
+        gradientes = cinta.gradient(perdida, modelo.trainable_variables)
+        # apply_gradients en contexto de réplica: all-reduce de los gradientes
+        optimizador.apply_gradients(zip(gradientes, modelo.trainable_variables))
+        return perdida
+
+    @tf.function
+    def paso_entrenamiento(iterador):
+        X, y = next(iterador)
+        return estrategia.reduce('SUM', estrategia.run(_paso_replica, args=(X, y)), axis=None)
+
+    @tf.function
+    def paso_validacion(iterador):
+        X, y = next(iterador)
+        return estrategia.reduce('SUM', estrategia.run(_mse, args=(X, y, False)), axis=None)
+
+    it_train = iter(estrategia.experimental_distribute_dataset(train))
+    it_val = iter(estrategia.experimental_distribute_dataset(val))
+    if jefe:
+        print(f"🖧 {n} trabajadores | lote global {lote_global} ({args.lote} por trabajador) | "
+              f"{pasos} pasos por época", flush=True)
+
+    tiempos: List[float] = []
+    val_loss = float('nan')
+    while int(epoca.numpy()) < args.epocas:
+        t0 = time.perf_counter()
+        perdida = sum(float(paso_entrenamiento(it_train)) for _ in range(pasos)) / pasos
+        tiempos.append(time.perf_counter() - t0)
+        val_loss = sum(float(paso_validacion(it_val)) for _ in range(pasos_val)) / pasos_val
+        epoca.assign_add(1)
+        gestor.save(checkpoint_number=int(epoca.numpy()))
+        if jefe:
+            print(f"   ⏱️ Época {int(epoca.numpy())}/{args.epocas}: loss {perdida:.4f}, val_loss {val_loss:.4f}, "
+                  f"{pasos * lote_global / tiempos[-1]:,.0f} ventanas/s", flush=True)
+    if not jefe:
+        shutil.rmtree(respaldo, ignore_errors=True)
+
+    # La primera época medida incluye el trazado del grafo
+    medidos = tiempos[1:] or tiempos
+    ventanas_s = pasos * lote_global / float(np.mean(medidos)) if medidos else 0.0
+    if args.informe and jefe:
+        with open(args.informe, 'w', encoding='utf-8') as f:
+            json.dump({'trabajadores': n, 'ventanas_s': ventanas_s, 'lote_global': lote_global,
+                       'epocas': len(tiempos)}, f)
+
+    if jefe and not args.sin_bundle:
+        from utils.model_bundle import escribir_bundle
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        metadata = {
+            'timestamp': timestamp,
+            'nombre_experimento': 'LSTM_Attention_AQI_distribuido',
+            'arquitectura': 'Bidirectional LSTM + Attention',
+            'lookback': LOOKBACK,
+            'forecast_horizons': FORECAST_HORIZONS,
+            'features': FEATURES,
+            'trabajadores': n,
+            'lote_global': lote_global,
+            'epochs_trained': args.epocas,
+            'val_loss': val_loss,
+            'model_params': modelo.count_params(),
+        }
+        ruta = Path(args.modelos) / f"LSTM_Attention_AQI_distribuido_{timestamp}.aqib"
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        escribir_bundle(ruta, modelo.get_weights(), modelo.to_json(),
+                        a_escalador_afin(escalado_x), a_escalador_afin(escalado_y), metadata)
+        print(f"💾 {ruta.name} ({ventanas_s:,.0f} ventanas/s)", flush=True)
+
+
+# ============================================================================
+# LANZADOR LOCAL
+# ============================================================================
+
+def _puertos_libres(n: int) -> List[int]:
+    sockets = [socket.socket() for _ in range(n)]
+    for s in sockets:
+        s.bind(('localhost', 0))
+    puertos = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return puertos
+
+
+def lanzar_local(args, n: int, extra: List[str]) -> int:
+    """N trabajadores en esta máquina; devuelve el código de salida del peor"""
+    hosts = [f"localhost:{p}" for p in _puertos_libres(n)]
+    hilos = args.hilos or max(1, (os.cpu_count() or 1) // n)
+    procesos = []
+    for i in range(n):
+        entorno = {**os.environ, 'TF_CONFIG': json.dumps({'cluster': {'worker': hosts}, 'task': {'type': 'worker', 'index': i}})}
+        comando = [sys.executable, __file__, '--trabajador', '--hilos', str(hilos), *extra]
+        # Solo el trabajador 0 escribe en la consola
+        procesos.append(subprocess.Popen(comando, env=entorno,
+                                         stdout=None if i == 0 else subprocess.DEVNULL,
+                                         stderr=None if i == 0 else subprocess.DEVNULL))
+    codigos = []
+    try:
+        for p in procesos:
+            codigos.append(p.wait())
+            if codigos[-1] != 0:
+                break
+    finally:
+        for p in procesos:
+            if p.poll() is None:
+                p.terminate()
+    return max(codigos) if codigos else 1
+
+
+def argumentos_trabajador(args) -> List[str]:
+    """Reenviar las opciones de entrenamiento a los procesos hijos"""
+    extra = ['--epocas', str(args.epocas), '--lote', str(args.lote), '--lr', str(args.lr),
+             '--series', str(args.series), '--horas', str(args.horas),
+             '--salida', args.salida, '--modelos', args.modelos]
+    if args.pasos_por_epoca:
+        extra += ['--pasos-por-epoca', str(args.pasos_por_epoca)]
+    if args.shards:
+        extra += ['--shards', args.shards]
+    return extra
+
+
+def escalado(args):
+    """Ventanas/s con 1..N trabajadores locales (mismo lote por trabajador)"""
+    resultados = []
+    for n in args.escalado:
+        print(f"\n🚀 {n} trabajador(es)...", flush=True)
+        with tempfile.TemporaryDirectory(prefix='escalado_') as tmp:
+            informe = Path(tmp) / 'informe.json'
+            extra = argumentos_trabajador(args)
+            extra[extra.index('--salida') + 1] = tmp
+            codigo = lanzar_local(args, n, extra + ['--informe', str(informe), '--sin-bundle'])
+            if codigo != 0 or not informe.exists():
+                print(f"   ❌ Falló con {n} trabajadores (código {codigo})")
+                continue
+            with open(informe, 'r', encoding='utf-8') as f:
+                resultados.append(json.load(f))
+
+    if not resultados:
+        return
+    base = resultados[0]
+    print("\n" + "=" * 80)
+    print(f"📊 ESCALADO ({os.cpu_count()} núcleos, lote {args.lote} por trabajador)")
+    print("=" * 80)
+    print(f"{'trabajadores':>12} {'lote global':>12} {'ventanas/s':>11} {'aceleración':>12} {'eficiencia':>11}")
+    for r in resultados:
+        aceleracion = r['ventanas_s'] / base['ventanas_s']
+        ideal = r['trabajadores'] / base['trabajadores']
+        print(f"{r['trabajadores']:>12} {r['lote_global']:>12} {r['ventanas_s']:>11,.0f} "
+              f"{aceleracion:>11.2f}x {aceleracion / ideal:>10.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrenamiento distribuido (MultiWorkerMirroredStrategy)")
+    parser.add_argument('--trabajadores', type=int, default=2, help="Trabajadores locales")
+    parser.add_argument('--hosts', nargs='+', help="host:puerto de todos los trabajadores (varios nodos)")
+    parser.add_argument('--indice', type=int, help="Índice de este nodo en --hosts")
+    parser.add_argument('--escalado', type=int, nargs='+', metavar='N', help="Medir el escalado con N trabajadores")
+    parser.add_argument('--epocas', type=int, default=20)
+    parser.add_argument('--pasos-por-epoca', type=int, help="Por defecto una pasada por los datos")
+    parser.add_argument('--lote', type=int, default=32, help="Lote por trabajador")
+    parser.add_argument('--lr', type=float, default=0.001, help="Learning rate para un trabajador (se escala con N)")
+    parser.add_argument('--shards', help="Dataset de construir_dataset.py (por defecto datos sintéticos)")
+    parser.add_argument('--series', type=int, default=8, help="Series sintéticas")
+    parser.add_argument('--horas', type=int, default=5000)
+    parser.add_argument('--hilos', type=int, help="Hilos por trabajador (por defecto núcleos/N)")
+    parser.add_argument('--salida', default=str(BASE_DIR / 'modelos_guardados' / 'distribuido'),
+                        help="Directorio de respaldo para reanudar")
+    parser.add_argument('--modelos', default=str(BASE_DIR / 'modelos_guardados'))
+    # Internas (procesos lanzados)
+    parser.add_argument('--trabajador', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--informe', help=argparse.SUPPRESS)
+    parser.add_argument('--sin-bundle', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.trabajador:
+        trabajador(args)
+        return
+
+    print("=" * 80)
+    print("🖧 ENTRENAMIENTO DISTRIBUIDO DEL LSTM + ATTENTION")
+    print("=" * 80)
+    if args.escalado:
+        escalado(args)
+        return
+    if args.hosts:
+        if args.indice is None:
+            raise SystemExit("❌ Con --hosts hace falta --indice")
+        os.environ['TF_CONFIG'] = json.dumps({'cluster': {'worker': args.hosts},
+                                              'task': {'type': 'worker', 'index': args.indice}})
+        trabajador(args)
+        return
+    codigo = lanzar_local(args, args.trabajadores, argumentos_trabajador(args))
+    if codigo != 0:
+        print(f"❌ Un trabajador terminó con código {codigo}; relanzar el comando reanuda desde {args.salida}/respaldo")
+    sys.exit(codigo)
+
+
+if __name__ == '__main__':
+    main()
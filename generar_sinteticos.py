@@ -0,0 +1,152 @@
+"""
+🏭 GENERADOR DE DATOS SINTÉTICOS A ESCALA
+================================================================
+Series horarias correlacionadas de miles de estaciones virtuales durante
+años (entrenamiento/sinteticos.py), para medir ingesta, entrenamiento y
+servicio a escala de producción sin datos externos.
+
+- Reproducible: los parámetros y el ruido de cada estación salen de
+  (--semilla, número de estación); el resultado no depende de --procesos
+  ni de --estaciones-por-parte.
+- En columnas y por partes: cada parte (un bloque de estaciones) se escribe
+  en parquet si está pyarrow y si no en .npz con una columna por array
+  (construir_dataset.py lee los dos), de forma atómica.
+- Paralelo y reanudable: una parte por tarea en todos los núcleos; las
+  partes ya escritas se saltan al relanzar con los mismos parámetros.
+
+Uso:
+    python generar_sinteticos.py --estaciones 2000 --anios 3 --salida datos/sinteticos
+    python construir_dataset.py --entrada "datos/sinteticos/*.parquet" --salida datos/dataset
+"""
+
+import os
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Reduce warnings de TensorFlow
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+from entrenamiento.datos import FEATURES
+from entrenamiento.sinteticos import generar_estacion, parametros_estacion
+
+NOMBRE_MANIFIESTO = 'manifiesto.json'
+
+
+def _hay_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def nombre_estacion(i: int) -> str:
+    return f"SIM{i:06d}"
+
+
+def escribir_parte(salida: str, parte: int, primera: int, ultima: int, inicio: str, horas: int,
+                   semilla: int, huecos_por_mes: float, formato: str) -> Dict:
+    """Generar las estaciones [primera, ultima) y escribirlas como una parte"""
+    fechas = pd.date_range(inicio, periods=horas, freq='h', unit='ns')
+    n = ultima - primera
+    columnas = {c: np.empty(n * horas, dtype=np.float32) for c in FEATURES}
+    for k, estacion in enumerate(range(primera, ultima)):
+        serie = generar_estacion(estacion, fechas, semilla, huecos_por_mes)
+        for c in FEATURES:
+            columnas[c][k * horas:(k + 1) * horas] = serie[c]
+    nombres = np.array([nombre_estacion(i) for i in range(primera, ultima)])
+    codigos = np.repeat(np.arange(n, dtype=np.int32), horas)
+    fecha = np.tile(fechas.to_numpy(), n)
+
+    ruta = Path(salida) / f"parte_{parte:05d}.{formato}"
+    tmp = ruta.with_name(ruta.name + '.tmp')
+    if formato == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        estacion = pa.DictionaryArray.from_arrays(pa.array(codigos), pa.array(nombres))
+        tabla = pa.table({'estacion': estacion, 'fecha': fecha, **columnas})
+        pq.write_table(tabla, tmp, compression='zstd')
+    else:
+        with open(tmp, 'wb') as f:
+            # Estación como categórica: códigos por fila y nombres aparte
+            np.savez(f, estacion=codigos, estacion_categorias=nombres, fecha=fecha, **columnas)
+    os.replace(tmp, ruta)
+    return {'parte': parte, 'filas': n * horas, 'bytes': ruta.stat().st_size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generar series horarias sintéticas de muchas estaciones")
+    parser.add_argument('--estaciones', type=int, default=1000)
+    parser.add_argument('--anios', type=float, default=2, help="Años de datos por estación")
+    parser.add_argument('--inicio', default='2022-01-01')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--huecos', type=float, default=1.0, help="Cortes de datos por estación y mes (media)")
+    parser.add_argument('--estaciones-por-parte', type=int, default=50)
+    parser.add_argument('--formato', choices=['auto', 'parquet', 'npz'], default='auto',
+                        help="auto = parquet si está instalado pyarrow")
+    parser.add_argument('--procesos', type=int, default=os.cpu_count())
+    parser.add_argument('--salida', required=True)
+    args = parser.parse_args()
+
+    formato = ('parquet' if _hay_pyarrow() else 'npz') if args.formato == 'auto' else args.formato
+    if formato == 'parquet' and not _hay_pyarrow():
+        raise SystemExit("❌ --formato parquet necesita pyarrow (pip install pyarrow)")
+    horas = int(round(args.anios * 365.25 * 24))
+    salida = Path(args.salida)
+    salida.mkdir(parents=True, exist_ok=True)
+
+    configuracion = {'estaciones': args.estaciones, 'horas': horas, 'inicio': args.inicio,
+                     'semilla': args.semilla, 'huecos': args.huecos,
+                     'estaciones_por_parte': args.estaciones_por_parte, 'formato': formato}
+    ruta_manifiesto = salida / NOMBRE_MANIFIESTO
+    if ruta_manifiesto.exists():
+        with open(ruta_manifiesto, 'r', encoding='utf-8') as f:
+            if json.load(f)['configuracion'] != configuracion:
+                raise SystemExit("❌ La salida contiene datos generados con otros parámetros: usa otra --salida")
+    with open(ruta_manifiesto, 'w', encoding='utf-8') as f:
+        json.dump({
+            'configuracion': configuracion,
+            'estaciones': {nombre_estacion(i): parametros_estacion(i, args.semilla) for i in range(args.estaciones)},
+        }, f, indent=1)
+
+    print("=" * 80)
+    print("🏭 GENERACIÓN DE DATOS SINTÉTICOS")
+    print("=" * 80)
+    partes = [(k, primera, min(primera + args.estaciones_por_parte, args.estaciones))
+              for k, primera in enumerate(range(0, args.estaciones, args.estaciones_por_parte))]
+    pendientes = [p for p in partes if not (salida / f"parte_{p[0]:05d}.{formato}").exists()]
+    print(f"📋 {args.estaciones:,} estaciones x {horas:,} horas = {args.estaciones * horas:,} filas "
+          f"en {len(partes)} partes .{formato} ({len(partes) - len(pendientes)} ya escritas)")
+
+    t0 = time.perf_counter()
+    filas = bytes_escritos = 0
+    with ProcessPoolExecutor(max_workers=args.procesos) as pool:
+        futuros = [pool.submit(escribir_parte, str(salida), k, primera, ultima, args.inicio, horas,
+                               args.semilla, args.huecos, formato) for k, primera, ultima in pendientes]
+        for hechas, futuro in enumerate(as_completed(futuros), 1):
+            r = futuro.result()
+            filas += r['filas']
+            bytes_escritos += r['bytes']
+            segundos = time.perf_counter() - t0
+            print(f"   ⏳ {hechas}/{len(pendientes)} partes, {filas / segundos:,.0f} filas/s", end='\r', flush=True)
+
+    segundos = time.perf_counter() - t0
+    if pendientes:
+        print(f"\n✅ {filas:,} filas ({bytes_escritos / 1e6:,.1f} MB) en {segundos:.1f}s "
+              f"con {args.procesos} procesos ({filas / segundos:,.0f} filas/s)")
+    print(f"   Manifiesto: {ruta_manifiesto}")
+
+
+if __name__ == '__main__':
+    main()
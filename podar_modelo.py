@@ -0,0 +1,195 @@
+"""
+✂️ PODA ESTRUCTURADA DEL BiLSTM + ATTENTION
+================================================================
+Ordena las unidades LSTM de cada dirección por importancia, construye
+variantes más estrechas (p. ej. 96/64/32 unidades por dirección) copiando
+los pesos de las unidades conservadas, las ajusta unas pocas épocas e
+imprime una tabla de parámetros, latencia en CPU y MAE por horizonte para
+elegir el punto de operación. Cada variante se guarda como bundle .aqib con
+los escalados del modelo original (drop-in para la API).
+
+Importancia de la unidad k = E|h_k| * (||W_att[k, :]|| + ||dense_1[k, :]||):
+activación media en datos de validación por la magnitud de los pesos que
+leen esa unidad (la atención y la Dense que sigue).
+
+Uso:
+    python podar_modelo.py --unidades 96 64 32 --epocas 3
+    python podar_modelo.py --modelo ../modelos_guardados/LSTM_Attention_AQI_RECONSTRUIDO.aqib
+"""
+
+import os
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Reduce warnings de TensorFlow
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+from entrenamiento.datos import (
+    LOOKBACK, FORECAST_HORIZONS, FEATURES, ventanas_entrenamiento_validacion
+)
+from entrenamiento.modelos import crear_modelo_lstm_attention
+from entrenamiento.evaluacion import cargar_modelo_servido, medir_latencia, version_de
+
+
+def capas_bilstm_attention(model):
+    """(Bidirectional, AttentionLayer, dense_1, salida) del modelo original"""
+    por_clase = {}
+    for capa in model.layers:
+        por_clase.setdefault(capa.__class__.__name__, []).append(capa)
+    try:
+        bilstm = por_clase["Bidirectional"][0]
+        atencion = por_clase["AttentionLayer"][0]
+        dense_1, salida = por_clase["Dense"][-2:]
+    except (KeyError, ValueError):
+        raise SystemExit("❌ Se esperaba la arquitectura Bidirectional LSTM + AttentionLayer + Dense + Dense")
+    if bilstm.forward_layer.__class__.__name__ != "LSTM":
+        raise SystemExit("❌ La capa recurrente no es un LSTM")
+    return bilstm, atencion, dense_1, salida
+
+
+def importancia_unidades(model, Xn: np.ndarray) -> np.ndarray:
+    """Importancia de las 2U salidas del BiLSTM (forward 0..U-1, backward U..2U-1)"""
+    from tensorflow import keras
+
+    bilstm, atencion, dense_1, _ = capas_bilstm_attention(model)
+    activaciones = keras.Model(model.inputs, bilstm.output).predict(Xn, batch_size=512, verbose=0)
+    media_abs = np.abs(activaciones).mean(axis=(0, 1))
+    W_att = atencion.get_weights()[0]
+    kernel_1 = dense_1.get_weights()[0]
+    return media_abs * (np.linalg.norm(W_att, axis=1) + np.linalg.norm(kernel_1, axis=1))
+
+
+def _recortar_lstm(pesos, conservar: np.ndarray, unidades: int):
+    """Pesos [kernel, recurrent_kernel, bias] de un LSTM con solo las unidades `conservar`"""
+    kernel, recurrente, bias = pesos
+    # Columnas de las 4 puertas (i, f, c, o), cada una en un bloque de `unidades`
+    columnas = np.concatenate([g * unidades + conservar for g in range(4)])
+    return [kernel[:, columnas], recurrente[conservar][:, columnas], bias[columnas]]
+
+
+def podar(model, importancia: np.ndarray, n: int):
+    """Variante con `n` unidades por dirección inicializada con las más importantes"""
+    bilstm, atencion, dense_1, salida = capas_bilstm_attention(model)
+    unidades = bilstm.forward_layer.units
+    adelante = np.sort(np.argsort(importancia[:unidades])[::-1][:n])
+    atras = np.sort(np.argsort(importancia[unidades:])[::-1][:n])
+    # Índices de las 2n features conservadas en la salida concatenada del BiLSTM
+    features = np.concatenate([adelante, unidades + atras])
+
+    nuevo = crear_modelo_lstm_attention((LOOKBACK, len(FEATURES)), len(FORECAST_HORIZONS), unidades=n)
+    n_bilstm, n_atencion, n_dense_1, n_salida = capas_bilstm_attention(nuevo)
+
+    n_bilstm.set_weights(
+        _recortar_lstm(bilstm.forward_layer.get_weights(), adelante, unidades)
+        + _recortar_lstm(bilstm.backward_layer.get_weights(), atras, unidades)
+    )
+    W, b, u = atencion.get_weights()
+    n_atencion.set_weights([W[features][:, features], b[features], u[features]])
+    kernel_1, bias_1 = dense_1.get_weights()
+    n_dense_1.set_weights([kernel_1[features], bias_1])
+    n_salida.set_weights(salida.get_weights())
+    return nuevo
+
+
+def mae_por_horizonte(model, Xn, y, scaler_y) -> np.ndarray:
+    pred = scaler_y.inverse_transform(model.predict(Xn, batch_size=1024, verbose=0))
+    return np.abs(pred - y).mean(axis=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poda estructurada del BiLSTM + Attention")
+    parser.add_argument("--modelo", help="Bundle .aqib a podar (por defecto el configurado en la API)")
+    parser.add_argument("--unidades", type=int, nargs="+", default=[96, 64, 32], help="Unidades por dirección")
+    parser.add_argument("--series", type=int, default=8, help="Series sintéticas de ajuste")
+    parser.add_argument("--series-validacion", type=int, default=2)
+    parser.add_argument("--horas", type=int, default=5000)
+    parser.add_argument("--historico", nargs="*", default=[], help="CSV/parquet horarios con FEATURES")
+    parser.add_argument("--epocas", type=int, default=3, help="Épocas de ajuste tras la poda")
+    parser.add_argument("--lote", type=int, default=64)
+    parser.add_argument("--salida", default=str(BASE_DIR / 'modelos_guardados'))
+    args = parser.parse_args()
+
+    from tensorflow import keras
+    from utils.model_bundle import escribir_bundle
+
+    print("=" * 80)
+    print("✂️ PODA ESTRUCTURADA DEL BiLSTM + ATTENTION")
+    print("=" * 80)
+
+    bundle, original, scaler_y = cargar_modelo_servido(args.modelo)
+    version = version_de(bundle)
+    unidades = capas_bilstm_attention(original)[0].forward_layer.units
+    print(f"📦 Modelo {version}: {unidades} unidades por dirección, {original.count_params():,} parámetros")
+
+    # Datos: series sintéticas (y el 80/20 de cada histórico) en la escala del modelo
+    (X, y), (X_val, y_val) = ventanas_entrenamiento_validacion(
+        args.horas, args.series, args.series_validacion, 2000, 6000, args.historico
+    )
+    Xn = bundle.scaler_x.transform(X).astype(np.float32)
+    Xn_val = bundle.scaler_x.transform(X_val).astype(np.float32)
+    yn = scaler_y.transform(y).astype(np.float32)
+    print(f"📊 Ajuste: {len(X):,} ventanas | Validación: {len(X_val):,} ventanas")
+
+    importancia = importancia_unidades(original, Xn_val)
+    orden = np.sort(importancia)[::-1]
+    print(f"📈 El 50% de las unidades más importantes reúne el "
+          f"{orden[:len(orden) // 2].sum() / orden.sum():.0%} de la importancia total")
+
+    filas = [(f"{unidades} (original)", original, mae_por_horizonte(original, Xn_val, y_val, scaler_y), None)]
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    for n in sorted(args.unidades, reverse=True):
+        if n >= unidades:
+            print(f"⚠️ {n} >= {unidades} unidades: se omite")
+            continue
+        variante = podar(original, importancia, n)
+        mae_podado = mae_por_horizonte(variante, Xn_val, y_val, scaler_y)
+
+        print(f"\n🏋️ Ajustando la variante de {n} unidades ({args.epocas} épocas)...")
+        variante.compile(optimizer=keras.optimizers.Adam(learning_rate=5e-4), loss='mse')
+        t0 = time.perf_counter()
+        variante.fit(Xn, yn, epochs=args.epocas, batch_size=args.lote, verbose=2)
+        segundos = time.perf_counter() - t0
+        mae = mae_por_horizonte(variante, Xn_val, y_val, scaler_y)
+
+        descripcion = f"Bidirectional LSTM({n}) + Attention (podado)"
+        metadata = {
+            "timestamp": f"{timestamp}_poda{n}",
+            "nombre_experimento": f"LSTM_Attention_AQI_poda{n}",
+            "arquitectura": descripcion,
+            "podado_de": version,
+            "lookback": LOOKBACK,
+            "forecast_horizons": FORECAST_HORIZONS,
+            "features": FEATURES,
+            "epochs_trained": args.epocas,
+            "segundos_entrenamiento": round(segundos, 1),
+            "metricas": {f"mae_{h}h": float(m) for h, m in zip(FORECAST_HORIZONS, mae)},
+            "model_params": variante.count_params(),
+        }
+        ruta = Path(args.salida) / f"LSTM_Attention_AQI_poda{n}_{timestamp}.aqib"
+        escribir_bundle(ruta, variante.get_weights(), variante.to_json(),
+                        bundle.scaler_x, scaler_y, metadata, {"podado_de": version})
+        print(f"   💾 {ruta.name}")
+        filas.append((str(n), variante, mae, mae_podado))
+
+    print("\n" + "=" * 80)
+    print("📊 PODA: PARÁMETROS, LATENCIA (p50, CPU) Y MAE POR HORIZONTE (AQI, validación)")
+    print("=" * 80)
+    horizontes = " ".join(f"{'MAE ' + str(h) + 'h':>8}" for h in FORECAST_HORIZONS)
+    print(f"{'unidades':<15} {'parámetros':>11} {'lote 1':>8} {'lote 64':>9} {horizontes} {'media':>7} {'sin ajuste':>11}")
+    for nombre, model, mae, mae_podado in filas:
+        columnas = " ".join(f"{m:>8.2f}" for m in mae)
+        sin_ajuste = f"{mae_podado.mean():>11.2f}" if mae_podado is not None else f"{'-':>11}"
+        print(f"{nombre:<15} {model.count_params():>11,} {medir_latencia(model, 1):>6.2f}ms "
+              f"{medir_latencia(model, 64, 10):>7.1f}ms {columnas} {mae.mean():>7.2f} {sin_ajuste}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,13 @@
+import { fileURLToPath } from 'node:url';
+
+// Raíz del repositorio: src/lib/aqi.js importa api/config/aqi_epa.json,
+// la tabla AQI compartida con la API Python
+const raizRepositorio = fileURLToPath(new URL('..', import.meta.url));
+
 /** @type {import('next').NextConfig} */
-const nextConfig = {};
+const nextConfig = {
+  turbopack: { root: raizRepositorio },
+  outputFileTracingRoot: raizRepositorio,
+};
 
 export default nextConfig;
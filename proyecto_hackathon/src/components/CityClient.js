@@ -2,6 +2,7 @@
 import { useEffect, useState } from 'react'
 import { useRouter } from 'next/navigation'
 import GoogleMap from './GoogleMap'
+import { categoriaAQI, indiceCategoria } from '@/lib/aqi'
 import { LineChart, Line, XAxis, YAxis, Tooltip, Legend, ResponsiveContainer, CartesianGrid } from 'recharts'
 
 export default function CityClient({ slug }) {
@@ -109,24 +110,11 @@ export default function CityClient({ slug }) {
     ? { lat: stations[0].lat, lng: stations[0].lng } 
     : (urlLat && urlLng ? { lat: parseFloat(urlLat), lng: parseFloat(urlLng) } : cityCoords)
 
-  // Función para obtener color según AQI
-  const getAQIColor = (aqi) => {
-    if (aqi <= 50) return 'bg-green-500'
-    if (aqi <= 100) return 'bg-yellow-500'
-    if (aqi <= 150) return 'bg-orange-500'
-    if (aqi <= 200) return 'bg-red-500'
-    if (aqi <= 300) return 'bg-purple-500'
-    return 'bg-red-900'
-  }
+  // Clases de color por categoría EPA (mismo orden que api/config/aqi_epa.json)
+  const AQI_CLASSES = ['bg-green-500', 'bg-yellow-500', 'bg-orange-500', 'bg-red-500', 'bg-purple-500', 'bg-red-900']
+  const getAQIColor = (aqi) => AQI_CLASSES[indiceCategoria(aqi)]
 
-  const getAQILabel = (aqi) => {
-    if (aqi <= 50) return 'Buena'
-    if (aqi <= 100) return 'Moderada'
-    if (aqi <= 150) return 'Insalubre para grupos sensibles'
-    if (aqi <= 200) return 'Insalubre'
-    if (aqi <= 300) return 'Muy insalubre'
-    return 'Peligrosa'
-  }
+  const getAQILabel = (aqi) => categoriaAQI(aqi).nombre
 
   console.log('🗺️ [CityClient] Centro del mapa calculado:', {
     ciudad: slug,
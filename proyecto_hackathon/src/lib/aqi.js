@@ -0,0 +1,49 @@
+// AQI de la EPA con la misma tabla que la API Python (api/config/aqi_epa.json,
+// leída también por api/utils/aqi.py). La concentración se trunca a los
+// decimales de la tabla y el tramo se busca por bisección.
+import TABLAS from '../../../api/config/aqi_epa.json'
+
+// Primer índice i con valores[i] >= x (como np.searchsorted(side='left'))
+function buscarTramo(valores, x) {
+  let bajo = 0
+  let alto = valores.length
+  while (bajo < alto) {
+    const medio = (bajo + alto) >> 1
+    if (valores[medio] < x) bajo = medio + 1
+    else alto = medio
+  }
+  return bajo
+}
+
+const CONTAMINANTES = Object.fromEntries(
+  Object.entries(TABLAS.contaminantes).map(([nombre, t]) => [nombre, {
+    factor: 10 ** t.decimales,
+    tramos: t.tramos,
+    cAlto: t.tramos.map(tramo => tramo[1])
+  }])
+)
+
+const LIMITES_CATEGORIAS = TABLAS.categorias.slice(0, -1).map(c => c.hasta)
+
+export const CATEGORIAS = TABLAS.categorias
+
+// Subíndice AQI de un contaminante ('PM2.5', 'PM10', 'O3', 'NO2'); null si no hay tabla
+export function calcularAQI(contaminante, concentracion) {
+  const tabla = CONTAMINANTES[contaminante]
+  if (!tabla || concentracion == null || Number.isNaN(concentracion)) return null
+
+  const { factor, tramos, cAlto } = tabla
+  const limitada = Math.min(Math.max(concentracion, 0), cAlto[cAlto.length - 1])
+  const c = Math.floor(limitada * factor + 1e-9) / factor
+  const [cBajo, cTope, iBajo, iAlto] = tramos[Math.min(buscarTramo(cAlto, c), tramos.length - 1)]
+  return ((iAlto - iBajo) / (cTope - cBajo)) * (c - cBajo) + iBajo
+}
+
+// Índice de categoría EPA (0 = Buena ... 5 = Peligrosa); el límite superior pertenece a la categoría
+export function indiceCategoria(aqi) {
+  return buscarTramo(LIMITES_CATEGORIAS, aqi)
+}
+
+export function categoriaAQI(aqi) {
+  return CATEGORIAS[indiceCategoria(aqi)]
+}
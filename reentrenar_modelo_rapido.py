@@ -9,35 +9,51 @@
 import os
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Reduce warnings de TensorFlow
 
-import numpy as np
-import pandas as pd
+import argparse
+
 from datetime import datetime
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.model_selection import train_test_split
-import tensorflow as tf
 from tensorflow import keras
-from tensorflow.keras import layers
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
 import joblib
 
-# Importar la AttentionLayer personalizada
+# Datos y fábricas de modelos compartidos con los demás scripts de entrenamiento
 import sys
-sys.path.append(os.path.join(os.path.dirname(__file__), 'api', 'utils'))
-from attention_layer import AttentionLayer
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from entrenamiento.datos import (
+    LOOKBACK, FORECAST_HORIZONS, FEATURES, generar_datos_sinteticos, crear_secuencias
+)
+from entrenamiento.modelos import ARQUITECTURAS
+from entrenamiento.pipeline import listar_shards, ajustar_escalado, a_min_max_scaler, crear_dataset
+from entrenamiento.rendimiento import anadir_argumentos, aplicar_perfil, a_float32, describir
+from entrenamiento.backtesting import backtest, tramos_de_arrays
+
+parser = argparse.ArgumentParser(description="Reentrenamiento rápido del modelo AQI")
+parser.add_argument('--arquitectura', choices=list(ARQUITECTURAS), default='lstm_attention',
+                    help="Familia de modelo: lstm_attention (por defecto) o tcn")
+parser.add_argument('--shards', help="Directorio o patrón de shards horarios (.npz/.csv/.parquet): "
+                    "entrenamiento en streaming con tf.data en lugar de datos sintéticos en memoria")
+parser.add_argument('--epocas', type=int, default=50, help="Épocas máximas (early stopping)")
+parser.add_argument('--buffer-mezcla', type=int, default=10_000,
+                    help="Ventanas en el buffer de mezcla del modo --shards")
+anadir_argumentos(parser)
+ARGS = parser.parse_args()
+crear_modelo, PREFIJO_MODELO, DESCRIPCION_MODELO = ARQUITECTURAS[ARGS.arquitectura]
+# Hilos y precisión antes de crear ningún tensor
+PERFIL = aplicar_perfil(ARGS)
 
 print("="*80)
-print("🔄 REENTRENAMIENTO RÁPIDO DEL MODELO LSTM + ATTENTION")
+print(f"🔄 REENTRENAMIENTO RÁPIDO DEL MODELO {DESCRIPCION_MODELO.upper()}")
 print("="*80)
-print(f"📅 Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+print(f"📅 Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+print(f"⚙️ Rendimiento: {describir(PERFIL)}\n")
 
 # ============================================================================
 # CONFIGURACIÓN
 # ============================================================================
-LOOKBACK = 48              # 48 horas de historia
-FORECAST_HORIZONS = [3, 6, 12, 24]  # Horizontes de predicción
-FEATURES = ['PM2.5', 'PM10', 'O3', 'NO2', 'temperatura', 'humedad', 'viento', 'AQI']
-BATCH_SIZE = 32
-EPOCHS = 50                # Reducido para entrenamiento rápido
+BATCH_SIZE = PERFIL['lote']  # 32 por defecto (--lote)
+EPOCHS = ARGS.epocas       # Reducido para entrenamiento rápido (50 por defecto)
 VALIDATION_SPLIT = 0.2
 
 # Directorios
@@ -45,190 +61,103 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODELOS_DIR = os.path.join(BASE_DIR, 'modelos_guardados')
 os.makedirs(MODELOS_DIR, exist_ok=True)
 
-# ============================================================================
-# 1. GENERAR DATOS SINTÉTICOS (para entrenamiento rápido)
-# ============================================================================
-print("📊 Generando datos sintéticos para entrenamiento...")
-
-def generar_datos_sinteticos(n_samples=5000):
-    """
-    Genera datos sintéticos realistas de calidad del aire
-    """
-    np.random.seed(42)
-    
-    # Crear serie temporal
-    time_index = pd.date_range('2024-01-01', periods=n_samples, freq='h')
-    
-    # Patrones base con variación diurna
-    hour = np.arange(n_samples) % 24
-    day_of_week = (np.arange(n_samples) // 24) % 7
-    
-    # PM2.5: Mayor en horas pico (8am, 6pm) y días laborables
-    pm25_base = 25 + 15 * np.sin(2 * np.pi * hour / 24) + 5 * (day_of_week < 5)
-    pm25 = pm25_base + np.random.normal(0, 5, n_samples)
-    pm25 = np.clip(pm25, 0, 150)
-    
-    # PM10: Correlacionado con PM2.5 pero mayor
-    pm10 = pm25 * 1.7 + np.random.normal(0, 8, n_samples)
-    pm10 = np.clip(pm10, 0, 250)
-    
-    # O3: Mayor en horas de sol (mediodía)
-    o3_base = 40 + 20 * np.sin(2 * np.pi * (hour - 12) / 24)
-    o3 = o3_base + np.random.normal(0, 8, n_samples)
-    o3 = np.clip(o3, 0, 150)
-    
-    # NO2: Mayor en horas pico de tráfico
-    no2_base = 30 + 20 * ((hour >= 7) & (hour <= 9) | (hour >= 17) & (hour <= 19))
-    no2 = no2_base + np.random.normal(0, 5, n_samples)
-    no2 = np.clip(no2, 0, 100)
-    
-    # Temperatura: Ciclo diurno y estacional
-    temp_base = 20 + 10 * np.sin(2 * np.pi * hour / 24)
-    temp = temp_base + np.random.normal(0, 2, n_samples)
-    
-    # Humedad: Inversa a temperatura
-    hum = 60 - 0.5 * (temp - 20) + np.random.normal(0, 5, n_samples)
-    hum = np.clip(hum, 20, 90)
+if ARGS.shards:
+    # ========================================================================
+    # 1-4. STREAMING DESDE SHARDS (memoria constante)
+    # ========================================================================
+    # Las ventanas se generan al vuelo dentro del pipeline tf.data; los
+    # últimos shards (VALIDATION_SPLIT) quedan para validación
+    rutas = listar_shards(ARGS.shards)
+    if len(rutas) < 2:
+        raise SystemExit(f"❌ Se necesitan al menos 2 shards en {ARGS.shards} (train y validación)")
+    corte = min(len(rutas) - 1, max(1, int(len(rutas) * (1 - VALIDATION_SPLIT))))
+    rutas_train, rutas_val = rutas[:corte], rutas[corte:]
+    print(f"📂 Shards: {len(rutas_train)} de entrenamiento, {len(rutas_val)} de validación")
     
-    # Viento: Aleatorio con tendencia
-    wind = 5 + np.random.exponential(3, n_samples)
-    wind = np.clip(wind, 0, 30)
+    print("📏 Ajustando la normalización (una pasada por los shards)...")
+    escalado_x, escalado_y = ajustar_escalado(rutas_train)
+    scaler, scaler_y = a_min_max_scaler(escalado_x), a_min_max_scaler(escalado_y)
     
-    # AQI: Calculado principalmente de PM2.5
-    aqi = pm25 * 2 + pm10 * 0.5 + o3 * 0.3 + no2 * 0.2
-    aqi = np.clip(aqi, 0, 300)
-    
-    # Crear DataFrame
-    df = pd.DataFrame({
-        'fecha': time_index,
-        'PM2.5': pm25,
-        'PM10': pm10,
-        'O3': o3,
-        'NO2': no2,
-        'temperatura': temp,
-        'humedad': hum,
-        'viento': wind,
-        'AQI': aqi
-    })
-    
-    return df
-
-datos = generar_datos_sinteticos(n_samples=5000)
-print(f"✅ Generados {len(datos)} registros sintéticos")
-print(f"   Rango de fechas: {datos['fecha'].min()} → {datos['fecha'].max()}\n")
-
-# ============================================================================
-# 2. PREPARAR SECUENCIAS PARA LSTM
-# ============================================================================
-print("🔧 Preparando secuencias para LSTM...")
+    datos_train = crear_dataset(rutas_train, escalado_x, escalado_y, lote=BATCH_SIZE,
+                                buffer_mezcla=ARGS.buffer_mezcla)
+    datos_val = crear_dataset(rutas_val, escalado_x, escalado_y, lote=BATCH_SIZE, mezclar=False)
+    datos_fit = {'x': datos_train, 'validation_data': datos_val}
+    datos_eval = {'x': datos_val}
+    print(f"✅ Pipeline listo (buffer de mezcla: {ARGS.buffer_mezcla} ventanas)\n")
+else:
+    # ============================================================================
+    # 1. GENERAR DATOS SINTÉTICOS (para entrenamiento rápido)
+    # ============================================================================
+    print("📊 Generando datos sintéticos para entrenamiento...")
+
+    datos = generar_datos_sinteticos(n_samples=5000)
+    print(f"✅ Generados {len(datos)} registros sintéticos")
+    print(f"   Rango de fechas: {datos['fecha'].min()} → {datos['fecha'].max()}\n")
+
+    # ============================================================================
+    # 2. PREPARAR SECUENCIAS PARA LSTM
+    # ============================================================================
+    print("🔧 Preparando secuencias para LSTM...")
+
+    # Crear secuencias
+    X, y = crear_secuencias(datos, FEATURES, LOOKBACK, FORECAST_HORIZONS)
+
+    print(f"✅ Secuencias creadas:")
+    print(f"   X shape: {X.shape} (samples, timesteps, features)")
+    print(f"   y shape: {y.shape} (samples, horizons)\n")
+
+    # ============================================================================
+    # 3. NORMALIZACIÓN
+    # ============================================================================
+    print("📏 Normalizando datos...")
+
+    # Normalizar X (reshape para el scaler)
+    n_samples, n_timesteps, n_features = X.shape
+    X_reshaped = X.reshape(-1, n_features)
+
+    scaler = MinMaxScaler()
+    X_normalized = scaler.fit_transform(X_reshaped)
+    X_normalized = X_normalized.reshape(n_samples, n_timesteps, n_features)
+
+    # Normalizar y
+    scaler_y = MinMaxScaler()
+    y_normalized = scaler_y.fit_transform(y)
+
+    print(f"✅ Normalización completada")
+    print(f"   X rango: [{X_normalized.min():.3f}, {X_normalized.max():.3f}]")
+    print(f"   y rango: [{y_normalized.min():.3f}, {y_normalized.max():.3f}]\n")
+
+    # ============================================================================
+    # 4. DIVISIÓN TRAIN/VAL
+    # ============================================================================
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_normalized, y_normalized, 
+        test_size=VALIDATION_SPLIT, 
+        shuffle=False  # No mezclar para mantener orden temporal
+    )
 
-def crear_secuencias(data, features, lookback, horizons):
-    """
-    Crea secuencias de entrada y salida para LSTM
-    """
-    X, y = [], []
-    
-    data_features = data[features].values
-    
-    for i in range(lookback, len(data) - max(horizons)):
-        # Secuencia de entrada (lookback horas)
-        X.append(data_features[i-lookback:i])
-        
-        # Salidas: AQI en cada horizonte futuro
-        y_sample = []
-        for h in horizons:
-            if i + h < len(data):
-                y_sample.append(data['AQI'].iloc[i + h])
-            else:
-                y_sample.append(data['AQI'].iloc[-1])
-        y.append(y_sample)
+    print(f"📊 División de datos:")
+    print(f"   Train: {len(X_train)} muestras")
+    print(f"   Val:   {len(X_val)} muestras\n")
     
-    return np.array(X), np.array(y)
-
-# Crear secuencias
-X, y = crear_secuencias(datos, FEATURES, LOOKBACK, FORECAST_HORIZONS)
-
-print(f"✅ Secuencias creadas:")
-print(f"   X shape: {X.shape} (samples, timesteps, features)")
-print(f"   y shape: {y.shape} (samples, horizons)\n")
+    datos_fit = {'x': X_train, 'y': y_train, 'validation_data': (X_val, y_val), 'batch_size': BATCH_SIZE}
+    datos_eval = {'x': X_val, 'y': y_val}
 
 # ============================================================================
-# 3. NORMALIZACIÓN
+# 5. CREAR MODELO (--arquitectura; el LSTM usa AttentionLayer, SIN LAMBDA)
 # ============================================================================
-print("📏 Normalizando datos...")
-
-# Normalizar X (reshape para el scaler)
-n_samples, n_timesteps, n_features = X.shape
-X_reshaped = X.reshape(-1, n_features)
+print(f"🧠 Construyendo modelo {DESCRIPCION_MODELO}...")
 
-scaler = MinMaxScaler()
-X_normalized = scaler.fit_transform(X_reshaped)
-X_normalized = X_normalized.reshape(n_samples, n_timesteps, n_features)
-
-# Normalizar y
-scaler_y = MinMaxScaler()
-y_normalized = scaler_y.fit_transform(y)
-
-print(f"✅ Normalización completada")
-print(f"   X rango: [{X_normalized.min():.3f}, {X_normalized.max():.3f}]")
-print(f"   y rango: [{y_normalized.min():.3f}, {y_normalized.max():.3f}]\n")
-
-# ============================================================================
-# 4. DIVISIÓN TRAIN/VAL
-# ============================================================================
-X_train, X_val, y_train, y_val = train_test_split(
-    X_normalized, y_normalized, 
-    test_size=VALIDATION_SPLIT, 
-    shuffle=False  # No mezclar para mantener orden temporal
-)
-
-print(f"📊 División de datos:")
-print(f"   Train: {len(X_train)} muestras")
-print(f"   Val:   {len(X_val)} muestras\n")
-
-# ============================================================================
-# 5. CREAR MODELO CON ATTENTIONLAYER (SIN LAMBDA!)
-# ============================================================================
-print("🧠 Construyendo modelo LSTM + Attention...")
-
-def crear_modelo_lstm_attention(input_shape, n_outputs):
-    """
-    Crea modelo LSTM con AttentionLayer personalizada
-    ✅ SIN LAMBDA - Usa AttentionLayer directamente
-    """
-    inputs = layers.Input(shape=input_shape, name='input_layer')
-    
-    # Bidirectional LSTM
-    x = layers.Bidirectional(
-        layers.LSTM(128, return_sequences=True),
-        name='bidirectional_lstm'
-    )(inputs)
-    
-    # ✅ AttentionLayer personalizada (NO Lambda!)
-    x = AttentionLayer(name='attention')(x)
-    
-    # Dropout para regularización
-    x = layers.Dropout(0.3, name='dropout')(x)
-    
-    # Dense intermedia
-    x = layers.Dense(32, activation='relu', name='dense_1')(x)
-    
-    # Salida: 4 horizontes de predicción
-    outputs = layers.Dense(n_outputs, activation='linear', name='output')(x)
-    
-    model = keras.Model(inputs=inputs, outputs=outputs, name='LSTM_with_Attention')
-    
-    return model
-
-modelo = crear_modelo_lstm_attention(
+modelo = crear_modelo(
     input_shape=(LOOKBACK, len(FEATURES)),
     n_outputs=len(FORECAST_HORIZONS)
 )
 
 modelo.compile(
-    optimizer=keras.optimizers.Adam(learning_rate=0.001),
+    optimizer=keras.optimizers.Adam(learning_rate=PERFIL['lr']),
     loss='mse',
-    metrics=['mae']
+    metrics=['mae'],
+    jit_compile=PERFIL['jit_compile']
 )
 
 print("✅ Modelo construido:")
@@ -239,7 +168,7 @@ print()
 # 6. CALLBACKS PARA ENTRENAMIENTO OPTIMIZADO
 # ============================================================================
 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-modelo_path = os.path.join(MODELOS_DIR, f'LSTM_Attention_AQI_{timestamp}.keras')
+modelo_path = os.path.join(MODELOS_DIR, f'{PREFIJO_MODELO}_{timestamp}.keras')
 
 callbacks = [
     # Early stopping: Para si no mejora en 10 épocas
@@ -265,7 +194,10 @@ callbacks = [
         monitor='val_loss',
         save_best_only=True,
         verbose=1
-    )
+    ),
+    
+    # Calentamiento del learning rate (lote grande con --escalar-lr)
+    *PERFIL['callbacks']
 ]
 
 # ============================================================================
@@ -277,37 +209,51 @@ print(f"   Batch size: {BATCH_SIZE}")
 print(f"   Early stopping: patience=10\n")
 
 history = modelo.fit(
-    X_train, y_train,
-    validation_data=(X_val, y_val),
+    **datos_fit,
     epochs=EPOCHS,
-    batch_size=BATCH_SIZE,
     callbacks=callbacks,
     verbose=1
 )
 
 print("\n✅ Entrenamiento completado!")
 
+if PERFIL['bf16']:
+    # El checkpoint calcula en bfloat16: se sustituye por una copia float32
+    # para que la API (y el bundle) sirvan como siempre. La copia parte de los
+    # pesos de la mejor época (los del checkpoint), no de los de la última
+    if os.path.exists(modelo_path):
+        modelo.load_weights(modelo_path)
+    modelo = a_float32(crear_modelo, modelo, input_shape=(LOOKBACK, len(FEATURES)),
+                       n_outputs=len(FORECAST_HORIZONS))
+    modelo.compile(loss='mse', metrics=['mae'])
+    modelo.save(modelo_path)
+    print(f"   ✅ Modelo guardado en float32: {os.path.basename(modelo_path)}")
+
 # ============================================================================
 # 8. EVALUACIÓN
 # ============================================================================
 print("\n📊 Evaluando modelo...")
 
 # Evaluar en conjunto de validación
-val_loss, val_mae = modelo.evaluate(X_val, y_val, verbose=0)
+val_loss, val_mae = modelo.evaluate(**datos_eval, verbose=0)
 
 print(f"   Val Loss (MSE): {val_loss:.4f}")
 print(f"   Val MAE:        {val_mae:.4f}")
 
-# Predicciones de ejemplo
-y_pred = modelo.predict(X_val[:5], verbose=0)
-y_pred_denorm = scaler_y.inverse_transform(y_pred)
-y_true_denorm = scaler_y.inverse_transform(y_val[:5])
-
-print("\n🔍 Ejemplos de predicciones:")
-for i in range(5):
-    print(f"\n   Muestra {i+1}:")
-    for j, h in enumerate(FORECAST_HORIZONS):
-        print(f"      {h}h → Pred: {y_pred_denorm[i,j]:.1f}, Real: {y_true_denorm[i,j]:.1f}")
+# Métricas por horizonte en unidades de AQI (una pasada vectorizada)
+if ARGS.shards:
+    tramos_val = ((X.numpy(), y.numpy(), None, None) for X, y in datos_val)
+else:
+    tramos_val = tramos_de_arrays(X_val, y_val)
+por_horizonte = backtest(modelo, tramos_val, scaler_y, y_normalizada=True).tabla(('horizonte',))
+
+print("\n🔍 Métricas por horizonte (AQI):")
+print(por_horizonte.to_string(float_format='{:.3f}'.format))
+metricas_horizonte = {
+    f"{metrica}_{horizonte}": float(valor)
+    for horizonte, fila in por_horizonte.iterrows()
+    for metrica, valor in fila.drop('n').items()
+}
 
 # ============================================================================
 # 9. GUARDAR ARTEFACTOS
@@ -327,14 +273,18 @@ print(f"   ✅ Scaler Y guardado: {os.path.basename(scaler_y_path)}")
 # Guardar metadatos
 metadata = {
     'timestamp': timestamp,
+    'arquitectura': DESCRIPCION_MODELO,
     'lookback': LOOKBACK,
     'forecast_horizons': FORECAST_HORIZONS,
     'features': FEATURES,
     'n_features': len(FEATURES),
     'val_loss': float(val_loss),
     'val_mae': float(val_mae),
+    'metricas': metricas_horizonte,
     'epochs_trained': len(history.history['loss']),
-    'model_params': modelo.count_params()
+    'model_params': modelo.count_params(),
+    'rendimiento': {'lote': BATCH_SIZE, 'learning_rate': PERFIL['lr'],
+                    'jit_compile': PERFIL['jit_compile'], 'bf16': PERFIL['bf16']}
 }
 
 metadata_path = os.path.join(MODELOS_DIR, f'metadata_{timestamp}.pkl')
@@ -356,7 +306,7 @@ if os.path.exists(config_path):
     
     # Reemplazar MODEL_PATH
     import re
-    new_model_name = f'LSTM_Attention_AQI_{timestamp}.keras'
+    new_model_name = f'{PREFIJO_MODELO}_{timestamp}.keras'
     config_content = re.sub(
         r"MODEL_PATH = os\.path\.join\(MODELOS_DIR, ['\"].*?['\"]\)",
         f"MODEL_PATH = os.path.join(MODELOS_DIR, '{new_model_name}')",